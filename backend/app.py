@@ -1,30 +1,54 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
-from pymongo import MongoClient
-from datetime import datetime, date
-import openpyxl
+from datetime import datetime, date, timedelta
+from contextlib import ExitStack
 import tempfile
 import pandas as pd
 import os
 import json
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException, ElementClickInterceptedException
+from selenium.webdriver.common.alert import Alert
 import requests
 import threading
+import weakref
 import signal
 import sys
 import multiprocessing
 from concurrent.futures import ThreadPoolExecutor
 from auth_routes import auth_bp
+from cid_parser import clean_amount, build_monthly_amounts, parse_consumption_json, CONSUMPTION_TABLE_SCRIPT
+import http_engine
+import async_engine
+import asyncio
+import atexit
+import work_queue
+from connectivity import ConnectivityMonitor
+from rate_governor import RateGovernor
+import job_control
+import mongo_pool
+import checkpoint
+import priorities
+from result_writer import ResultWriter
+from result_cache import ResultCache, PagedLookup
+from indexes import ensure_indexes, forget_indexes
+import ingest
+import export
+import month_window
+import metrics
+import logging
+import tracing
+import profiling
+from tracing import Trace, log_event
+from status_cache import StatusCache
+from scheduler import Scheduler, Job
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from browser_pool import BrowserPool, portal_hosts
 from dotenv import load_dotenv
-import certifi 
 import tempfile
 
 app = Flask(__name__)
@@ -36,76 +60,231 @@ load_dotenv()
 # Scraping Configuration
 CONFIG = {
     'URL': "https://www.apeasternpower.com/viewBillDetailsMain",
-    'CHECK_INTERNET_URL': "http://www.google.com",
+    'HISTORY_URL': os.getenv('HISTORY_URL'),  # Consumption history fragment for the HTTP engine, if not inline
+    'HTTP_TIMEOUT': 10,
+    'PAGE_LOAD_TIMEOUT': 10,       # Seconds to wait for the CID form to be ready
+    'SIGNIN_TIMEOUT': 10,          # Seconds to wait for the CAPTCHA alert or the history button
+    'HISTORY_TIMEOUT': 10,         # Seconds to wait for consumptionData rows after clicking history
+    'DEFAULT_ENGINE': os.getenv('SCRAPE_ENGINE', 'selenium'),
+    'HEALTH_PROBE_URL': os.getenv('HEALTH_PROBE_URL', "https://www.apeasternpower.com/viewBillDetailsMain"),
+    'CIRCUIT_FAILURE_THRESHOLD': 5,  # Consecutive network failures before all workers pause
+    'PROBE_BACKOFF_MAX': 60,         # Upper bound (seconds) on the outage probe backoff
+    'RATE_START': 2,               # CID attempts/sec toward the portal before any job starts
+    'RATE_MIN': 0.2,
+    'RATE_MAX': 50,
+    'CONCURRENCY_START': 4,        # Concurrent portal attempts before any job starts (AIMD adjusts from here)
+    'GOVERNOR_START': {            # (CIDs/sec, concurrent attempts) a job lifts the governor to, by engine; 'async' is async mode
+        'selenium': (2, 4),
+        'selenium-lean': (2, 4),
+        'http': (8, 16),
+        'async': (20, 100),
+    },
+    'CONCURRENCY_MIN': 1,
+    'CONCURRENCY_MAX': 1000,
+    'LATENCY_TARGET': 15,          # Seconds per attempt above which the governor backs off
     'MAX_RETRIES': 2,
-    'RETRY_DELAY': 10,
+    'RETRY_DELAY': 10,             # Base backoff before a failed CID becomes claimable again
+    'RETRY_MAX_DELAY': 300,
     'BATCH_SIZE': 10,
+    'LEASE_SECONDS': 120,          # A claimed CID returns to the queue if its worker is silent this long
+    'LEASE_HEARTBEAT': 30,         # Seconds between lease renewals
+    'WRITE_BATCH_SIZE': 100,       # Flush buffered results every N CIDs...
+    'WRITE_FLUSH_MS': 500,         # ...or every T milliseconds
+    'UPLOAD_CHUNK_SIZE': 1000,     # Upserts per bulk_write during /upload
+    'EXPORT_BATCH_SIZE': 2000,     # Cursor batch size for /download
+    'EXPORT_WIDTH_SAMPLE': 1000,   # Rows sampled to size export columns
+    'MONTH_WINDOW': os.getenv('MONTH_WINDOW'),  # e.g. '2025-07:2025-09'; unset keeps the fixed April25/May25/June25/Highest columns
+    'STATUS_CACHE_TTL': 2,         # Seconds /status counters are shared between requests
+    'PRIORITY_AGING_SECONDS': 60,  # A waiting tag gains one priority level per this many seconds unserved
+    'STATUS_STREAM_HEARTBEAT': 15, # Seconds between keep-alive events on /status/stream
+    'MAX_STATUS_STREAMS': int(os.getenv('MAX_STATUS_STREAMS', 4)),  # Open /status/stream connections; each holds a request thread
+    'PROCESSING_BACKEND': os.getenv('PROCESSING_BACKEND', 'inline'),  # 'inline' threads or 'external' worker.py processes
+    'RESUME_ON_BOOT': os.getenv('RESUME_ON_BOOT', '1') == '1',  # Resubmit jobs a crash or redeploy cut short when the app starts
+    'RESULT_CACHE_TTL': int(os.getenv('RESULT_CACHE_TTL', 7 * 24 * 3600)),  # Seconds a scraped CID is reused across collections and tags
+    'RESULT_CACHE_LRU_SIZE': 100000,  # CIDs kept in memory in front of the Mongo cache
+    'CACHE_LOOKUP_PAGE': 100,      # Claimed CIDs whose cache entries are loaded with one query
+    'WORKER_PROCESS_TIMEOUT': 30,  # Seconds without a heartbeat before a worker process is considered gone
     'PORT': int(os.getenv('PORT', 10000)),
     'MAX_WORKERS': max(1, min(4, multiprocessing.cpu_count() - 1)),  # 1-4 workers based on CPU cores
-    'STATUS_FILE': os.path.join(os.getcwd(), 'data', 'status.json'),
-    'FAILED_FILE': os.path.join(os.getcwd(), 'data', 'failed.json')
+    'WORKER_BUDGET': int(os.getenv('WORKER_BUDGET', max(1, min(4, multiprocessing.cpu_count() - 1)))),  # Worker slots shared by all running jobs
+    'SLOT_IDLE_SECONDS': 5,        # An idle worker slot gives back its browser/session and exits after this long
+    'TENANT_WEIGHTS': os.getenv('TENANT_WEIGHTS', ''),  # e.g. 'acme=2,globex=1'; tenants default to weight 1
+    'BROWSER_POOL_WARM': int(os.getenv('BROWSER_POOL_WARM', 0)),  # Browsers to pre-launch at startup
+    'BROWSER_MAX_USES': 200,       # Recycle a browser after this many CIDs
+    'BROWSER_MAX_RSS_MB': 1024,    # ...or once its process tree exceeds this much memory
+    'ASYNC_CONCURRENCY': 200,      # Default in-flight CIDs for async mode
+    'MAX_ASYNC_CONCURRENCY': 1000,
+    'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO'),
+    'LOG_FILE': os.getenv('LOG_FILE'),  # JSON log lines go to stdout unless a file is given
+    'PROFILE_DIR': os.path.join(os.getcwd(), 'data', 'profiles'),
+    'PROFILE_INTERVAL_MS': 10,     # Stack sampling interval for the 'sampling' profile mode
 }
 
 # Ensure data directory exists
 os.makedirs(os.path.join(os.getcwd(), 'data'), exist_ok=True)
 
+# Structured worker logs are handed to a background listener thread
+tracing.setup_logging(CONFIG['LOG_LEVEL'], CONFIG['LOG_FILE'])
+
 # === Global State ===
-should_pause = False
-should_stop = False
-active_workers = 0
-processing_active = False
-worker_threads = []
-current_collection_name = None
-failed_count = 0
-
-# Initialize MongoDB
+step_timings = {}
+step_timings_lock = threading.Lock()
+result_writers = {}
+result_caches = {}
+cache_lookups = weakref.WeakKeyDictionary()
+upload_progress = {}
+status_cache = StatusCache(CONFIG['STATUS_CACHE_TTL'])
+control_summaries = {}
+checkpoint_summaries = {}
+status_streams = threading.BoundedSemaphore(CONFIG['MAX_STATUS_STREAMS'])
+governor = RateGovernor(
+    rate=CONFIG['RATE_START'], min_rate=CONFIG['RATE_MIN'], max_rate=CONFIG['RATE_MAX'],
+    concurrency=CONFIG['CONCURRENCY_START'], min_concurrency=CONFIG['CONCURRENCY_MIN'],
+    max_concurrency=CONFIG['CONCURRENCY_MAX'], latency_target=CONFIG['LATENCY_TARGET']
+)
+connectivity = ConnectivityMonitor(
+    CONFIG['HEALTH_PROBE_URL'],
+    failure_threshold=CONFIG['CIRCUIT_FAILURE_THRESHOLD'],
+    backoff_max=CONFIG['PROBE_BACKOFF_MAX']
+)
+result_writers_lock = threading.Lock()
+
+# Prometheus metrics served on /metrics
+metrics_registry = metrics.Registry()
+CIDS_PROCESSED = metrics_registry.counter('cid_processed_total', 'CIDs scraped successfully', ['tenant', 'collection', 'source'])
+CIDS_FAILED = metrics_registry.counter('cid_failed_total', 'CIDs marked failed after their last attempt', ['tenant', 'collection'])
+CID_RETRIES = metrics_registry.counter('cid_retries_total', 'Failed attempts rescheduled for a retry', ['tenant', 'collection'])
+RESULT_WRITE_FAILURES = metrics_registry.counter('result_write_failures_total', 'Results the buffered writer gave up on; their CIDs were re-queued', ['tenant', 'collection'])
+BROWSER_LAUNCHES = metrics_registry.counter('browser_launches_total', 'Chrome instances started by the browser pool')
+BROWSER_RESTARTS = metrics_registry.counter('browser_restarts_total', 'Browsers recycled for use count, memory or a crash')
+ATTEMPT_SECONDS = metrics_registry.histogram('scrape_attempt_seconds', 'Duration of one portal attempt for a CID', ['engine'])
+STEP_SECONDS = metrics_registry.histogram('scrape_step_seconds', 'Duration of each browser scraping step', ['step'])
+BROWSER_RSS_MB = metrics_registry.histogram('browser_rss_megabytes', 'Memory of a pooled browser process tree after each CID', ['profile'],
+                                            buckets=(100, 150, 200, 300, 400, 500, 750, 1000, 1500, 2000))
+MONGO_WRITE_SECONDS = metrics_registry.histogram('mongo_write_seconds', 'Duration of buffered result bulk writes', ['tenant', 'collection'])
+ACTIVE_WORKERS = metrics_registry.gauge('active_workers', 'Worker slots (and async jobs) currently working on a CID')
+IN_FLIGHT = metrics_registry.gauge('cids_in_flight', 'CIDs currently being scraped across all jobs')
+ACTIVE_JOBS = metrics_registry.gauge('active_jobs', 'Jobs running or paused')
+WORKER_SLOTS = metrics_registry.gauge('worker_slots', 'Worker slot threads started by the scheduler')
+JOB_WORKERS = metrics_registry.gauge('job_active_workers', 'Worker slots currently granted to each job', ['tenant', 'collection'])
+QUEUE_DEPTH = metrics_registry.gauge('queue_depth', "CIDs with status 'new' waiting to be claimed", ['tenant', 'collection'])
+WRITE_QUEUE_DEPTH = metrics_registry.gauge('result_write_queue_depth', 'Results buffered but not yet written', ['tenant', 'collection'])
+RATE_LIMIT = metrics_registry.gauge('portal_rate_per_second', 'Current rate governor limit on portal attempts')
+CONCURRENCY_LIMIT = metrics_registry.gauge('portal_concurrency_limit', 'Current rate governor limit on concurrent portal attempts')
+PORTAL_UP = metrics_registry.gauge('portal_up', '1 while the connectivity circuit is closed, 0 during an outage')
+
+# Initialize MongoDB: one pooled client for the process, shared with the auth blueprint
 MONGO_URI = os.getenv('MONGO_URI')
 DB_NAME = os.getenv('DB_NAME')
-client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-db = client[DB_NAME]
+client = mongo_pool.get_client(MONGO_URI)
+db = mongo_pool.get_db(DB_NAME, MONGO_URI)
+
+# MongoDB's own databases; every other database on the server may be a tenant's
+SYSTEM_DATABASES = ('admin', 'config', 'local')
 
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 
+# Warm Chrome instances shared by all selenium jobs
+browser_pool = BrowserPool(
+    max_idle=CONFIG['MAX_WORKERS'],
+    max_uses=CONFIG['BROWSER_MAX_USES'],
+    max_rss_mb=CONFIG['BROWSER_MAX_RSS_MB'],
+    allowed_hosts=portal_hosts([CONFIG['URL'], CONFIG['HEALTH_PROBE_URL']])
+)
+atexit.register(browser_pool.shutdown)
+
 # === Helper Functions ===
-def get_collection(collection_name):
-    """Get a MongoDB collection by name"""
-    return db[collection_name]
+def get_collection(collection_name, database=None):
+    """Get a MongoDB collection by name (in the current database unless given)"""
+    return (database if database is not None else db)[collection_name]
 
-def load_status():
-    """Load scraping status from file"""
-    try:
-        if os.path.exists(CONFIG['STATUS_FILE']) and os.path.getsize(CONFIG['STATUS_FILE']) > 0:
-            with open(CONFIG['STATUS_FILE'], 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"⚠ Couldn't read status file: {str(e)}")
-    return {'last_processed': 0, 'total_processed': 0, 'total_failed': 0}
+def provision_collection(collection_name, database=None):
+    """Get a collection that is about to be written or claimed from, creating its indexes on first use.
 
-def save_status(status):
-    """Save scraping status to file"""
-    try:
-        with open(CONFIG['STATUS_FILE'], 'w') as f:
-            json.dump(status, f)
-    except Exception as e:
-        print(f"⚠ Couldn't save status file: {str(e)}")
+    Read-only paths use get_collection() so that looking at a name never creates the collection."""
+    collection = get_collection(collection_name, database)
+    ensure_indexes(collection)
+    return collection
 
-def load_failed_cids():
-    """Load failed CIDs from file"""
-    try:
-        if os.path.exists(CONFIG['FAILED_FILE']) and os.path.getsize(CONFIG['FAILED_FILE']) > 0:
-            with open(CONFIG['FAILED_FILE'], 'r') as f:
-                return set(json.load(f))
-    except Exception as e:
-        print(f"⚠ Couldn't read failed CIDs file: {str(e)}")
-    return set()
+def get_result_writer(collection_name, database=None):
+    """Shared buffered result writer for a collection"""
+    database = database if database is not None else db
+    key = (database.name, collection_name)
+    with result_writers_lock:
+        if key not in result_writers:
+            result_writers[key] = ResultWriter(
+                get_collection(collection_name, database),
+                flush_size=CONFIG['WRITE_BATCH_SIZE'],
+                flush_interval_ms=CONFIG['WRITE_FLUSH_MS'],
+                on_flush=status_cache.notify,
+                on_write=lambda seconds: MONGO_WRITE_SECONDS.observe(seconds, tenant=database.name, collection=collection_name),
+                on_error=lambda results, error: report_write_failure(database, collection_name, results, error)
+            )
+        return result_writers[key]
 
-def save_failed_cids(failed_cids):
-    """Save failed CIDs to file"""
-    try:
-        with open(CONFIG['FAILED_FILE'], 'w') as f:
-            json.dump(list(failed_cids), f)
-    except Exception as e:
-        print(f"⚠ Couldn't save failed CIDs file: {str(e)}")
+def submit_result(writer, doc, owner, update_data):
+    """Queue a claimed CID's outcome, with what report_write_failure() needs if the write is given up"""
+    writer.submit(work_queue.complete_op(doc['_id'], owner, update_data),
+                  {'_id': doc['_id'], 'cid': doc.get('cid'), 'owner': owner, 'status': update_data.get('status')})
+
+def report_write_failure(database, collection_name, results, error):
+    """ResultWriter callback for results it gave up on: put their CIDs back in the queue and uncount them from the job"""
+    collection = database[collection_name]
+    processed = failed = 0
+    for _, meta in results:
+        processed += meta['status'] == 'processed'
+        failed += meta['status'] == 'failed'
+        try:
+            work_queue.release(collection, meta['_id'], meta['owner'])
+        except Exception as e:
+            log_event(f"⚠ Couldn't re-queue CID {meta['cid']} after a failed write: {str(e)[:100]}", logging.WARNING)
+    job = scheduler.find(database.name, collection_name)
+    if job:
+        job.record_write_failure(processed, failed, error)
+    RESULT_WRITE_FAILURES.inc(len(results), tenant=database.name, collection=collection_name)
+    log_event(f"❌ {len(results)} results for {collection_name} could not be written and were re-queued: {error}",
+              logging.ERROR, event='result_write_failed', tenant=database.name, collection=collection_name,
+              results=len(results), error=error)
+
+def flush_result_writers():
+    """Write out every buffered result (on pause, stop and shutdown)"""
+    with result_writers_lock:
+        writers = list(result_writers.values())
+    for writer in writers:
+        writer.flush()
+
+def close_result_writers():
+    with result_writers_lock:
+        writers = list(result_writers.values())
+        result_writers.clear()
+    for writer in writers:
+        writer.close()
+
+def get_result_cache(database=None):
+    """Cross-collection result cache for a database (the current one unless given)"""
+    database = database if database is not None else db
+    with result_writers_lock:
+        if database.name not in result_caches:
+            result_caches[database.name] = ResultCache(database, CONFIG['RESULT_CACHE_TTL'], CONFIG['RESULT_CACHE_LRU_SIZE'])
+        return result_caches[database.name]
+
+def get_cache_lookup(job):
+    """Paged result cache lookups for the CIDs a job's worker slots claim one at a time"""
+    cache = get_result_cache(job.db)
+    with result_writers_lock:
+        if job not in cache_lookups:
+            cache_lookups[job] = PagedLookup(cache, CONFIG['CACHE_LOOKUP_PAGE'])
+        return cache_lookups[job]
+
+def close_result_caches():
+    with result_writers_lock:
+        caches = list(result_caches.values())
+        result_caches.clear()
+    for cache in caches:
+        cache.close()
+
+atexit.register(close_result_writers)
+atexit.register(close_result_caches)
 
 def convert_date_fields(doc):
     """Convert date fields to datetime for MongoDB storage"""
@@ -115,305 +294,658 @@ def convert_date_fields(doc):
         doc['processed_date'] = datetime.combine(doc['processed_date'], datetime.min.time())
     return doc
 
-def check_internet_connection():
-    """Check if internet connection is available"""
+def wait_for_portal(should_stop):
+    """Hold this worker while the shared connectivity circuit is open; True if stop was requested meanwhile"""
+    if connectivity.is_healthy():
+        return False
+    log_event("🌐 Waiting for the portal to become reachable...")
+    return not connectivity.wait_until_healthy(should_stop)
+
+def parse_tenant_weights(spec):
+    """'acme=2,globex=1' -> {'acme': 2.0, 'globex': 1.0}"""
+    weights = {}
+    for part in (spec or '').split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() and weight.strip():
+            weights[name.strip()] = max(float(weight), 0.01)
+    return weights
+
+def record_step(step, seconds):
+    """Accumulate how long a scraping step actually took"""
+    with step_timings_lock:
+        stats = step_timings.setdefault(step, {'count': 0, 'total': 0.0, 'max': 0.0})
+        stats['count'] += 1
+        stats['total'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+    STEP_SECONDS.observe(seconds, step=step)
+    tracing.record_span(step, seconds)
+
+def get_step_timings():
+    """Summarise recorded step latencies in milliseconds for /status"""
+    with step_timings_lock:
+        return {
+            step: {
+                'count': stats['count'],
+                'avg_ms': round(stats['total'] / stats['count'] * 1000, 1),
+                'max_ms': round(stats['max'] * 1000, 1)
+            }
+            for step, stats in step_timings.items()
+        }
+
+def consumption_table_json(driver):
+    """Wait condition: the whole consumptionData table as JSON, once it has a row after its header"""
+    return driver.execute_script(CONSUMPTION_TABLE_SCRIPT) or False
+
+def scrape_cid_selenium(driver, cid):
+    """Run the bill details form flow for one CID in the browser and return the monthly amounts"""
+    # Load page and wait for the form instead of a fixed sleep
+    started = time.monotonic()
+    driver.get(CONFIG['URL'])
+    WebDriverWait(driver, CONFIG['PAGE_LOAD_TIMEOUT']).until(
+        lambda d: d.execute_script("return document.readyState") != 'loading'
+    )
+    WebDriverWait(driver, CONFIG['PAGE_LOAD_TIMEOUT']).until(EC.presence_of_element_located((By.ID, 'ltscno')))
+    record_step('page_load', time.monotonic() - started)
+
+    # Enter CID
+    driver.find_element(By.ID, 'ltscno').send_keys(cid)
+
+    # Solve CAPTCHA
+    started = time.monotonic()
+    WebDriverWait(driver, CONFIG['PAGE_LOAD_TIMEOUT']).until(EC.presence_of_element_located((By.ID, 'Billquestion')))
+    captcha_text = driver.execute_script("return document.getElementById('Billquestion').innerText;").strip()
+    driver.find_element(By.ID, 'Billans').send_keys(captcha_text)
+    driver.find_element(By.ID, 'Billsignin').click()
+
+    # Either the CAPTCHA error alert or a clickable history button ends the sign-in step
     try:
-        requests.get(CONFIG['CHECK_INTERNET_URL'], timeout=5)
-        return True
-    except requests.ConnectionError:
+        outcome = WebDriverWait(driver, CONFIG['SIGNIN_TIMEOUT']).until(EC.any_of(
+            EC.alert_is_present(),
+            EC.element_to_be_clickable((By.ID, "historyDivbtn"))
+        ))
+    except TimeoutException:
+        raise Exception("CAPTCHA failed or no history button")
+    finally:
+        record_step('captcha_submit', time.monotonic() - started)
+
+    if isinstance(outcome, Alert):
+        alert_text = outcome.text
+        outcome.accept()
+        raise Exception(f"CAPTCHA validation failed: {alert_text}")
+
+    # Click History
+    started = time.monotonic()
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", outcome)
+    try:
+        outcome.click()
+    except ElementClickInterceptedException:
+        driver.execute_script("arguments[0].click();", outcome)
+
+    # Scrape data once the history rows are rendered; each poll pulls the full table in one call
+    try:
+        payload = WebDriverWait(driver, CONFIG['HISTORY_TIMEOUT']).until(consumption_table_json)
+    except TimeoutException:
+        raise Exception("No data rows found")
+    finally:
+        record_step('history_load', time.monotonic() - started)
+
+    # Collect (bill month, amount) pairs for April25, May25, June25 mapping
+    started = time.monotonic()
+    table_rows = parse_consumption_json(payload)
+    record_step('table_parse', time.monotonic() - started)
+    return build_monthly_amounts(table_rows)
+
+def scrape_cid_pooled(browser, cid):
+    """Scrape a CID with a pooled browser, recycling it once it reaches its use or memory limit or crashes"""
+    browser_pool.ensure_ready(browser)
+    started = time.monotonic()
+    error = None
+    try:
+        return scrape_cid_selenium(browser.driver, cid)
+    except WebDriverException as e:
+        error = e
+        raise
+    finally:
+        # Per-profile CID time and browser memory, to size how many workers fit in a container
+        browser_pool.mark_used(browser, time.monotonic() - started, error)
+        if browser.last_rss_mb is not None:
+            BROWSER_RSS_MB.observe(browser.last_rss_mb, profile=browser.profile)
+
+def scrape_cid_http(session, cid):
+    """Run the bill details form flow for one CID over plain HTTP"""
+    return http_engine.scrape_cid(session, cid, CONFIG['URL'],
+                                  history_url=CONFIG['HISTORY_URL'],
+                                  timeout=CONFIG['HTTP_TIMEOUT'])
+
+# Scraping engines selectable per job: how to create a worker's handle, scrape a CID with it and release it
+ENGINES = {
+    'selenium': {
+        'setup': browser_pool.acquire,
+        'scrape': scrape_cid_pooled,
+        'close': browser_pool.release
+    },
+    # Eager page loads, no images/fonts/media, third-party hosts blocked and a single renderer process
+    'selenium-lean': {
+        'setup': lambda: browser_pool.acquire('lean'),
+        'scrape': scrape_cid_pooled,
+        'close': browser_pool.release
+    },
+    'http': {
+        'setup': http_engine.create_session,
+        'scrape': scrape_cid_http,
+        'close': lambda session: session.close()
+    }
+}
+
+def process_cid(driver, cid, engine='selenium', should_stop=lambda: False):
+    """Make one attempt at a CID with the selected engine; failed attempts are rescheduled by the queue"""
+    scrape = ENGINES[engine]['scrape']
+    with tracing.span('portal_wait'):
+        if wait_for_portal(should_stop) or should_stop():
+            return None, None
+
+    # Every engine, worker and job shares one rate/concurrency budget toward the portal
+    with tracing.span('governor_wait'):
+        if not governor.acquire(should_stop):
+            return None, None
+    started = time.monotonic()
+    try:
+        monthly_amounts = scrape(driver, cid)
+    except Exception as e:
+        ATTEMPT_SECONDS.observe(time.monotonic() - started, engine=engine)
+        tracing.record_span('scrape', time.monotonic() - started, engine=engine, error=type(e).__name__)
+        governor.release(time.monotonic() - started, e)
+        connectivity.record_failure(e)
+        return None, str(e) or type(e).__name__
+    ATTEMPT_SECONDS.observe(time.monotonic() - started, engine=engine)
+    tracing.record_span('scrape', time.monotonic() - started, engine=engine)
+    governor.release(time.monotonic() - started)
+    connectivity.record_success()
+    return monthly_amounts, None  # Return data and no error
+
+def record_progress(job, batch_size=1):
+    """Fold a job's counters and newly failed CIDs into its checkpoint once `batch_size` CIDs have piled up"""
+    progress = job.take_progress(batch_size)
+    if progress:
+        write_progress(job, *progress)
+
+def write_progress(job, processed, failed_cids, unfailed=0):
+    try:
+        checkpoint.record(job.db, job.collection_name, processed, len(failed_cids) - unfailed, failed_cids)
+    except Exception as e:
+        log_event(f"⚠ Couldn't record progress for {job.collection_name}: {str(e)[:100]}", logging.WARNING,
+                  event='checkpoint_failed', job_id=job.id, collection=job.collection_name)
+    log_event(f"📊 Job {job.id} batch results: {processed} success, {len(failed_cids)} failed", event='batch',
+              job_id=job.id, collection=job.collection_name, processed=processed, failed=len(failed_cids))
+
+def finish_job(job, state='finished'):
+    """End a job; a drained queue also closes its checkpoint (a stop or crash leaves it resumable)"""
+    if not scheduler.complete(job, state):
         return False
+    get_result_writer(job.collection_name, job.db).flush()
+    record_progress(job)
+    if state == 'finished':
+        try:
+            checkpoint.set_state(job.db, job.collection_name, 'finished')
+        except Exception as e:
+            log_event(f"⚠ Couldn't close checkpoint for {job.collection_name}: {str(e)[:100]}", logging.WARNING)
+    status_cache.notify()
+    log_event(f"🏁 Job {job.id} {state} for collection {job.collection_name}", event='job_finished',
+              job_id=job.id, tenant=job.tenant, collection=job.collection_name, state=state,
+              processed=job.processed, failed=job.failed)
+    return True
 
-def wait_for_internet():
-    """Wait until internet connection is restored"""
-    print("🌐 Waiting for internet connection...")
-    while not check_internet_connection() and not should_stop:
-        time.sleep(5)
-    print("🌐 Internet connection restored")
-
-def check_pause():
-    """Check if pause was requested"""
-    global should_pause
-    if should_pause:
-        print("⏸ Scraping paused. Send resume request to continue")
-        while should_pause and not should_stop:
-            time.sleep(1)
-        if should_stop:
-            print("🛑 Stopping as requested during pause")
-            return True
-        print("▶ Resuming scraping...")
-    return False
-
-def clean_amount(amount_text):
-    """Clean and convert amount text to float"""
-    if not amount_text:
-        return None
-    
-    # Remove commas and any non-numeric characters except decimal point
-    cleaned = ''.join(c for c in amount_text if c.isdigit() or c == '.')
-    
+def build_failure_update(doc, error):
+    """Fields for a failed attempt: a delayed retry back in the queue, or 'failed' once attempts run out.
+
+    Returns (update, final) where final is True if the CID will not be retried."""
+    attempts = (doc.get('failed_attempts') or 0) + 1
+    reason = error[:500] if error else 'Unknown error'
+
+    if attempts >= CONFIG['MAX_RETRIES']:
+        return convert_date_fields({
+            'status': 'failed',
+            'error': reason,
+            'processed_date': datetime.now().date(),
+            'failed_attempts': attempts,
+            'fail_reason': reason,
+            'next_attempt_at': None
+        }), True
+
+    delay = work_queue.backoff_delay(attempts, CONFIG['RETRY_DELAY'], CONFIG['RETRY_MAX_DELAY'])
+    return {
+        'status': 'new',
+        'failed_attempts': attempts,
+        'fail_reason': reason,
+        'next_attempt_at': datetime.now() + timedelta(seconds=delay)
+    }, False
+
+def refresh_job_tags(job, collection):
+    """Reload which of a job's tags have new CIDs, and their priorities, at most every STATUS_CACHE_TTL seconds"""
+    if job.tags_refreshed_at is not None and time.monotonic() - job.tags_refreshed_at <= CONFIG['STATUS_CACHE_TTL']:
+        return
+    per_tag = status_cache.get(collection)['per_tag']
+    levels = priorities.get_priorities(job.db, job.collection_name)
+    tags = [tag for tag, counts in per_tag.items() if counts['new']]
+    job.set_tags(tags, {tag: levels.get(tag, priorities.DEFAULT_PRIORITY) for tag in tags})
+
+def slot_stack(slot):
+    """Resources a worker slot holds across CIDs and jobs, released together when the slot retires"""
+    if 'stack' not in slot.resources:
+        slot.resources['stack'] = ExitStack()
+        slot.resources['owner'] = work_queue.make_owner_id(f'slot{slot.id}')
+        slot.resources['handles'] = {}
+        slot.resources['heartbeats'] = {}
+    return slot.resources['stack']
+
+def close_engine(slot, engine, close, handle):
     try:
-        return float(cleaned) if cleaned else None
-    except ValueError:
-        return None
+        close(handle)
+        log_event(f"🚪 Slot {slot.id} {engine} engine released", logging.DEBUG, event='engine_released', worker_id=slot.id)
+    except Exception as e:
+        log_event(f"⚠ Error closing {engine} engine for slot {slot.id}: {str(e)}", logging.WARNING,
+                  event='engine_close_failed', worker_id=slot.id)
 
-def setup_browser():
-    """Configure and return a browser instance with proper options"""
-    options = ChromeOptions()
-    
-    # Configure browser options
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--headless=new')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1280,720')
-    
-    # Use unique temp directory for user data
-    temp_dir = tempfile.mkdtemp(prefix='chrome-')
-    options.add_argument(f'--user-data-dir={temp_dir}')
-    
-    # Set up the browser
-    driver = webdriver.Chrome(
-        service=ChromeService(ChromeDriverManager().install()),
-        options=options
-    )
-    
-    return driver
+def close_slot(slot):
+    """Scheduler callback for a retiring slot: stop its lease heartbeats, profiler and browser/sessions"""
+    stack = slot.resources.pop('stack', None)
+    if stack:
+        stack.close()
+    log_event(f"🏁 Worker slot {slot.id} retired", event='worker_finished', worker_id=slot.id)
 
-def process_cid(driver, cid):
-    """Process a single CID using Selenium"""
-    retries = 0
-    last_error = None
-    
-    while retries < CONFIG['MAX_RETRIES'] and not should_stop:
+def process_next(job, slot):
+    """Scheduler work callback: claim one CID of `job` under this slot's lease and scrape it.
+
+    Returns None once a CID was handled, or how many seconds to skip the job when it had nothing claimable."""
+    stack = slot_stack(slot)
+    owner = slot.resources['owner']
+    collection = provision_collection(job.collection_name, job.db)
+    writer = get_result_writer(job.collection_name, job.db)
+    cache = get_result_cache(job.db)
+    lookup = get_cache_lookup(job)
+
+    # A browser (or HTTP session) per engine stays with the slot from one job's CID to the next
+    handles = slot.resources['handles']
+    if job.engine not in handles:
         try:
-            if not check_internet_connection():
-                wait_for_internet()
-                if should_stop:
-                    return None, None
-            
-            driver.get(CONFIG['URL'])
-            time.sleep(2)
+            handles[job.engine] = ENGINES[job.engine]['setup']()
+        except Exception as e:
+            log_event(f"❌ Slot {slot.id} couldn't start the {job.engine} engine: {str(e)}", logging.ERROR,
+                      event='worker_crashed', worker_id=slot.id, job_id=job.id, collection=job.collection_name)
+            return CONFIG['SLOT_IDLE_SECONDS']
+        stack.callback(close_engine, slot, job.engine, ENGINES[job.engine]['close'], handles[job.engine])
+        log_event(f"👷 Slot {slot.id} started a {job.engine} engine", event='worker_started',
+                  worker_id=slot.id, job_id=job.id, collection=job.collection_name, engine=job.engine)
+    driver = handles[job.engine]
 
-            # Enter CID
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, 'ltscno')))
-            driver.find_element(By.ID, 'ltscno').send_keys(cid)
+    # Leases held by this slot are kept alive while it is busy on a slow CID
+    heartbeats = slot.resources['heartbeats']
+    if (job.tenant, job.collection_name) not in heartbeats:
+        heartbeat = work_queue.LeaseHeartbeat(collection, owner, CONFIG['LEASE_SECONDS'], CONFIG['LEASE_HEARTBEAT'])
+        heartbeat.start()
+        stack.callback(heartbeat.stop)
+        heartbeats[(job.tenant, job.collection_name)] = heartbeat
 
-            # Solve CAPTCHA
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, 'Billquestion')))
-            captcha_text = driver.execute_script("return document.getElementById('Billquestion').innerText;").strip()
-            driver.find_element(By.ID, 'Billans').send_keys(captcha_text)
-            driver.find_element(By.ID, 'Billsignin').click()
-            time.sleep(2)
+    if job.profile and 'profiler' not in slot.resources:
+        # Profiles the slot for the rest of its life, including CIDs of other jobs it picks up meanwhile
+        slot.resources['profiler'] = stack.enter_context(profiling.WorkerProfiler(
+            job.profile, CONFIG['PROFILE_DIR'], f'{job.collection_name}-slot{slot.id}',
+            interval=CONFIG['PROFILE_INTERVAL_MS'] / 1000))
 
-            # Check for CAPTCHA error alert
-            try:
-                alert = driver.switch_to.alert
-                alert_text = alert.text
-                alert.accept()
-                raise Exception(f"CAPTCHA validation failed: {alert_text}")
-            except:
-                pass
+    refresh_job_tags(job, collection)
 
-            # Click History
+    processed, failed_cid = False, None
+    job.begin_cid()
+    try:
+        # Atomically claim the next CID so no two workers ever hit the portal for the same one.
+        # The tag is chosen per CID, so a higher-priority tag takes over at the next claim
+        doc = None
+        tag = job.pick_tag(CONFIG['PRIORITY_AGING_SECONDS'])
+        if tag is not None:
+            doc = work_queue.claim_next(collection, owner, CONFIG['LEASE_SECONDS'], {'tag': tag})
+            if not doc:
+                job.snooze_tag(tag, CONFIG['STATUS_CACHE_TTL'])
+        if not doc:
+            doc = work_queue.claim_next(collection, owner, CONFIG['LEASE_SECONDS'])
+        if not doc:
+            # Delayed retries may still be pending (possibly still buffered, or about to be scheduled by CIDs in flight)
+            writer.flush()
+            retry_at = work_queue.next_retry_at(collection)
+            if retry_at is None and job.in_flight <= 1:
+                log_event(f"ℹ No more CIDs to process in collection {job.collection_name}",
+                          event='queue_drained', worker_id=slot.id, job_id=job.id, collection=job.collection_name)
+                finish_job(job)
+                return None
+            wait = (retry_at - datetime.now()).total_seconds() if retry_at else 1
+            return min(max(wait, 0.1), 5)
+
+        cid = doc['cid']
+        attempt = (doc.get('failed_attempts') or 0) + 1
+
+        # Every stage of this CID is timed into one structured trace record
+        with Trace(cid=cid, job_id=job.id, worker_id=slot.id, collection=job.collection_name, engine=job.engine, attempt=attempt) as trace:
             try:
-                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "historyDivbtn")))
-                driver.execute_script("window.scrollBy(0, 280)")
-                time.sleep(2)
-                driver.find_element(By.ID, "historyDivbtn").click()
-            except TimeoutException:
-                raise Exception("CAPTCHA failed or no history button")
-
-            # Scrape data
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "consumptionData")))
-            rows = driver.find_element(By.ID, "consumptionData").find_elements(By.TAG_NAME, "tr")[1:]
-            
-            if not rows:
-                raise Exception("No data rows found")
+                # A CID scraped recently for any collection or tag doesn't need the portal again
+                # Entries are loaded for a page of queued CIDs at a time, not with a query per CID
+                with trace.span('cache_lookup'):
+                    monthly_data = lookup.get(cid, lambda limit: work_queue.queued_after(collection, doc, limit))
+                    error, source = None, 'cache'
+                if monthly_data is None:
+                    source = 'portal'
+                    monthly_data, error = process_cid(driver, cid, job.engine, lambda: job.should_stop)
+                    if monthly_data is not None:
+                        cache.put(cid, monthly_data)
+                if monthly_data is None and error is None:
+                    # Stopped before the CID was attempted; give it back
+                    work_queue.release(collection, doc['_id'], owner)
+                    trace.finish('released', f"Slot {slot.id} released CID {cid} on stop")
+                    return None
 
-            # Prepare data dictionary for months April25, May25, June25
-            monthly_amounts = {}
-            amounts = []  # To store all amounts for calculating highest
-            
-            for row in rows:
-                cells = row.find_elements(By.TAG_NAME, "td")
-                if len(cells) < 4:
-                    continue
-                
-                bill_month = cells[1].text.strip().upper()
-                try:
-                    amount_text = cells[3].find_element(By.TAG_NAME, "input").get_attribute("value").strip()
-                except NoSuchElementException:
-                    amount_text = cells[3].text.strip()
-                
-                amount = clean_amount(amount_text)
-                
-                # Map bill months to our field names
-                if 'APR' in bill_month or 'APRIL' in bill_month:
-                    monthly_amounts['April25'] = amount
-                elif 'MAY' in bill_month:
-                    monthly_amounts['May25'] = amount
-                elif 'JUN' in bill_month or 'JUNE' in bill_month:
-                    monthly_amounts['June25'] = amount
-                
-                if amount is not None:
-                    amounts.append(amount)
+                if monthly_data is not None:
+                    # Prepare update data with month-wise amounts
+                    update_data = {
+                        'status': 'processed',
+                        'processed_date': datetime.now().date(),
+                        'failed_attempts': 0,  # Reset attempts on success
+                        'fail_reason': None,   # Clear fail reason
+                        'next_attempt_at': None,
+                        **monthly_data  # Add April25, May25, June25, Highest fields directly
+                    }
 
-            # Calculate Highest amount among the three months
-            if amounts:
-                monthly_amounts['Highest'] = max(amounts)
+                    update_data = convert_date_fields(update_data)
 
-            return monthly_amounts, None  # Return data and no error
+                    submit_result(writer, doc, owner, update_data)
+                    processed = True
+                    CIDS_PROCESSED.inc(tenant=job.tenant, collection=job.collection_name, source=source)
+                    trace.finish('processed', f"✅ Slot {slot.id} processed CID {cid}", source=source,
+                                 **{field: monthly_data.get(field) for field in ('April25', 'May25', 'June25', 'Highest')})
+                else:
+                    # Schedule a retry (or mark failed) and move straight on to the next CID
+                    update_data, final = build_failure_update(doc, error)
+                    submit_result(writer, doc, owner, update_data)
+                    if final:
+                        failed_cid = cid
+                        CIDS_FAILED.inc(tenant=job.tenant, collection=job.collection_name)
+                        trace.finish('failed', f"❌ Slot {slot.id} failed to process CID {cid} after {attempt} attempts",
+                                     logging.WARNING, error=error[:200] if error else 'Unknown error')
+                    else:
+                        CID_RETRIES.inc(tenant=job.tenant, collection=job.collection_name)
+                        trace.finish('retry', f"🔁 Slot {slot.id} scheduled retry {attempt}/{CONFIG['MAX_RETRIES']} for CID {cid}",
+                                     error=error[:200] if error else 'Unknown error',
+                                     next_attempt_at=update_data['next_attempt_at'])
 
-        except Exception as e:
-            retries += 1
-            last_error = str(e)
-            print(f"⚠ Attempt {retries}/{CONFIG['MAX_RETRIES']} failed for CID {cid}: {last_error[:100]}")
-            if retries < CONFIG['MAX_RETRIES'] and not should_stop:
-                time.sleep(CONFIG['RETRY_DELAY'])
-    
-    # If we get here, all attempts failed
-    return None, last_error
+            except Exception as e:
+                update_data, final = build_failure_update(doc, str(e))
+                submit_result(writer, doc, owner, update_data)
+                if final:
+                    failed_cid = cid
+                    CIDS_FAILED.inc(tenant=job.tenant, collection=job.collection_name)
+                else:
+                    CID_RETRIES.inc(tenant=job.tenant, collection=job.collection_name)
+                trace.finish('failed' if final else 'retry', f"❌ Slot {slot.id} encountered unexpected error processing CID {cid}",
+                             logging.ERROR, error=str(e)[:200])
+        return None
+    finally:
+        job.end_cid(processed, failed_cid)
+        # Checkpoint every BATCH_SIZE CIDs; once the job has ended, write out whatever is left
+        if job.active:
+            record_progress(job, CONFIG['BATCH_SIZE'])
+        else:
+            writer.flush()
+            record_progress(job)
 
-def worker_thread(worker_id, collection_name):
-    """Worker function that runs the scraping process for a batch of CIDs"""
-    global should_pause, should_stop, active_workers, failed_count
-    
-    driver = None
+async def process_cid_async(connector, cid, should_stop=lambda: False):
+    """Make one async HTTP attempt at a CID; failed attempts are rescheduled by the queue like process_cid"""
+    # Every in-flight CID waits on the same shared circuit instead of probing on its own
+    with tracing.span('portal_wait'):
+        while not connectivity.is_healthy() and not should_stop():
+            await asyncio.sleep(1)
+    if should_stop():
+        return None, None
+
+    with tracing.span('governor_wait'):
+        if not await governor.acquire_async(should_stop):
+            return None, None
+    started = time.monotonic()
     try:
-        # Setup browser for this worker with proper configuration
-        driver = setup_browser()
-        
-        print(f"👷 Worker {worker_id} started for collection {collection_name}")
-        
-        # Get the collection for this worker
-        collection = get_collection(collection_name)
-        
-        # Load existing status and failed CIDs
-        status = load_status()
-        failed_cids = load_failed_cids()
-        
-        # Get all CIDs in the collection
-        all_cids = [doc['cid'] for doc in collection.find({}, {'cid': 1})]
-        total_cids = len(all_cids)
-        
-        while not should_stop:
-            if check_pause():
-                should_stop = True
-                break
-                
-            # Get next batch of CIDs to process
-            batch_start = status['last_processed']
-            batch_end = min(batch_start + CONFIG['BATCH_SIZE'], total_cids)
-            
-            if batch_start >= total_cids:
-                print(f"ℹ Worker {worker_id}: No more CIDs to process in collection {collection_name}")
-                break
-            
-            batch_cids = all_cids[batch_start:batch_end]
-            print(f"👷 Worker {worker_id} processing batch of {len(batch_cids)} CIDs ({batch_start+1}-{batch_end} of {total_cids})")
-            
-            processed_ids = []
-            failed_ids = []
-            
-            for cid in batch_cids:
-                if should_stop:
-                    break
-                    
-                # Skip already processed or failed CIDs
-                if cid in failed_cids:
-                    continue
-                
-                # Get the document from MongoDB
-                doc = collection.find_one({'cid': cid})
-                if not doc:
-                    continue
-                
-                # Skip if already processed
-                if doc.get('status') == 'processed':
-                    continue
-                
-                print(f"🔍 Worker {worker_id} processing CID {cid}")
-                
-                try:
-                    monthly_data, error = process_cid(driver, cid)
+        monthly_amounts = await async_engine.scrape_cid(connector, cid, CONFIG['URL'],
+                                                        history_url=CONFIG['HISTORY_URL'],
+                                                        timeout=CONFIG['HTTP_TIMEOUT'])
+    except Exception as e:
+        ATTEMPT_SECONDS.observe(time.monotonic() - started, engine='async')
+        tracing.record_span('scrape', time.monotonic() - started, engine='async', error=type(e).__name__)
+        governor.release(time.monotonic() - started, e)
+        connectivity.record_failure(e)
+        return None, str(e) or type(e).__name__
+    ATTEMPT_SECONDS.observe(time.monotonic() - started, engine='async')
+    tracing.record_span('scrape', time.monotonic() - started, engine='async')
+    governor.release(time.monotonic() - started)
+    connectivity.record_success()
+    return monthly_amounts, None
+
+async def run_async_job(job):
+    """Run hundreds of CID lookups concurrently on one event loop, at most `concurrency` in flight"""
+    collection = provision_collection(job.collection_name, job.db)
+    owner = work_queue.make_owner_id(f'async-{job.id}')
+    heartbeat = work_queue.LeaseHeartbeat(collection, owner, CONFIG['LEASE_SECONDS'], CONFIG['LEASE_HEARTBEAT'])
+    heartbeat.start()
+
+    # Results leave the event loop through the buffered writer's own thread
+    writer = get_result_writer(job.collection_name, job.db)
+    cache = get_result_cache(job.db)
+    cached = {}
+
+    concurrency = job.concurrency
+    connector = async_engine.create_connector(concurrency)
+    tasks = set()
+
+    async def handle(doc):
+        attempt = (doc.get('failed_attempts') or 0) + 1
+        processed, failed_cid = False, None
+        job.begin_cid()
+        try:
+            # Each task runs in its own context, so the trace stays with this CID across awaits
+            with Trace(cid=doc['cid'], job_id=job.id, worker_id='async', collection=job.collection_name, engine='async', attempt=attempt) as trace:
+                monthly_data, error, source = cached.pop(doc['cid'], None), None, 'cache'
+                if monthly_data is None:
+                    source = 'portal'
+                    monthly_data, error = await process_cid_async(connector, doc['cid'], lambda: job.should_stop)
                     if monthly_data is not None:
-                        # Prepare update data with month-wise amounts
-                        update_data = {
-                            'status': 'processed',
-                            'processed_date': datetime.now().date(),
-                            'failed_attempts': 0,  # Reset attempts on success
-                            'fail_reason': None,   # Clear fail reason
-                            **monthly_data  # Add April25, May25, June25, Highest fields directly
-                        }
-
-                        update_data = convert_date_fields(update_data)
-
-                        collection.update_one(
-                            {'_id': doc['_id']},
-                            {'$set': update_data}
-                        )
-                        processed_ids.append(doc['_id'])
-                        print(f"✅ Worker {worker_id} processed CID {cid} - April25: {monthly_data.get('April25', 'N/A')}, May25: {monthly_data.get('May25', 'N/A')}, June25: {monthly_data.get('June25', 'N/A')}, Highest: {monthly_data.get('Highest', 'N/A')}")
+                        cache.put(doc['cid'], monthly_data)
+                if monthly_data is None and error is None:
+                    # Stopped before the CID was attempted; give it back
+                    await asyncio.to_thread(work_queue.release, collection, doc['_id'], owner)
+                    trace.finish('released', f"Async job released CID {doc['cid']} on stop")
+                    return
+                if monthly_data is not None:
+                    submit_result(writer, doc, owner, convert_date_fields({
+                        'status': 'processed',
+                        'processed_date': datetime.now().date(),
+                        'failed_attempts': 0,
+                        'fail_reason': None,
+                        'next_attempt_at': None,
+                        **monthly_data
+                    }))
+                    processed = True
+                    CIDS_PROCESSED.inc(tenant=job.tenant, collection=job.collection_name, source=source)
+                    trace.finish('processed', f"✅ Async job processed CID {doc['cid']}", source=source,
+                                 **{field: monthly_data.get(field) for field in ('April25', 'May25', 'June25', 'Highest')})
+                else:
+                    update_data, final = build_failure_update(doc, error)
+                    submit_result(writer, doc, owner, update_data)
+                    if final:
+                        failed_cid = doc['cid']
+                        CIDS_FAILED.inc(tenant=job.tenant, collection=job.collection_name)
                     else:
-                        # Update document with failure info
-                        failed_cids.add(cid)
-                        collection.update_one(
-                            {'_id': doc['_id']},
-                            {'$set': {
-                                'status': 'failed',
-                                'error': error[:500] if error else 'Unknown error',
-                                'processed_date': datetime.now().date(),
-                                'failed_attempts': CONFIG['MAX_RETRIES'],
-                                'fail_reason': error[:500] if error else 'Unknown error'
-                            }}
-                        )
-                        
-                        failed_ids.append(doc['_id'])
-                        failed_count += 1  # Increment global failed count
-                        print(f"❌ Worker {worker_id} failed to process CID {cid} after {CONFIG['MAX_RETRIES']} attempts: {error[:100] if error else 'Unknown error'}...")
-                        
-                except Exception as e:
-                    print(f"❌ Worker {worker_id} encountered unexpected error processing CID {cid}: {str(e)[:100]}...")
-                    failed_cids.add(cid)
-                    collection.update_one(
-                        {'_id': doc['_id']},
-                        {'$set': {
-                            'status': 'failed',
-                            'error': str(e)[:500],
-                            'processed_date': datetime.now().date(),
-                            'failed_attempts': CONFIG['MAX_RETRIES'],  # Mark as max attempts
-                            'fail_reason': str(e)[:500]
-                        }}
-                    )
-                    failed_ids.append(doc['_id'])
-                    failed_count += 1
-            
-            # Update status after batch processing
-            status['last_processed'] = batch_end
-            status['total_processed'] = (status.get('total_processed', 0) + len(processed_ids))
-            status['total_failed'] = failed_count
-            save_status(status)
-            
-            # Save failed CIDs
-            save_failed_cids(failed_cids)
-            
-            print(f"📊 Worker {worker_id} batch results: {len(processed_ids)} success, {len(failed_ids)} failed")
-            
-            # Small delay between batches
-            time.sleep(2)
-        
-        print(f"🏁 Worker {worker_id} finished for collection {collection_name}")
-        
+                        CID_RETRIES.inc(tenant=job.tenant, collection=job.collection_name)
+                    trace.finish('failed' if final else 'retry', f"Async job attempt {attempt} failed for CID {doc['cid']}",
+                                 logging.WARNING if final else logging.INFO, error=error[:200])
+        finally:
+            job.end_cid(processed, failed_cid)
+        progress = job.take_progress(CONFIG['BATCH_SIZE'])
+        if progress:
+            await asyncio.to_thread(write_progress, job, *progress)
+
+    try:
+        while not job.should_stop:
+            if job.should_pause:
+                await asyncio.to_thread(writer.flush)
+                while job.should_pause:
+                    await asyncio.sleep(1)
+                continue
+
+            # Only claim what can start now, so a higher-priority tag is picked up as soon as CIDs finish
+            free = concurrency - len(tasks)
+            if free < max(1, concurrency // 10):
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            # Claim the next page of CIDs under this job's lease, from the tag whose turn it is
+            await asyncio.to_thread(refresh_job_tags, job, collection)
+            page = []
+            tag = job.pick_tag(CONFIG['PRIORITY_AGING_SECONDS'])
+            if tag is not None:
+                page = await asyncio.to_thread(
+                    work_queue.claim_batch, collection, owner, free, CONFIG['LEASE_SECONDS'], {'tag': tag}
+                )
+                if not page:
+                    job.snooze_tag(tag, CONFIG['STATUS_CACHE_TTL'])
+            if not page:
+                page = await asyncio.to_thread(
+                    work_queue.claim_batch, collection, owner, free, CONFIG['LEASE_SECONDS']
+                )
+            if not page:
+                # Wait for delayed retries (and in-flight CIDs that may schedule more) before finishing
+                await asyncio.to_thread(writer.flush)
+                retry_at = await asyncio.to_thread(work_queue.next_retry_at, collection)
+                if retry_at is None and not tasks:
+                    log_event(f"ℹ Async job: No more CIDs to process in collection {job.collection_name}")
+                    break
+                wait = (retry_at - datetime.now()).total_seconds() if retry_at else 1
+                await asyncio.sleep(min(max(wait, 0.1), 5))
+                continue
+
+            # One cache lookup per page; hits skip the portal entirely
+            cached.update(await asyncio.to_thread(cache.get_many, [doc['cid'] for doc in page]))
+
+            for doc in page:
+                task = asyncio.create_task(handle(doc))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await connector.close()
+        await asyncio.to_thread(writer.flush)
+        await asyncio.to_thread(record_progress, job)
+        heartbeat.stop()
+
+def async_processing_thread(job):
+    """Thread entry point that owns the event loop for an async job"""
+    log_event(f"⚡ Async job {job.id} started for collection {job.collection_name} with concurrency {job.concurrency}",
+              event='job_started', job_id=job.id, collection=job.collection_name, concurrency=job.concurrency)
+    state = 'failed'
+    try:
+        if job.profile:
+            with profiling.WorkerProfiler(job.profile, CONFIG['PROFILE_DIR'], f'{job.collection_name}-async',
+                                          interval=CONFIG['PROFILE_INTERVAL_MS'] / 1000):
+                asyncio.run(run_async_job(job))
+        else:
+            asyncio.run(run_async_job(job))
+        state = 'finished'
     except Exception as e:
-        print(f"❌ Worker {worker_id} failed with error: {str(e)}")
+        log_event(f"❌ Async job {job.id} failed with error: {str(e)}", logging.ERROR,
+                  event='job_failed', job_id=job.id, collection=job.collection_name, error=str(e))
     finally:
-        active_workers -= 1
-        if driver:
-            try:
-                driver.quit()
-                print(f"🚪 Worker {worker_id} browser closed")
-            except Exception as e:
-                print(f"⚠ Error closing browser for worker {worker_id}: {str(e)}")
+        # A no-op if the job was stopped; a crash leaves the checkpoint resumable
+        finish_job(job, state)
+        scheduler.release(job)
+
+def open_job(job, resume=True):
+    """Checkpoint a job, return its stranded CIDs to the queue and publish it to worker processes"""
+    # Continue the counters of a run that was cut short (crash, redeploy, pause, stop); otherwise start from zero
+    saved = checkpoint.begin(job.db, job.collection_name, resume=resume, state=job.state, job_id=job.id,
+                             engine=job.engine, mode=job.mode, workers=job.workers, concurrency=job.concurrency,
+                             weight=job.weight, profile=job.profile)
+    checkpoint_summaries.pop((job.tenant, job.collection_name), None)
+    if saved.get('resumes'):
+        log_event(f"↩ Resuming {job.collection_name} from checkpoint: {saved['last_processed']} CIDs already done")
+    
+    # Return CIDs stranded by crashed workers to the queue
+    reclaimed = work_queue.reclaim_expired(provision_collection(job.collection_name, job.db))
+    if reclaimed:
+        log_event(f"♻ Reclaimed {reclaimed} CIDs with expired leases in {job.collection_name}")
+    
+    # Publish the job through its control document so worker processes pick it up as well
+    job_control.set_state(job.db, job.collection_name, job.state, engine=job.engine, mode=job.mode,
+                          workers=job.workers, profile=job.profile)
+    return saved
+
+def resume_unfinished(database):
+    """Resubmit the jobs a crash or redeploy cut short, with their checkpointed settings; paused ones stay paused"""
+    try:
+        unfinished = checkpoint.unfinished(database)
+    except Exception as e:
+        log_event(f"⚠ Couldn't read unfinished jobs from {database.name}: {str(e)}", logging.WARNING)
+        return []
+    resumed = []
+    for saved in unfinished:
+        collection_name = saved['_id']
+        running = scheduler.find(database.name, collection_name)
+        if running and running.active:
+            continue
+        try:
+            job = Job(database, collection_name, saved.get('engine') or CONFIG['DEFAULT_ENGINE'],
+                      mode=saved.get('mode') or 'threads',
+                      workers=max(1, min(saved.get('workers') or CONFIG['MAX_WORKERS'], scheduler.budget)),
+                      concurrency=saved.get('concurrency') or CONFIG['ASYNC_CONCURRENCY'],
+                      weight=saved.get('weight') or 1, profile=saved.get('profile'))
+            job.state = saved['state']
+            open_job(job)
+            start_job(job)
+        except Exception as e:
+            log_event(f"⚠ Couldn't resubmit {collection_name}: {str(e)}", logging.WARNING)
+            continue
+        log_event(f"↩ Resubmitted {job.state} job on {collection_name} after a restart",
+                  event='job_resubmitted', job_id=job.id, tenant=database.name, collection=collection_name, state=job.state)
+        resumed.append(job)
+    return resumed
+
+def resume_all_tenants(mongo_client):
+    """resume_unfinished() for every tenant database that keeps job checkpoints"""
+    try:
+        names = [name for name in mongo_client.list_database_names() if name not in SYSTEM_DATABASES]
+    except Exception as e:
+        log_event(f"⚠ Couldn't list tenant databases: {str(e)}", logging.WARNING)
+        return []
+    resumed = []
+    for name in names:
+        database = mongo_client[name]
+        try:
+            if checkpoint.CHECKPOINT_COLLECTION not in database.list_collection_names():
+                continue
+        except Exception as e:
+            log_event(f"⚠ Couldn't read collections of {name}: {str(e)}", logging.WARNING)
+            continue
+        resumed.extend(resume_unfinished(database))
+    return resumed
+
+def start_job(job):
+    """Hand a job to the scheduler; an async job also gets its own event loop thread"""
+    # A browser job starts gently; HTTP and async jobs don't have to climb up from the browser pace
+    start = CONFIG['GOVERNOR_START'].get('async' if job.mode == 'async' else job.engine)
+    if start:
+        governor.warm_start(*start)
+    scheduler.submit(job)
+    if job.mode == 'async':
+        threading.Thread(target=async_processing_thread, args=(job,), name=f'async-{job.id}', daemon=True).start()
+    return job
+
+# Every job's worker threads come out of one budget, shared fairly between tenants, jobs and tags
+scheduler = Scheduler(CONFIG['WORKER_BUDGET'], process_next, close_slot=close_slot,
+                      idle_timeout=CONFIG['SLOT_IDLE_SECONDS'],
+                      tenant_weights=parse_tenant_weights(CONFIG['TENANT_WEIGHTS']))
 
 # === API Endpoints ===
 @app.route('/send-dbname', methods=['POST'])
@@ -421,10 +953,18 @@ def get_user_db():
     """Get the user database collection"""
     return get_userdb('user_db')
 
+def select_database(db_name):
+    """Point the app at a tenant's database; handles are cached on the shared client, so this never reconnects"""
+    global DB_NAME, db
+    db = mongo_pool.get_db(db_name, MONGO_URI)
+    DB_NAME = db_name
+    log_event(f"✅ Database set to: {DB_NAME}")
+
+# Login selects the tenant database in-process instead of calling /set-db over HTTP
+app.config['SELECT_DATABASE'] = select_database
+
 @app.route('/set-db', methods=['POST'])
 def set_db():
-    global DB_NAME, db, client
-
     data = request.get_json()
     db_name = data.get('db_name')
 
@@ -432,209 +972,549 @@ def set_db():
         return jsonify({'error': 'Database name is required'}), 400
 
     try:
-        MONGO_URI = os.getenv('MONGO_URI')
-        client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-        db = client[db_name]
-        DB_NAME = db_name
-        print(f"✅ Database set to: {DB_NAME}")
+        select_database(db_name)
         return jsonify({'message': f'Database set to {DB_NAME}'}), 200
     except Exception as e:
         return jsonify({'error': f'Failed to connect to database: {str(e)}'}), 500
 
+def upsert_cids(collection, docs):
+    """Insert CID documents that don't exist yet for their collection/tag; returns how many were inserted"""
+    inserted = 0
+    for start in range(0, len(docs), CONFIG['UPLOAD_CHUNK_SIZE']):
+        operations = [
+            UpdateOne(
+                {'collection': doc['collection'], 'tag': doc['tag'], 'cid': doc['cid']},
+                {'$setOnInsert': doc},
+                upsert=True
+            )
+            for doc in docs[start:start + CONFIG['UPLOAD_CHUNK_SIZE']]
+        ]
+        try:
+            inserted += collection.bulk_write(operations, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # Concurrent uploads of the same CID race on the unique index; those count as skipped
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+            inserted += e.details.get('nUpserted', 0)
+    return inserted
+
 @app.route('/upload', methods=['POST'])
 def upload_excel():
     file = request.files.get('file')
     tag = request.form.get('tag', 'default')
     collection_name = request.form.get('collection', 'default_collection')
+    priority = request.form.get('priority')
     
     if not file:
         return jsonify({'error': 'No file uploaded'}), 400
+    try:
+        priority = priorities.parse_priority(priority) if priority else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
         # Get or create the specified collection
-        collection = get_collection(collection_name)
+        collection = provision_collection(collection_name)
+        cache = get_result_cache()
+        
+        # Stream the sheet (or CSV) and write fixed-size chunks as we go
+        started = time.monotonic()
+        rows_read, cid_rows, inserted, from_cache = 0, 0, 0, 0
+        progress = upload_progress[(db.name, collection_name)] = {
+            'tag': tag, 'file': file.filename, 'rows': 0, 'inserted': 0, 'from_cache': 0, 'rows_per_sec': 0.0, 'done': False
+        }
         
-        # Read Excel file
-        wb = openpyxl.load_workbook(file)
-        ws = wb.active
-        cids = []
-
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            cid = row[0]
-            if cid:
-                doc = {
-                    'cid': str(cid).strip(),
+        for rows_read, cid_rows, chunk in ingest.iter_cid_chunks(file.stream, file.filename,
+                                                                 CONFIG['UPLOAD_CHUNK_SIZE'], file.mimetype):
+            if chunk:
+                now = datetime.now()
+                docs = [{
+                    'cid': cid,
                     'status': 'new',
                     'April25': None,
                     'May25': None,
                     'June25': None,
                     'Highest': None,
-                    'date_added': datetime.now(),
+                    'history': None,
+                    'date_added': now,
                     'tag': tag,
                     'collection': collection_name,
                     'failed_attempts': 0,  # Initialize attempt count
                     'fail_reason': None    # Initialize fail reason
-                }
-                cids.append(doc)
-
-        if cids:
-            # Get existing CIDs to avoid duplicates
-            existing_cids = set(doc['cid'] for doc in collection.find(
-                {'tag': tag, 'collection': collection_name}, 
-                {'cid': 1}
-            ))
-            
-            # Filter out duplicates
-            new_docs = [doc for doc in cids if doc['cid'] not in existing_cids]
+                } for cid in chunk]
+                
+                # CIDs scraped recently (for any collection or tag) arrive already processed
+                hits = cache.get_many(chunk)
+                for doc in docs:
+                    if doc['cid'] in hits:
+                        doc.update(status='processed', processed_date=datetime.combine(now.date(), datetime.min.time()),
+                                   **hits[doc['cid']])
+                from_cache += len(hits)
+                inserted += upsert_cids(collection, docs)
             
-            if new_docs:
-                collection.insert_many(new_docs)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            progress.update(rows=rows_read, inserted=inserted, from_cache=from_cache, rows_per_sec=round(rows_read / elapsed, 1))
+        
+        progress['done'] = True
+        status_cache.invalidate(collection)
+        if priority is not None:
+            priorities.set_priority(db, collection_name, tag, priority)
+        refresh_tags_now(collection_name)
+        elapsed = time.monotonic() - started
+        log_event(f"📥 Uploaded {rows_read} rows to {collection_name} in {elapsed:.1f}s ({progress['rows_per_sec']} rows/s)",
+                  event='upload', tenant=db.name, collection=collection_name, rows=rows_read, inserted=inserted)
+
+        if cid_rows:
+            if inserted:
                 return jsonify({
-                    'inserted': len(new_docs), 
-                    'skipped': len(cids) - len(new_docs),
+                    'inserted': inserted, 
+                    'skipped': cid_rows - inserted,
+                    'from_cache': from_cache,
                     'tag': tag,
-                    'collection': collection_name
+                    'priority': priority,
+                    'collection': collection_name,
+                    'rows': rows_read,
+                    'rows_per_sec': progress['rows_per_sec']
                 })
             else:
                 return jsonify({
                     'inserted': 0,
-                    'skipped': len(cids),
+                    'skipped': cid_rows,
                     'message': 'All CIDs already exist in database',
                     'tag': tag,
-                    'collection': collection_name
+                    'collection': collection_name,
+                    'rows': rows_read,
+                    'rows_per_sec': progress['rows_per_sec']
                 })
 
         return jsonify({'message': 'No CID records found in the file'}), 204
 
     except Exception as e:
+        if (db.name, collection_name) in upload_progress:
+            upload_progress[(db.name, collection_name)].update(done=True, error=str(e))
         return jsonify({'error': str(e)}), 500
 
+def refresh_tags_now(collection_name):
+    """Have a running job re-read its tags and priorities, so a change applies from its next claim"""
+    job = scheduler.find(db.name, collection_name)
+    if job and job.active:
+        job.tags_refreshed_at = None
+
+@app.route('/priorities', methods=['GET'])
+def get_tag_priorities():
+    """Claim priority of every tag in a collection (unset tags run at 'normal')"""
+    try:
+        collection_name = request.args.get('collection') or default_collection()
+        levels = priorities.get_priorities(db, collection_name)
+        tags = set(status_cache.get(get_collection(collection_name))['tags']) | set(levels)
+        return jsonify({
+            'collection': collection_name,
+            'priorities': {tag: levels.get(tag, priorities.DEFAULT_PRIORITY) for tag in sorted(tags, key=str)},
+            'levels': priorities.LEVELS
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/priorities', methods=['POST'])
+def set_tag_priority():
+    """Set a tag's claim priority; running jobs switch to it from their next claimed CID"""
+    data = request.get_json(silent=True) or {}
+    collection_name = data.get('collection') or default_collection()
+    tag = data.get('tag')
+    if not tag:
+        return jsonify({'error': 'Tag is required'}), 400
+    try:
+        priority = priorities.parse_priority(data.get('priority'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        priorities.set_priority(db, collection_name, tag, priority)
+        refresh_tags_now(collection_name)
+        return jsonify({
+            'message': f'Priority of tag {tag} in {collection_name} set to {priority}',
+            'collection': collection_name,
+            'tag': tag,
+            'priority': priority
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/progress', methods=['GET'])
+def get_upload_progress():
+    """Progress of the latest (or running) upload into a collection"""
+    collection_name = request.args.get('collection', 'default_collection')
+    progress = upload_progress.get((db.name, collection_name))
+    if progress is None:
+        return jsonify({'error': f'No upload recorded for collection {collection_name}'}), 404
+    return jsonify({'collection': collection_name, **progress})
+
 @app.route('/start', methods=['POST'])
 def start_processing():
-    global worker_threads, should_stop, should_pause, active_workers, processing_active, current_collection_name, failed_count
-    
-    if processing_active:
-        return jsonify({'message': 'Processing is already running'}), 200
-    
     try:
         # Get parameters from request
         data = request.get_json()
         num_workers = data.get('workers', CONFIG['MAX_WORKERS'])
         collection_name = data.get('collection', 'default_collection')
+        engine = data.get('engine', CONFIG['DEFAULT_ENGINE'])
+        mode = data.get('mode', 'threads')
+        resume = data.get('resume', True)
+        weight = data.get('weight', 1)
+        profile = data.get('profile') or None
+        if profile is True:
+            profile = 'cprofile'
         
-        # Limit workers based on configuration
-        num_workers = max(1, min(num_workers, CONFIG['MAX_WORKERS']))
+        if mode not in ('threads', 'async'):
+            return jsonify({'error': f"Unknown mode '{mode}'. Available modes: threads, async"}), 400
+        if profile and profile not in profiling.MODES:
+            return jsonify({'error': f"Unknown profile mode '{profile}'. Available modes: {', '.join(profiling.MODES)}"}), 400
+        if engine not in ENGINES:
+            return jsonify({'error': f"Unknown engine '{engine}'. Available engines: {', '.join(ENGINES)}"}), 400
         
-        should_stop = False
-        should_pause = False
-        processing_active = True
-        active_workers = num_workers
-        current_collection_name = collection_name
-        failed_count = 0  # Reset failed count when starting new processing
+        # Other collections (and other tenants) run alongside; only the same collection twice is refused
+        running = scheduler.find(db.name, collection_name)
+        if running and running.active:
+            return jsonify({
+                'message': f'Processing is already running on collection {collection_name}',
+                'job_id': running.id,
+                'collection': collection_name
+            }), 200
         
-        # Initialize status
-        save_status({
-            'last_processed': 0,
-            'total_processed': 0,
-            'total_failed': 0
-        })
+        # A job never holds more than this many slots of the shared worker budget at once
+        num_workers = max(1, min(num_workers, scheduler.budget))
+        concurrency = max(1, min(int(data.get('concurrency', CONFIG['ASYNC_CONCURRENCY'])), CONFIG['MAX_ASYNC_CONCURRENCY']))
+        job = Job(db, collection_name, engine, mode=mode, workers=num_workers, concurrency=concurrency,
+                  weight=weight, profile=profile)
+        
+        open_job(job, resume=resume)
         
-        # Clear any existing worker threads
-        worker_threads = []
+        if CONFIG['PROCESSING_BACKEND'] == 'external':
+            # Scraping runs in worker.py processes; the web app only issues control messages
+            return jsonify({
+                'message': f'Processing started on collection {collection_name}; worker processes will pick it up',
+                'collection': collection_name,
+                'engine': engine,
+                'mode': mode,
+                'backend': 'external'
+            }), 200
         
-        # Start worker threads
-        for i in range(num_workers):
-            t = threading.Thread(target=worker_thread, args=(i+1, collection_name))
-            t.daemon = True  # Allow thread to exit when main program exits
-            t.start()
-            worker_threads.append(t)
+        start_job(job)
+        
+        if mode == 'async':
+            # One event loop drives many concurrent CIDs over a shared HTTP connection pool
+            return jsonify({
+                'message': f'Async processing started with concurrency {concurrency} on collection {collection_name}',
+                'job_id': job.id,
+                'mode': mode,
+                'concurrency': concurrency,
+                'collection': collection_name,
+                'profile': profile
+            }), 200
         
         return jsonify({
-            'message': f'Processing started with {num_workers} workers on collection {collection_name}',
+            'message': f'Processing started with up to {num_workers} {engine} workers on collection {collection_name}',
+            'job_id': job.id,
             'workers': num_workers,
             'collection': collection_name,
-            'max_workers': CONFIG['MAX_WORKERS']
+            'engine': engine,
+            'mode': mode,
+            'weight': job.weight,
+            'profile': profile,
+            'max_workers': CONFIG['MAX_WORKERS'],
+            'worker_budget': scheduler.budget
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+def tenant_job(job_id):
+    """A job by id, only if it belongs to the current tenant; other tenants' jobs look like unknown ids"""
+    job = scheduler.get(job_id)
+    return job if job and job.tenant == db.name else None
+
+def resolve_job(data):
+    """The job a control request is about: by job_id, by collection, or the current tenant's latest active job"""
+    data = data or {}
+    if data.get('job_id'):
+        return tenant_job(data['job_id'])
+    if data.get('collection'):
+        return scheduler.find(db.name, data['collection'])
+    active = scheduler.active_jobs(db.name)
+    return active[0] if active else None
+
+def default_collection():
+    """Collection shown when a request doesn't name one: the latest active job's, else 'default_collection'"""
+    active = scheduler.active_jobs(db.name)
+    return active[0].collection_name if active else 'default_collection'
+
+def publish_control_state(database, collection_name, state):
+    """Forward pause/resume/stop to worker processes and wake status streams"""
+    try:
+        job_control.set_state(database, collection_name, state)
+        checkpoint.set_state(database, collection_name, state)
+    except Exception as e:
+        log_event(f"⚠ Couldn't publish {state} for {collection_name}: {str(e)}", logging.WARNING)
+    control_summaries.pop((database.name, collection_name), None)
+    checkpoint_summaries.pop((database.name, collection_name), None)
+    status_cache.notify()
+
+def resolve_external(data, states):
+    """Collection run by worker processes (no in-process job) whose control state is one of `states`"""
+    data = data or {}
+    if data.get('job_id'):
+        return None
+    if data.get('collection'):
+        control = job_control.get_state(db, data['collection'])
+        return data['collection'] if control and control['state'] in states else None
+    control = job_control.latest_in_state(db, states)
+    return control['_id'] if control else None
+
+def control_external(data, state, states):
+    """Apply pause/resume/stop through the control document alone; the collection name, or None if none matched"""
+    collection_name = resolve_external(data, states)
+    if collection_name:
+        publish_control_state(db, collection_name, state)
+    return collection_name
+
+def get_checkpoint(collection_name):
+    """A collection's checkpoint counters, cached like the status counters"""
+    key = (db.name, collection_name)
+    cached = checkpoint_summaries.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    saved = checkpoint.get(db, collection_name)
+    checkpoint_summaries[key] = (time.monotonic() + CONFIG['STATUS_CACHE_TTL'], saved)
+    return saved
+
+def get_control_summary(collection_name):
+    """Control state and live worker processes for a collection, cached like the status counters"""
+    cached = control_summaries.get((db.name, collection_name))
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    control = job_control.get_state(db, collection_name)
+    workers = job_control.live_workers(db, collection_name, CONFIG['WORKER_PROCESS_TIMEOUT'])
+    summary = {
+        'state': control['state'] if control else None,
+        'worker_processes': len(workers),
+        'worker_process_concurrency': sum(w.get('concurrency', 0) for w in workers)
+    }
+    control_summaries[(db.name, collection_name)] = (time.monotonic() + CONFIG['STATUS_CACHE_TTL'], summary)
+    return summary
+
 @app.route('/pause', methods=['POST'])
 def pause_processing():
-    global should_pause
-    
-    if not processing_active:
+    data = request.get_json(silent=True)
+    job = resolve_job(data)
+    if not job:
+        # Worker processes (PROCESSING_BACKEND=external) only listen to the control document
+        collection_name = control_external(data, 'paused', ('running',))
+        if collection_name:
+            return jsonify({'message': 'Pause requested', 'collection': collection_name}), 200
+    if not job or not scheduler.pause(job):
         return jsonify({'message': 'No active processing to pause'}), 400
     
-    should_pause = True
-    return jsonify({'message': 'Pause requested'}), 200
+    # Slots move on to other jobs; whatever this job has buffered is written now
+    get_result_writer(job.collection_name, job.db).flush()
+    publish_control_state(job.db, job.collection_name, 'paused')
+    return jsonify({'message': 'Pause requested', 'job_id': job.id}), 200
 
 @app.route('/resume', methods=['POST'])
 def resume_processing():
-    global should_pause
-    
-    if not should_pause:
+    data = request.get_json(silent=True)
+    job = resolve_job(data)
+    if not job:
+        collection_name = control_external(data, 'running', ('paused',))
+        if collection_name:
+            return jsonify({'message': 'Resume requested', 'collection': collection_name}), 200
+    if not job or not scheduler.resume(job):
         return jsonify({'message': 'Processing is not paused'}), 400
     
-    should_pause = False
-    return jsonify({'message': 'Resume requested'}), 200
+    publish_control_state(job.db, job.collection_name, 'running')
+    return jsonify({'message': 'Resume requested', 'job_id': job.id}), 200
 
 @app.route('/stop', methods=['POST'])
 def stop_processing():
-    global should_stop, processing_active
-    
-    if not processing_active:
+    data = request.get_json(silent=True)
+    job = resolve_job(data)
+    if not job:
+        collection_name = control_external(data, 'stopped', ('running', 'paused'))
+        if collection_name:
+            return jsonify({'message': 'Stop requested', 'collection': collection_name}), 200
+    if not job or not scheduler.stop(job):
         return jsonify({'message': 'No active processing to stop'}), 400
     
-    should_stop = True
-    processing_active = False
-    return jsonify({'message': 'Stop requested'}), 200
+    publish_control_state(job.db, job.collection_name, 'stopped')
+    return jsonify({'message': 'Stop requested', 'job_id': job.id}), 200
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Jobs of the current tenant (all tenants with ?all=true), most recent first, plus the shared worker budget"""
+    tenant = None if request.args.get('all', '').lower() in ('1', 'true', 'yes') else db.name
+    return jsonify({
+        'jobs': [job.to_dict() for job in scheduler.list(tenant)],
+        'scheduler': scheduler.stats()
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = tenant_job(job_id)
+    if not job:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+def build_status(collection_name, per_tag=False, months=None):
+    """Status payload shared by /status and /status/stream"""
+    collection = get_collection(collection_name)
+    
+    # Every counter and the tag list come from one cached aggregation
+    counts = status_cache.get(collection)
+
+    # Progress counters from the collection's checkpoint; live controls from its scheduler job
+    saved = get_checkpoint(collection_name)
+    job = scheduler.find(db.name, collection_name)
+
+    status = {
+        'total': counts['total'],
+        'processed': counts['processed'],
+        'failed': counts['failed'],
+        'new': counts['new'],
+        'processing': counts['processing'],
+        'processing_active': bool(job and job.active),
+        'active_workers': job.active_workers if job else 0,
+        'processing_mode': job.mode if job else None,
+        'in_flight': job.in_flight if job else 0,
+        'paused': bool(job and job.should_pause),
+        'stopped': bool(job and job.state == 'stopped'),
+        'job_id': job.id if job else None,
+        'current_collection': collection_name,
+        'tags': counts['tags'],
+        'current_failed_count': job.failed if job else 0,
+        'write_failures': job.write_failures if job else 0,
+        'last_processed': saved['last_processed'],
+        'total_processed': saved['total_processed'],
+        'total_failed': saved['total_failed'],
+        'job_state': saved['state'],
+        'resumes': saved.get('resumes', 0),
+        'active_jobs': [active.to_dict() for active in scheduler.active_jobs(db.name)],
+        'scheduler': scheduler.stats(),
+        'max_workers': CONFIG['MAX_WORKERS'],
+        'browser_pool': browser_pool.stats(),
+        'step_timings': get_step_timings(),
+        'connectivity': connectivity.stats(),
+        'rate_governor': governor.stats(),
+        'control': get_control_summary(collection_name),
+        'result_writer': result_writers[(db.name, collection_name)].stats() if (db.name, collection_name) in result_writers else None,
+        'result_cache': get_result_cache().stats()
+    }
+    if per_tag:
+        status['per_tag'] = counts['per_tag']
+        levels = priorities.get_priorities(db, collection_name)
+        status['tag_priorities'] = {tag: levels.get(tag, priorities.DEFAULT_PRIORITY) for tag in counts['tags']}
+    if months:
+        status['month_window'] = month_window.window_summary(collection, months, batch_size=CONFIG['EXPORT_BATCH_SIZE'])
+    return status
 
 @app.route('/status', methods=['GET'])
 def get_status():
-    global failed_count
     try:
-        collection_name = request.args.get('collection', current_collection_name or 'default_collection')
-        collection = get_collection(collection_name)
-        
-        total = collection.count_documents({})
-        processed = collection.count_documents({'status': 'processed'})
-        failed = collection.count_documents({'status': 'failed'})
-        new = collection.count_documents({'status': 'new'})
-        processing = collection.count_documents({'status': 'processing'})
+        collection_name = request.args.get('collection') or default_collection()
+        per_tag = request.args.get('per_tag', '').lower() in ('1', 'true', 'yes')
+        months = month_window.parse_window(request.args.get('window'))
+        return jsonify(build_status(collection_name, per_tag, months))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Get all unique tags in the collection
-        tags = collection.distinct('tag')
+@app.route('/status/stream', methods=['GET'])
+def stream_status():
+    """Server-Sent Events: a full status snapshot, then only the fields that changed as results are committed"""
+    requested = request.args.get('collection')
+    per_tag = request.args.get('per_tag', '').lower() in ('1', 'true', 'yes')
 
-        # Load status from file
-        file_status = load_status()
+    # Every stream keeps a request thread for as long as it is open, so only a few may be;
+    # the rest of the dashboards poll /status (which shares the same cached counters)
+    if not status_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many live status streams, poll /status instead'}), 503, {'Retry-After': str(CONFIG['STATUS_STREAM_HEARTBEAT'])}
 
-        return jsonify({
-            'total': total,
-            'processed': processed,
-            'failed': failed,
-            'new': new,
-            'processing': processing,
-            'processing_active': processing_active,
-            'active_workers': active_workers,
-            'paused': should_pause,
-            'stopped': should_stop,
-            'current_collection': collection_name,
-            'tags': tags,
-            'current_failed_count': failed_count,
-            'last_processed': file_status.get('last_processed', 0),
-            'total_processed': file_status.get('total_processed', 0),
-            'total_failed': file_status.get('total_failed', 0),
-            'max_workers': CONFIG['MAX_WORKERS']
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    def events():
+        last = {}
+        version = status_cache.version
+        while True:
+            try:
+                # Without ?collection= the stream follows whichever job is current, not the one at connect time
+                current = build_status(requested or default_collection(), per_tag)
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+                return
+
+            delta = {key: value for key, value in current.items() if last.get(key) != value}
+            if delta:
+                yield f"data: {json.dumps(delta, default=str)}\n\n"
+                last = current
+            else:
+                yield ": keep-alive\n\n"
+
+            version = status_cache.wait_for_change(version, CONFIG['STATUS_STREAM_HEARTBEAT'])
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(status_streams.release)
+    return response
+
+@metrics_registry.collector
+def collect_live_metrics():
+    """Refresh gauges (and counters other components keep) from live state when /metrics is scraped"""
+    jobs = scheduler.active_jobs()
+    scheduler_stats = scheduler.stats()
+    ACTIVE_WORKERS.set(sum(job.active_workers for job in jobs))
+    IN_FLIGHT.set(sum(job.in_flight for job in jobs))
+    ACTIVE_JOBS.set(scheduler_stats['active_jobs'])
+    WORKER_SLOTS.set(scheduler_stats['slots'])
+    for job in jobs:
+        JOB_WORKERS.set(job.active_workers, tenant=job.tenant, collection=job.collection_name)
+    governor_stats = governor.stats()
+    RATE_LIMIT.set(governor_stats['rate_per_sec'])
+    CONCURRENCY_LIMIT.set(governor_stats['concurrency_limit'])
+    PORTAL_UP.set(1 if connectivity.is_healthy() else 0)
+    pool_stats = browser_pool.stats()
+    BROWSER_LAUNCHES.set_total(pool_stats['launched'])
+    BROWSER_RESTARTS.set_total(pool_stats['recycled'])
+
+    # Queue depth for collections being worked on; shares the cached /status aggregation
+    with result_writers_lock:
+        writers = dict(result_writers)
+    for job in jobs:
+        QUEUE_DEPTH.set(status_cache.get(job.db[job.collection_name])['new'], tenant=job.tenant, collection=job.collection_name)
+    for (tenant, name), writer in writers.items():
+        WRITE_QUEUE_DEPTH.set(writer.stats()['queue_depth'], tenant=tenant, collection=name)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of processing counters, step latency histograms and live gauges"""
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/download', methods=['GET'])
 def download_excel():
+    tmp_path = None
     try:
         tag_filter = request.args.get('tag')
-        collection_name = request.args.get('collection', current_collection_name or 'default_collection')
+        collection_name = request.args.get('collection') or default_collection()
+        export_format = request.args.get('format', 'xlsx')
+        
+        if export_format not in ('xlsx', 'csv', 'csv.gz'):
+            return jsonify({'error': f"Unknown format '{export_format}'. Available formats: xlsx, csv, csv.gz"}), 400
+        
+        # Month columns come from the stored history when a window is requested (or configured)
+        try:
+            months = month_window.parse_window(request.args.get('window', CONFIG['MONTH_WINDOW']))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        columns = export.export_columns(month_window.window_columns(months) if months else None)
+        amount_columns = set(month_window.window_columns(months)) if months else export.AMOUNT_COLUMNS
         
         # Get the specified collection
         collection = get_collection(collection_name)
@@ -643,113 +1523,63 @@ def download_excel():
         query = {}
         if tag_filter and tag_filter != 'all':
             query['tag'] = tag_filter
-            print(f"🔍 Downloading data for tag: {tag_filter} from collection: {collection_name}")
+            log_event(f"🔍 Downloading data for tag: {tag_filter} from collection: {collection_name}",
+                      event='download', tenant=db.name, collection=collection_name, tag=tag_filter)
         
-        # Get all documents with the required fields
-        cursor = collection.find(query, {
-            '_id': 0,
-            'cid': 1,
-            'status': 1,
-            'April25': 1,
-            'May25': 1,
-            'June25': 1,
-            'Highest': 1,
-            'date_added': 1,
-            'processed_date': 1,
-            'error': 1,
-            'tag': 1,
-            'collection': 1,
-            'failed_attempts': 1,
-            'fail_reason': 1
-        })
+        # Stream documents from the cursor in batches instead of loading the whole collection
+        cursor = collection.find(query, export.export_projection(columns)).batch_size(CONFIG['EXPORT_BATCH_SIZE'])
+        if months:
+            cursor = month_window.iter_with_window(cursor, months, CONFIG['EXPORT_BATCH_SIZE'])
+        sample, documents = export.peek(cursor, CONFIG['EXPORT_WIDTH_SAMPLE'])
         
-        # Convert cursor to DataFrame
-        df = pd.DataFrame(list(cursor))
-        
-        if df.empty:
+        if not sample:
             return jsonify({'error': 'No data to download for the selected collection and tag'}), 404
-
-        # Convert date fields to string
-        if 'date_added' in df.columns:
-            df['date_added'] = pd.to_datetime(df['date_added']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        if 'processed_date' in df.columns:
-            df['processed_date'] = pd.to_datetime(df['processed_date']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Modify fail_reason for processing status (ONLY IN THE EXCEL, NOT DATABASE)
-        if 'fail_reason' in df.columns and 'status' in df.columns:
-            processing_mask = df['status'] == 'processing'
-            df.loc[processing_mask, 'fail_reason'] = 'fail'
-        
-        # Reorder columns for better presentation
-        column_order = [
-            'cid', 'status', 'April25', 'May25', 'June25', 'Highest',
-            'date_added', 'processed_date', 'error', 'tag', 'collection',
-            'failed_attempts', 'fail_reason'
-        ]
         
-        # Add missing columns if they don't exist
-        for col in column_order:
-            if col not in df.columns:
-                df[col] = None
+        download_name = f'processed_data_{collection_name}_{tag_filter if tag_filter else "all"}'
         
-        df = df[column_order]
+        if export_format == 'csv':
+            return Response(
+                stream_with_context(export.iter_csv(documents, columns=columns)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={download_name}.csv'}
+            )
+        if export_format == 'csv.gz':
+            return Response(
+                stream_with_context(export.iter_gzip(export.iter_csv(documents, columns=columns))),
+                mimetype='application/gzip',
+                headers={'Content-Disposition': f'attachment; filename={download_name}.csv.gz'}
+            )
         
-        # Create temporary Excel file
+        # Excel needs the finished zip container, so write it to disk with a write-only workbook
         with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp_file:
-            with pd.ExcelWriter(tmp_file.name, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Processed Data')
-                
-                # Format the Excel file
-                workbook = writer.book
-                worksheet = writer.sheets['Processed Data']
-                
-                # Format numeric columns
-                number_format = '#,##0.00'
-                for col in ['C', 'D', 'E', 'F']:  # C=April25, D=May25, E=June25, F=Highest
-                    for cell in worksheet[col]:
-                        try:
-                            if cell.value is not None:
-                                cell.number_format = number_format
-                        except:
-                            pass
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            cell_value = str(cell.value) if cell.value is not None else ""
-                            if len(cell_value) > max_length:
-                                max_length = len(cell_value)
-                        except:
-                            pass
-                    adjusted_width = min((max_length + 2), 50)  # Cap at 50 characters
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
-
-            # Send the file
-            return send_file(
-                tmp_file.name,
-                as_attachment=True,
-                download_name=f'processed_data_{collection_name}_{tag_filter if tag_filter else "all"}.xlsx',
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            tmp_path = tmp_file.name
+        export.write_xlsx(documents, sample, tmp_path, columns=columns, amount_columns=amount_columns)
+        
+        # Send the file
+        return send_file(
+            tmp_path,
+            as_attachment=True,
+            download_name=f'{download_name}.xlsx',
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
 
     except Exception as e:
-        return jsonify({'error': f"Failed to generate Excel file: {str(e)}"}), 500
+        return jsonify({'error': f"Failed to generate export file: {str(e)}"}), 500
     finally:
-        try:
-            os.unlink(tmp_file.name)
-        except:
-            pass
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except:
+                pass
 
 @app.route('/collections', methods=['GET'])
 def list_collections():
     try:
-        collections = db.list_collection_names()
+        collections = [name for name in db.list_collection_names() if not name.startswith('_')]
         return jsonify({
             'collections': collections,
-            'current_collection': current_collection_name
+            'current_collection': default_collection() if scheduler.active_jobs(db.name) else None,
+            'active_collections': sorted({job.collection_name for job in scheduler.active_jobs(db.name)})
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -760,10 +1590,14 @@ def delete_collection(collection_name):
         if not collection_name:
             return jsonify({'error': 'Collection name is required'}), 400
         
-        if collection_name == current_collection_name:
+        job = scheduler.find(db.name, collection_name)
+        if job and job.active:
             return jsonify({'error': 'Cannot delete currently processing collection'}), 400
             
         db.drop_collection(collection_name)
+        forget_indexes(db[collection_name])
+        priorities.clear_priorities(db, collection_name)
+        status_cache.invalidate()
         return jsonify({'message': f'Collection {collection_name} deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -771,10 +1605,9 @@ def delete_collection(collection_name):
 @app.route('/retry-failed', methods=['POST'])
 def retry_failed():
     """Endpoint to retry processing failed CIDs"""
-    global failed_count
     try:
         data = request.get_json()
-        collection_name = data.get('collection', current_collection_name or 'default_collection')
+        collection_name = data.get('collection') or default_collection()
         
         collection = get_collection(collection_name)
         
@@ -784,13 +1617,19 @@ def retry_failed():
             {'$set': {
                 'status': 'new',
                 'failed_attempts': 0,
-                'fail_reason': None
+                'fail_reason': None,
+                'next_attempt_at': None
             }}
         )
         
-        # Clear failed CIDs file
-        save_failed_cids(set())
-        failed_count = 0  # Reset failed count
+        status_cache.invalidate(collection)
+        
+        # Forget the job's recorded failures
+        checkpoint.clear_failed(db, collection_name)
+        checkpoint_summaries.pop((db.name, collection_name), None)
+        job = scheduler.find(db.name, collection_name)
+        if job:
+            job.failed = 0  # Reset failed count
         
         return jsonify({
             'message': f'Marked {result.modified_count} failed CIDs for retry',
@@ -799,15 +1638,35 @@ def retry_failed():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/failed-cids', methods=['GET'])
+def get_failed_cids():
+    """CIDs that failed in a collection's current run, from its checkpoint"""
+    try:
+        collection_name = request.args.get('collection') or default_collection()
+        cids = checkpoint.failed_cids(db, collection_name)
+        return jsonify({'collection': collection_name, 'count': len(cids), 'cids': cids}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 def signal_handler(sig, frame):
-    global should_stop
-    print("\n🛑 Received interrupt signal. Stopping gracefully...")
-    should_stop = True
-    if processing_active:
+    log_event("🛑 Received interrupt signal. Stopping gracefully...")
+    active = scheduler.active_jobs()
+    for job in active:
+        scheduler.stop(job)
+    if active:
         sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
 
+if CONFIG['BROWSER_POOL_WARM'] > 0:
+    # Launch browsers in the background so startup is not blocked on Chrome
+    warm_profile = 'lean' if CONFIG['DEFAULT_ENGINE'] == 'selenium-lean' else 'standard'
+    threading.Thread(target=browser_pool.warm, args=(CONFIG['BROWSER_POOL_WARM'], warm_profile), daemon=True).start()
+
+if CONFIG['RESUME_ON_BOOT'] and CONFIG['PROCESSING_BACKEND'] == 'inline':
+    # Pick up where a crash or redeploy left off; in the background so startup is not blocked on Mongo
+    threading.Thread(target=resume_all_tenants, args=(client,), name='resume-unfinished', daemon=True).start()
+
 if __name__ == '__main__':
     print(f"🚀 Flask Backend Running on http://0.0.0.0:{CONFIG['PORT']}")
     print(f"⚙️  Configuration: Max Workers: {CONFIG['MAX_WORKERS']}, Batch Size: {CONFIG['BATCH_SIZE']}, Max Retries: {CONFIG['MAX_RETRIES']}")
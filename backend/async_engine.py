@@ -0,0 +1,52 @@
+from urllib.parse import urljoin
+import aiohttp
+
+from cid_parser import parse_consumption_table, build_monthly_amounts
+from http_engine import parse_bill_form, USER_AGENT
+
+
+def create_connector(limit):
+    """Create the shared keep-alive connection pool used by every in-flight CID"""
+    return aiohttp.TCPConnector(limit=limit, limit_per_host=limit, ttl_dns_cache=300)
+
+async def _fetch(session, method, url, timeout, **kwargs):
+    async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as response:
+        response.raise_for_status()
+        return await response.text(errors='replace'), str(response.url)
+
+async def scrape_cid(connector, cid, url, history_url=None, timeout=10):
+    """Replay the bill details form flow over async HTTP and return the monthly amounts for a CID"""
+    # Every CID gets its own cookie jar (portal session) on top of the shared connection pool
+    async with aiohttp.ClientSession(connector=connector, connector_owner=False,
+                                     cookie_jar=aiohttp.CookieJar(unsafe=True),
+                                     headers={'User-Agent': USER_AGENT}) as session:
+        page_html, page_url = await _fetch(session, 'GET', url, timeout)
+        form = parse_bill_form(page_html, page_url)
+
+        payload = dict(form['fields'])
+        payload[form['cid_field']] = cid
+        payload[form['answer_field']] = form['captcha']
+        if form['signin_field']:
+            payload[form['signin_field']] = form['signin_value']
+
+        if form['method'] == 'get':
+            response_html, response_url = await _fetch(session, 'GET', form['action'], timeout, params=payload)
+        else:
+            response_html, response_url = await _fetch(session, 'POST', form['action'], timeout,
+                                                       data=payload, headers={'Referer': page_url})
+
+        # The history table is either embedded in the sign-in response or served as a separate fragment
+        rows = parse_consumption_table(response_html)
+        if rows is None:
+            if 'historyDivbtn' not in response_html:
+                raise Exception("CAPTCHA failed or no history button")
+            if not history_url:
+                raise Exception("History table not in sign-in response and no HISTORY_URL configured")
+
+            history_html, _ = await _fetch(session, 'GET', urljoin(response_url, history_url), timeout,
+                                           headers={'Referer': response_url})
+            rows = parse_consumption_table(history_html)
+            if rows is None:
+                raise Exception("consumptionData table not found in history response")
+
+        return build_monthly_amounts(rows)
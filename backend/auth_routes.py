@@ -1,10 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
-from pymongo import MongoClient
 from bson import ObjectId
 from dotenv import load_dotenv
 import os
-import requests
+
+import mongo_pool
 
 # Load environment variables
 load_dotenv()
@@ -12,11 +12,9 @@ load_dotenv()
 # Access .env variables
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "userdb")  # default fallback
-BASE_URL = os.getenv("BASE_URL", "http://localhost:9200")
 
-# Setup MongoDB connection
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+# Setup MongoDB connection (the process-wide pooled client)
+db = mongo_pool.get_db(DB_NAME, MONGO_URI)
 users_collection = db['users']
 
 # Create Flask Blueprint
@@ -75,11 +73,9 @@ def login():
     # Extract DB name from email prefix (before @)
     db_name = email.split('@')[0]
 
-    # Call /set-db endpoint
+    # Select the user's database in-process (same as /set-db, without the HTTP round trip)
     try:
-        response = requests.post(f"{BASE_URL}/set-db", json={'db_name': db_name})
-        if response.status_code != 200:
-            return jsonify({'success': False, 'message': 'Login succeeded but failed to set DB'}), 500
+        current_app.config['SELECT_DATABASE'](db_name)
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error setting DB: {str(e)}'}), 500
 
@@ -0,0 +1,278 @@
+"""Offline scraping throughput benchmark.
+
+Starts the fake portal (fake_portal.py) in-process, loads a batch of CIDs into a scratch
+database and drains it through the real worker code once per engine and worker count:
+
+    python benchmark.py --mongomock --cids 200 --engines http,async --workers 1,4,16 --latency-ms 200
+    python benchmark.py --mongo-uri mongodb://localhost:27017 --engines selenium --workers 1,2,4
+    python benchmark.py --mongomock --engines selenium,selenium-lean --workers 2 --assets 8
+
+Reports CIDs/sec, p50/p95/p99 per-CID latency, peak RSS (this process plus any browsers) and
+the peak RSS of the largest worker process (one browser tree, or this process for the HTTP
+engines) for each run. --portal-url benchmarks against an already running portal instead.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+import psutil
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure CID scraping throughput against a local fake portal')
+    parser.add_argument('--cids', type=int, default=100, help='CIDs per run')
+    parser.add_argument('--engines', default='http,async',
+                        help='Comma-separated engines: selenium, selenium-lean, http and async (the async HTTP mode)')
+    parser.add_argument('--workers', default='1,2,4,8',
+                        help='Comma-separated worker counts (threads, or in-flight CIDs for async)')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--captcha-failure-rate', type=float, default=0.0)
+    parser.add_argument('--assets', type=int, default=0,
+                        help='Images (plus a stylesheet and web font) on each portal page, for browser profile comparisons')
+    parser.add_argument('--portal-url', default=None, help='Use a running portal (base URL) instead of starting one')
+    parser.add_argument('--governed', action='store_true',
+                        help="Keep the app's rate governor limits instead of lifting them for the benchmark")
+    parser.add_argument('--mongo-uri', default=None, help='MongoDB URI (defaults to MONGO_URI)')
+    parser.add_argument('--mongomock', action='store_true', help='Use an in-memory mongomock database')
+    parser.add_argument('--json', default=None, help='Also write the results to this file')
+    return parser.parse_args()
+
+
+class RssSampler(threading.Thread):
+    """Peak resident memory while a run is going: in total (this process plus browsers and drivers),
+    and of the largest single worker process (each browser with its driver, or this process for
+    the HTTP engines whose workers are threads)"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.peak_worker_mb = 0.0
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def tree_rss(root):
+        total = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / (1024 * 1024)
+
+    def sample(self):
+        process = psutil.Process()
+        try:
+            own = process.memory_info().rss / (1024 * 1024)
+            # Each direct child is a chromedriver with its Chrome processes underneath: one per browser worker
+            browsers = [self.tree_rss(child) for child in process.children()]
+        except psutil.Error:
+            return
+        self.peak_mb = max(self.peak_mb, own + sum(browsers))
+        self.peak_worker_mb = max(self.peak_worker_mb, max(browsers) if browsers else own)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stopped.set()
+        self.sample()
+
+
+def timed(scrape, latencies, lock):
+    """Wrap an engine's scrape function to record how long each CID attempt took"""
+    def wrapper(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return scrape(*args, **kwargs)
+        finally:
+            with lock:
+                latencies.append(time.monotonic() - started)
+    return wrapper
+
+def timed_async(scrape, latencies, lock):
+    async def wrapper(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return await scrape(*args, **kwargs)
+        finally:
+            with lock:
+                latencies.append(time.monotonic() - started)
+    return wrapper
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 1) if latencies else None
+
+def run_once(core, engine, workers, cids, lift_governor):
+    """Drain a fresh collection of CIDs through the worker code and measure it"""
+    from connectivity import ConnectivityMonitor
+    from rate_governor import RateGovernor
+    import async_engine
+
+    # A scratch database per run so the result cache and indexes start cold
+    core.db = core.client[f"bench_{uuid.uuid4().hex[:8]}"]
+    collection_name = 'benchmark'
+    collection = core.provision_collection(collection_name)
+    collection.insert_many([
+        {'cid': str(1000000 + n), 'status': 'new', 'tag': 'bench', 'collection': collection_name,
+         'failed_attempts': 0, 'fail_reason': None}
+        for n in range(cids)
+    ])
+
+    core.step_timings.clear()
+    core.connectivity = ConnectivityMonitor(core.CONFIG['HEALTH_PROBE_URL'],
+                                            failure_threshold=core.CONFIG['CIRCUIT_FAILURE_THRESHOLD'],
+                                            backoff_max=core.CONFIG['PROBE_BACKOFF_MAX'])
+    if lift_governor:
+        core.governor = RateGovernor(rate=100000, min_rate=100000, max_rate=100000,
+                                     concurrency=100000, min_concurrency=100000, max_concurrency=100000,
+                                     latency_target=float('inf'))
+    else:
+        core.governor = RateGovernor(
+            rate=core.CONFIG['RATE_START'], min_rate=core.CONFIG['RATE_MIN'], max_rate=core.CONFIG['RATE_MAX'],
+            concurrency=core.CONFIG['CONCURRENCY_START'], min_concurrency=core.CONFIG['CONCURRENCY_MIN'],
+            max_concurrency=core.CONFIG['CONCURRENCY_MAX'], latency_target=core.CONFIG['LATENCY_TARGET']
+        )
+
+    core.browser_pool.reset_stats()
+    latencies = []
+    lock = threading.Lock()
+    sampler = RssSampler()
+    sampler.start()
+    started = time.monotonic()
+
+    if engine == 'async':
+        original = async_engine.scrape_cid
+        async_engine.scrape_cid = timed_async(original, latencies, lock)
+        job = core.Job(core.db, collection_name, 'http', mode='async', concurrency=workers)
+        try:
+            core.start_job(job).wait()
+        finally:
+            async_engine.scrape_cid = original
+    else:
+        spec = core.ENGINES[engine]
+        bench_engine = f'benchmark-{engine}'
+        core.ENGINES[bench_engine] = dict(spec, scrape=timed(spec['scrape'], latencies, lock))
+        # The run gets the whole worker budget, however many workers that is
+        core.scheduler.budget = workers
+        job = core.Job(core.db, collection_name, bench_engine, workers=workers)
+        try:
+            core.start_job(job).wait()
+        finally:
+            core.ENGINES.pop(bench_engine, None)
+
+    core.flush_result_writers()
+    elapsed = time.monotonic() - started
+    sampler.stop()
+
+    # Let the run's worker slots retire and hand back their browsers before the next run is measured
+    while core.scheduler.stats()['slots']:
+        time.sleep(0.1)
+    core.browser_pool.shutdown()
+    browser = next(iter(core.browser_pool.stats()['profiles'].values()), {})
+
+    processed = collection.count_documents({'status': 'processed'})
+    failed = collection.count_documents({'status': 'failed'})
+    core.close_result_writers()
+    core.close_result_caches()
+    core.client.drop_database(core.db.name)
+
+    return {
+        'engine': engine,
+        'workers': workers,
+        'cids': cids,
+        'processed': processed,
+        'failed': failed,
+        'attempts': len(latencies),
+        'write_failures': job.write_failures,
+        'seconds': round(elapsed, 2),
+        'cids_per_sec': round(processed / elapsed, 2) if elapsed else None,
+        'p50_ms': percentile_ms(latencies, 50),
+        'p95_ms': percentile_ms(latencies, 95),
+        'p99_ms': percentile_ms(latencies, 99),
+        'peak_rss_mb': round(sampler.peak_mb, 1),
+        'peak_worker_rss_mb': round(sampler.peak_worker_mb, 1),
+        'browser_rss_mb': browser.get('avg_rss_mb'),
+        'browser_peak_rss_mb': browser.get('peak_rss_mb'),
+        'step_timings': core.get_step_timings()
+    }
+
+def print_table(results):
+    columns = ['engine', 'workers', 'processed', 'failed', 'seconds', 'cids_per_sec',
+               'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb', 'peak_worker_rss_mb', 'browser_rss_mb', 'write_failures']
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print('  '.join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+
+def main():
+    args = parse_args()
+    engines = [engine.strip() for engine in args.engines.split(',') if engine.strip()]
+    worker_counts = [int(count) for count in args.workers.split(',') if count.strip()]
+
+    portal = None
+    if args.portal_url:
+        base_url = args.portal_url.rstrip('/')
+    else:
+        from fake_portal import PortalServer
+        portal = PortalServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                              captcha_failure_rate=args.captcha_failure_rate, assets=args.assets).start()
+        base_url = portal.base_url
+        print(f"🧪 Fake portal on {base_url}")
+
+    # Must be in place before app.py reads its environment at import time
+    os.environ['RESUME_ON_BOOT'] = '0'  # The scratch database has no jobs to resubmit
+    os.environ['HEALTH_PROBE_URL'] = f'{base_url}/'
+    os.environ['HISTORY_URL'] = '/viewBillDetailsMain/history'
+    if args.mongo_uri:
+        os.environ['MONGO_URI'] = args.mongo_uri
+    elif args.mongomock:
+        os.environ['MONGO_URI'] = 'mongodb://localhost:27017'
+
+    import app as core
+
+    if args.mongomock:
+        try:
+            core.client = core.mongo_pool.mongomock_client()
+        except RuntimeError as e:
+            raise SystemExit(f"❌ {e}")
+    core.CONFIG['URL'] = f'{base_url}/viewBillDetailsMain'
+    core.browser_pool.allowed_hosts = core.portal_hosts([core.CONFIG['URL']])
+    core.CONFIG['RETRY_DELAY'] = 0.5
+    core.CONFIG['RETRY_MAX_DELAY'] = 2
+    core.scheduler.idle_timeout = 0.5
+
+    for engine in engines:
+        if engine != 'async' and engine not in core.ENGINES:
+            raise SystemExit(f"Unknown engine '{engine}'. Available engines: async, {', '.join(core.ENGINES)}")
+
+    results = []
+    try:
+        for engine in engines:
+            for workers in worker_counts:
+                print(f"⏱ {engine} with {workers} workers: {args.cids} CIDs...")
+                result = run_once(core, engine, workers, args.cids, lift_governor=not args.governed)
+                print(f"   {result['cids_per_sec']} CIDs/s, p95 {result['p95_ms']} ms, peak RSS {result['peak_rss_mb']} MB")
+                results.append(result)
+    finally:
+        core.browser_pool.shutdown()
+        if portal:
+            portal.stop()
+
+    print()
+    print_table(results)
+    if portal:
+        print(f"\nPortal: {portal.stats}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from webdriver_manager.chrome import ChromeDriverManager
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import psutil
+from urllib.parse import urlparse
+
+from tracing import log_event
+
+_driver_path = None
+_driver_lock = threading.Lock()
+
+PROFILES = ('standard', 'lean')
+
+# Lean browsers only reach the portal's own hosts (see build_options); of what the portal serves itself,
+# web fonts and media are blocked too. Its HTML, CSS and scripts still load, since the CID form flow depends on them
+LEAN_BLOCKED_URLS = [
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg'
+]
+
+
+def resolve_driver_path():
+    """Resolve the chromedriver binary once per process (CHROMEDRIVER_PATH wins over a webdriver-manager download)"""
+    global _driver_path
+    with _driver_lock:
+        if _driver_path is None:
+            env_path = os.getenv('CHROMEDRIVER_PATH')
+            if env_path and os.path.exists(env_path):
+                _driver_path = env_path
+            else:
+                _driver_path = ChromeDriverManager().install()
+            log_event(f"🔧 Using chromedriver at {_driver_path}")
+        return _driver_path
+
+def portal_hosts(urls):
+    """Hosts lean browsers may reach: those of the portal `urls`, plus any comma-separated ones in BROWSER_ALLOWED_HOSTS"""
+    hosts = [urlparse(url).hostname for url in urls if url]
+    hosts += [host.strip() for host in os.getenv('BROWSER_ALLOWED_HOSTS', '').split(',') if host.strip()]
+    return sorted({host.lower() for host in hosts if host})
+
+def host_resolver_rules(hosts):
+    """Chrome resolver rules failing the lookup of every hostname except `hosts` and their subdomains"""
+    excludes = ''.join(f', EXCLUDE {host}, EXCLUDE *.{host}' for host in hosts)
+    return f'MAP * ~NOTFOUND{excludes}'
+
+def blocked_urls():
+    """URL patterns blocked in lean browsers, plus any extra comma-separated ones in BROWSER_BLOCKED_URLS"""
+    extra = [pattern.strip() for pattern in os.getenv('BROWSER_BLOCKED_URLS', '').split(',') if pattern.strip()]
+    return LEAN_BLOCKED_URLS + extra
+
+def build_options(profile_dir, profile='standard', allowed_hosts=()):
+    """Chrome options for a pooled browser of the given profile. Lean browsers can't resolve any
+    host outside `allowed_hosts`, so third-party trackers, CDNs and ads never load"""
+    options = ChromeOptions()
+
+    chrome_bin = os.getenv('CHROME_BIN')
+    if chrome_bin and os.path.exists(chrome_bin):
+        options.binary_location = chrome_bin
+
+    # Configure browser options
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1280,720')
+    options.add_argument(f'--user-data-dir={profile_dir}')
+
+    if profile == 'lean':
+        # DOMContentLoaded is enough: the scraper waits for the CID form elements itself
+        options.page_load_strategy = 'eager'
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.images': 2,
+            'profile.default_content_setting_values.media_stream': 2,
+            'profile.default_content_setting_values.notifications': 2,
+            'profile.default_content_setting_values.plugins': 2,
+            'webkit.webprefs.loads_images_automatically': False
+        })
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--autoplay-policy=user-gesture-required')
+        options.add_argument('--mute-audio')
+        # One renderer process for the single tab instead of one per site
+        options.add_argument('--renderer-process-limit=1')
+        options.add_argument('--disable-features=site-per-process,IsolateOrigins,Translate,MediaRouter,OptimizationHints')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-background-networking')
+        options.add_argument('--disable-component-update')
+        options.add_argument('--disable-default-apps')
+        options.add_argument('--disable-sync')
+        options.add_argument('--no-first-run')
+        if allowed_hosts:
+            # Fails at DNS, before a connection is opened; IP-literal URLs aren't resolved and stay reachable
+            options.add_argument(f'--host-resolver-rules={host_resolver_rules(allowed_hosts)}')
+    return options
+
+def apply_profile(driver, profile):
+    """Settings that need a live session: the lean profile blocks font, media and BROWSER_BLOCKED_URLS patterns over CDP"""
+    if profile == 'lean':
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls()})
+
+
+class PooledBrowser:
+    """A Chrome instance owned by the pool, with its profile directory and usage count"""
+
+    def __init__(self, driver, profile_dir, profile='standard'):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.profile = profile
+        self.uses = 0
+        self.created_at = time.time()
+        self.last_rss_mb = None
+
+    def rss_mb(self):
+        """Resident memory of chromedriver plus every Chrome process it spawned"""
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes if p.is_running()) / (1024 * 1024)
+        except (psutil.Error, AttributeError):
+            return 0.0
+
+    def is_healthy(self):
+        """Cheap liveness probe: the driver session answers a trivial script"""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+
+class BrowserPool:
+    """Keeps pre-launched Chrome browsers warm across jobs and recycles them after N CIDs or a memory threshold.
+
+    Browsers of each profile ('standard', 'lean') are pooled separately, with per-profile CID time and RSS stats.
+    Lean browsers launched after `allowed_hosts` changes pick up the new hosts."""
+
+    def __init__(self, max_idle=4, max_uses=200, max_rss_mb=1024, allowed_hosts=()):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.allowed_hosts = list(allowed_hosts)
+        self._idle = {profile: [] for profile in PROFILES}
+        self._lock = threading.Lock()
+        self.launched = 0
+        self.recycled = 0
+        self.crashed = 0
+        self._profile_stats = {}
+
+    def _launch(self, profile='standard'):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown browser profile '{profile}'. Available profiles: {', '.join(PROFILES)}")
+        profile_dir = tempfile.mkdtemp(prefix='chrome-')
+        driver = None
+        try:
+            driver = webdriver.Chrome(
+                service=ChromeService(resolve_driver_path()),
+                options=build_options(profile_dir, profile, self.allowed_hosts)
+            )
+            apply_profile(driver, profile)
+        except Exception:
+            if driver is not None:
+                driver.quit()
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        with self._lock:
+            self.launched += 1
+        return PooledBrowser(driver, profile_dir, profile)
+
+    def _destroy(self, browser):
+        if browser.driver is not None:
+            try:
+                browser.driver.quit()
+            except Exception as e:
+                log_event(f"⚠ Error closing pooled browser: {str(e)}", logging.WARNING)
+        if browser.profile_dir:
+            shutil.rmtree(browser.profile_dir, ignore_errors=True)
+        browser.driver, browser.profile_dir = None, None
+
+    def _replace(self, browser):
+        """Swap a fresh Chrome into a handed-out browser in place. If the launch fails the browser is
+        left without a driver (never with a quit one) and ensure_ready() relaunches it before its next CID"""
+        self._destroy(browser)
+        browser.uses, browser.last_rss_mb = 0, None
+        try:
+            fresh = self._launch(browser.profile)
+        except Exception as e:
+            log_event(f"⚠ Couldn't launch a replacement browser: {str(e)[:200]}", logging.WARNING)
+            return False
+        browser.driver, browser.profile_dir, browser.created_at = fresh.driver, fresh.profile_dir, fresh.created_at
+        return True
+
+    def _needs_recycle(self, browser):
+        if browser.uses >= self.max_uses:
+            return True
+        if not self.max_rss_mb:
+            return False
+        browser.last_rss_mb = browser.rss_mb()
+        return browser.last_rss_mb > self.max_rss_mb
+
+    def _idle_count(self):
+        return sum(len(browsers) for browsers in self._idle.values())
+
+    def warm(self, count, profile='standard'):
+        """Pre-launch browsers of a profile until `count` are idle"""
+        while True:
+            with self._lock:
+                if len(self._idle[profile]) >= min(count, self.max_idle):
+                    return
+            browser = self._launch(profile)
+            with self._lock:
+                self._idle[profile].append(browser)
+
+    def acquire(self, profile='standard'):
+        """Hand out a healthy warm browser of the profile, launching one only when none is idle"""
+        while True:
+            with self._lock:
+                idle = self._idle.get(profile)
+                browser = idle.pop() if idle else None
+            if browser is None:
+                return self._launch(profile)
+            if browser.is_healthy():
+                return browser
+            log_event("♻ Discarding unhealthy pooled browser")
+            self._destroy(browser)
+
+    def ensure_ready(self, browser):
+        """Give a handed-out browser a live driver again if its last replacement failed; raises if Chrome won't start"""
+        if browser.driver is None:
+            fresh = self._launch(browser.profile)
+            browser.driver, browser.profile_dir, browser.created_at = fresh.driver, fresh.profile_dir, fresh.created_at
+        return browser
+
+    def mark_used(self, browser, seconds=None, error=None):
+        """Count one CID (and how long it took) against the browser and swap in a fresh Chrome when it hits its
+        limits, or when the CID failed with a WebDriver `error` and the session no longer answers. Never raises"""
+        browser.uses += 1
+        crashed = error is not None and not browser.is_healthy()
+        recycle = not crashed and self._needs_recycle(browser)
+        with self._lock:
+            stats = self._profile_stats.setdefault(browser.profile, {
+                'cids': 0, 'seconds': 0.0, 'rss_samples': 0, 'rss_total': 0.0, 'rss_peak': 0.0
+            })
+            stats['cids'] += 1
+            stats['seconds'] += seconds or 0.0
+            if browser.last_rss_mb is not None:
+                stats['rss_samples'] += 1
+                stats['rss_total'] += browser.last_rss_mb
+                stats['rss_peak'] = max(stats['rss_peak'], browser.last_rss_mb)
+        if crashed:
+            log_event(f"💥 Replacing crashed browser ({type(error).__name__}: {str(error)[:100]})", logging.ERROR)
+        elif recycle:
+            log_event(f"♻ Recycling browser after {browser.uses} CIDs ({browser.rss_mb():.0f} MB)")
+        if crashed or recycle:
+            self._replace(browser)
+            with self._lock:
+                self.recycled += 1
+                self.crashed += crashed
+
+    def release(self, browser):
+        """Return a browser to the pool, or tear it down if it is unhealthy or the pool is full"""
+        keep = browser.is_healthy() and not self._needs_recycle(browser)
+        if keep:
+            try:
+                browser.driver.delete_all_cookies()
+                browser.driver.get('about:blank')
+            except Exception:
+                keep = False
+        with self._lock:
+            if keep and self._idle_count() < self.max_idle:
+                self._idle[browser.profile].append(browser)
+                return
+        self._destroy(browser)
+
+    def shutdown(self):
+        """Close every idle browser and remove its profile directory"""
+        with self._lock:
+            idle = [browser for browsers in self._idle.values() for browser in browsers]
+            self._idle = {profile: [] for profile in PROFILES}
+        for browser in idle:
+            self._destroy(browser)
+
+    def reset_stats(self):
+        """Start the per-profile CID time and RSS figures afresh (e.g. between benchmark runs)"""
+        with self._lock:
+            self._profile_stats = {}
+
+    def stats(self):
+        with self._lock:
+            idle = self._idle_count()
+            profiles = {
+                profile: {
+                    'idle': len(self._idle.get(profile, [])),
+                    'cids': stats['cids'],
+                    'avg_cid_ms': round(stats['seconds'] / stats['cids'] * 1000, 1) if stats['cids'] else None,
+                    'avg_rss_mb': round(stats['rss_total'] / stats['rss_samples'], 1) if stats['rss_samples'] else None,
+                    'peak_rss_mb': round(stats['rss_peak'], 1)
+                }
+                for profile, stats in self._profile_stats.items()
+            }
+        return {'idle': idle, 'launched': self.launched, 'recycled': self.recycled, 'crashed': self.crashed, 'profiles': profiles}
@@ -0,0 +1,69 @@
+from datetime import datetime
+from pymongo import UpdateOne, ReturnDocument
+
+# Per-job progress counters and failed CIDs; '_' keeps them out of the CID collection list
+CHECKPOINT_COLLECTION = '_checkpoints'
+FAILED_COLLECTION = '_checkpoint_failed'
+
+# A job left in one of these states was cut short by a crash or redeploy
+UNFINISHED_STATES = ('running', 'paused')
+
+# Starting a job again continues these runs' counters; only a finished (or never started) run starts from zero
+RESUMABLE_STATES = UNFINISHED_STATES + ('stopped',)
+
+EMPTY_COUNTERS = {'last_processed': 0, 'total_processed': 0, 'total_failed': 0}
+
+
+def begin(db, job, resume=False, state='running', **settings):
+    """Open a job's checkpoint. Resuming keeps the counters of an unfinished or stopped run; otherwise they start from zero"""
+    now = datetime.now()
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    if resume:
+        doc = checkpoints.find_one_and_update(
+            {'_id': job, 'state': {'$in': list(RESUMABLE_STATES)}},
+            {'$set': {'state': state, 'updated_at': now, **settings}, '$inc': {'resumes': 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            return doc
+
+    db[FAILED_COLLECTION].delete_many({'job': job})
+    doc = {'_id': job, 'state': state, 'started_at': now, 'updated_at': now, 'resumes': 0, **EMPTY_COUNTERS, **settings}
+    checkpoints.replace_one({'_id': job}, doc, upsert=True)
+    return doc
+
+def record(db, job, processed, failed, failed_cids=()):
+    """Add one batch to a job's counters atomically and append only the CIDs that newly failed"""
+    if processed or failed:
+        db[CHECKPOINT_COLLECTION].update_one(
+            {'_id': job},
+            {'$inc': {'last_processed': processed + failed, 'total_processed': processed, 'total_failed': failed},
+             '$set': {'updated_at': datetime.now()}},
+            upsert=True
+        )
+    if failed_cids:
+        now = datetime.now()
+        db[FAILED_COLLECTION].bulk_write([
+            UpdateOne({'_id': f'{job}:{cid}'}, {'$set': {'job': job, 'cid': cid, 'failed_at': now}}, upsert=True)
+            for cid in failed_cids
+        ], ordered=False)
+
+def set_state(db, job, state):
+    db[CHECKPOINT_COLLECTION].update_one({'_id': job}, {'$set': {'state': state, 'updated_at': datetime.now()}})
+
+def get(db, job):
+    """A job's checkpoint, or zeroed counters if it never ran"""
+    return db[CHECKPOINT_COLLECTION].find_one({'_id': job}) or {'_id': job, 'state': None, **EMPTY_COUNTERS}
+
+def failed_cids(db, job):
+    """CIDs that failed in a job's current run"""
+    return [doc['cid'] for doc in db[FAILED_COLLECTION].find({'job': job}, {'cid': 1})]
+
+def clear_failed(db, job):
+    """Forget a job's failed CIDs (they are being retried)"""
+    db[FAILED_COLLECTION].delete_many({'job': job})
+    db[CHECKPOINT_COLLECTION].update_one({'_id': job}, {'$set': {'total_failed': 0, 'updated_at': datetime.now()}})
+
+def unfinished(db):
+    """Checkpoints of jobs that were still running (or paused) when the process went away"""
+    return list(db[CHECKPOINT_COLLECTION].find({'state': {'$in': list(UNFINISHED_STATES)}}))
@@ -0,0 +1,119 @@
+from bs4 import BeautifulSoup
+import calendar
+import json
+import re
+
+# Reads every consumptionData data row in one WebDriver round trip. Returns null until the
+# table has a row after its header, otherwise a JSON array of [bill_month, amount_text] pairs
+# taken the same way the per-element path did (amount input value, else the cell text).
+CONSUMPTION_TABLE_SCRIPT = """
+const table = document.getElementById('consumptionData');
+if (!table) return null;
+const trs = table.querySelectorAll('tr');
+if (trs.length < 2) return null;
+const rows = [];
+for (const tr of Array.prototype.slice.call(trs, 1)) {
+    const cells = tr.querySelectorAll('td');
+    if (cells.length < 4) continue;
+    const input = cells[3].querySelector('input');
+    const amount = input ? (input.value || '') : cells[3].innerText;
+    rows.push([cells[1].innerText, amount.trim()]);
+}
+return JSON.stringify(rows);
+"""
+
+MONTH_NUMBERS = {name.upper(): number for number, name in enumerate(calendar.month_abbr) if name}
+
+
+def clean_amount(amount_text):
+    """Clean and convert amount text to float"""
+    if not amount_text:
+        return None
+
+    # Remove commas and any non-numeric characters except decimal point
+    cleaned = ''.join(c for c in amount_text if c.isdigit() or c == '.')
+
+    try:
+        return float(cleaned) if cleaned else None
+    except ValueError:
+        return None
+
+def parse_consumption_table(html):
+    """Extract (bill_month, amount_text) rows from the consumptionData table in an HTML page or fragment"""
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find(id='consumptionData')
+    if table is None:
+        return None
+
+    data_rows = table.find_all('tr')[1:]
+    if not data_rows:
+        raise Exception("No data rows found")
+
+    rows = []
+    for tr in data_rows:
+        cells = tr.find_all('td')
+        if len(cells) < 4:
+            continue
+
+        bill_month = cells[1].get_text(strip=True)
+        amount_input = cells[3].find('input')
+        if amount_input is not None:
+            amount_text = (amount_input.get('value') or '').strip()
+        else:
+            amount_text = cells[3].get_text(strip=True)
+
+        rows.append((bill_month, amount_text))
+    return rows
+
+def parse_consumption_json(payload):
+    """Turn the CONSUMPTION_TABLE_SCRIPT result into (bill_month, amount_text) rows"""
+    return [(bill_month, amount_text) for bill_month, amount_text in json.loads(payload)]
+
+def parse_bill_month(label):
+    """Normalise a bill month label such as 'APR-25', 'April 2025' or '04/2025' to 'YYYY-MM', or None"""
+    text = label.strip().upper()
+    match = re.search(r'([A-Z]{3})[A-Z]*[\s\-/\'.,]*(\d{4}|\d{2})(?!\d)', text)
+    if match and match.group(1) in MONTH_NUMBERS:
+        year = int(match.group(2))
+        return f"{year + 2000 if year < 100 else year:04d}-{MONTH_NUMBERS[match.group(1)]:02d}"
+    match = re.search(r'(?<!\d)(\d{4})[-/](\d{1,2})(?!\d)', text) or re.search(r'(?<!\d)(\d{1,2})[-/](\d{4})(?!\d)', text)
+    if match:
+        year, month = sorted((int(match.group(1)), int(match.group(2))), reverse=True)
+        if 1 <= month <= 12:
+            return f"{year:04d}-{month:02d}"
+    return None
+
+def build_history(rows):
+    """Every row of the history table as compact [month, amount] pairs.
+
+    The month is 'YYYY-MM' when the label can be parsed, otherwise the upper-cased label as shown."""
+    return [
+        [parse_bill_month(bill_month) or bill_month.strip().upper(), clean_amount(amount_text)]
+        for bill_month, amount_text in rows
+    ]
+
+def build_monthly_amounts(rows):
+    """Map (bill_month, amount_text) rows to the April25/May25/June25/Highest fields, plus the full history"""
+    monthly_amounts = {'history': build_history(rows)}
+    amounts = []  # To store all amounts for calculating highest
+
+    for bill_month, amount_text in rows:
+        bill_month = bill_month.strip().upper()
+        amount = clean_amount(amount_text)
+
+        # Map bill months to our field names
+        if 'APR' in bill_month or 'APRIL' in bill_month:
+            monthly_amounts['April25'] = amount
+        elif 'MAY' in bill_month:
+            monthly_amounts['May25'] = amount
+        elif 'JUN' in bill_month or 'JUNE' in bill_month:
+            monthly_amounts['June25'] = amount
+
+        if amount is not None:
+            amounts.append(amount)
+
+    # Calculate Highest amount among the three months
+    if amounts:
+        monthly_amounts['Highest'] = max(amounts)
+
+    return monthly_amounts
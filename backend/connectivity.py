@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+import aiohttp
+import requests
+from selenium.common.exceptions import WebDriverException
+
+from tracing import log_event
+
+# Chrome network error codes that mean the portal (or our egress) is unreachable
+NETWORK_ERROR_MARKERS = (
+    'ERR_INTERNET_DISCONNECTED', 'ERR_NAME_NOT_RESOLVED', 'ERR_CONNECTION_',
+    'ERR_NETWORK_CHANGED', 'ERR_ADDRESS_UNREACHABLE', 'ERR_TIMED_OUT', 'ERR_PROXY_CONNECTION_FAILED'
+)
+
+
+def is_network_error(error):
+    """True when a scrape failure says the portal is unreachable, as opposed to a CID-specific problem"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout,
+                          aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    if isinstance(error, WebDriverException):
+        return any(marker in str(error) for marker in NETWORK_ERROR_MARKERS)
+    return False
+
+
+class ConnectivityMonitor:
+    """Shared circuit breaker for portal reachability.
+
+    Health is derived from real scrape outcomes. After `failure_threshold` consecutive
+    network failures the circuit opens: every worker waits on the same event while a
+    single background prober retries the portal with exponential backoff.
+    """
+
+    def __init__(self, probe_url, failure_threshold=5, probe_timeout=5, backoff_base=2, backoff_max=60):
+        self.probe_url = probe_url
+        self.failure_threshold = failure_threshold
+        self.probe_timeout = probe_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._healthy = threading.Event()
+        self._healthy.set()
+        self._stop_probing = threading.Event()
+        self.consecutive_failures = 0
+        self.outages = 0
+        self.probes = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if not self._healthy.is_set():
+            return 'down'
+        return 'suspect' if self.consecutive_failures else 'healthy'
+
+    def is_healthy(self):
+        return self._healthy.is_set()
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self, error):
+        """Count a failed attempt; only network-level failures move the circuit towards open"""
+        if not is_network_error(error):
+            return
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._healthy.is_set() and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self._healthy.clear()
+        self.outages += 1
+        self.opened_at = time.time()
+        log_event(f"🌐 Portal unreachable after {self.consecutive_failures} network failures; pausing all workers")
+        threading.Thread(target=self._probe_until_healthy, daemon=True).start()
+
+    def _probe(self):
+        self.probes += 1
+        try:
+            response = requests.get(self.probe_url, timeout=self.probe_timeout, stream=True)
+            response.close()
+            return response.status_code < 500
+        except requests.RequestException:
+            return False
+
+    def _probe_until_healthy(self):
+        delay = self.backoff_base
+        while not self._stop_probing.is_set():
+            if self._probe():
+                with self._lock:
+                    self.consecutive_failures = 0
+                    self.opened_at = None
+                    self._healthy.set()
+                log_event("🌐 Portal reachable again; resuming workers")
+                return
+            self._stop_probing.wait(delay)
+            delay = min(delay * 2, self.backoff_max)
+
+    def wait_until_healthy(self, should_stop, poll=1):
+        """Block a worker while the circuit is open; returns False if stop was requested meanwhile"""
+        while not self._healthy.wait(poll):
+            if should_stop():
+                return False
+        return True
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'outages': self.outages,
+            'probes': self.probes,
+            'down_since': self.opened_at
+        }
@@ -0,0 +1,105 @@
+from datetime import datetime
+from itertools import chain, islice
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+import csv
+import io
+import zlib
+
+EXPORT_COLUMNS = [
+    'cid', 'status', 'April25', 'May25', 'June25', 'Highest',
+    'date_added', 'processed_date', 'error', 'tag', 'collection',
+    'failed_attempts', 'fail_reason'
+]
+AMOUNT_COLUMNS = {'April25', 'May25', 'June25', 'Highest'}
+DATE_COLUMNS = {'date_added', 'processed_date'}
+NUMBER_FORMAT = '#,##0.00'
+
+
+def export_columns(window_columns=None):
+    """Export columns, with the fixed month fields swapped for a month window's columns when one is given"""
+    if not window_columns:
+        return EXPORT_COLUMNS
+    rest = [column for column in EXPORT_COLUMNS if column not in AMOUNT_COLUMNS and column not in ('cid', 'status')]
+    return ['cid', 'status', *window_columns, *rest]
+
+def export_projection(columns=EXPORT_COLUMNS):
+    projection = {'_id': 0, **{column: 1 for column in columns}}
+    if columns is not EXPORT_COLUMNS:
+        # Window columns are derived from the stored history, or the legacy month fields of older documents
+        projection.update({field: 1 for field in ('history', 'April25', 'May25', 'June25')})
+    return projection
+
+def to_row(doc, columns=EXPORT_COLUMNS):
+    """One export row in column order, with the same presentation rules as the Excel download"""
+    row = []
+    for column in columns:
+        value = doc.get(column)
+        if column in DATE_COLUMNS and isinstance(value, datetime):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        elif column == 'fail_reason' and doc.get('status') == 'processing':
+            # Shown as 'fail' in the export only, never in the database
+            value = 'fail'
+        elif isinstance(value, float) and value != value:
+            value = None
+        row.append(value)
+    return row
+
+def peek(cursor, count):
+    """Read the first `count` documents and return (sample, iterator over all documents)"""
+    iterator = iter(cursor)
+    sample = list(islice(iterator, count))
+    return sample, chain(sample, iterator)
+
+def estimate_widths(sample, columns=EXPORT_COLUMNS):
+    """Column widths from a sample of rows instead of every cell, capped at 50 characters"""
+    widths = [len(column) for column in columns]
+    for doc in sample:
+        for i, value in enumerate(to_row(doc, columns)):
+            if value is not None:
+                widths[i] = max(widths[i], len(str(value)))
+    return [min(width + 2, 50) for width in widths]
+
+def write_xlsx(documents, sample, path, sheet_name='Processed Data', columns=EXPORT_COLUMNS, amount_columns=AMOUNT_COLUMNS):
+    """Write documents to a write-only workbook: constant memory regardless of collection size"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+
+    for i, width in enumerate(estimate_widths(sample, columns), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    ws.append(columns)
+    amount_indexes = [i for i, column in enumerate(columns) if column in amount_columns]
+    for doc in documents:
+        row = to_row(doc, columns)
+        for i in amount_indexes:
+            if row[i] is not None:
+                cell = WriteOnlyCell(ws, value=row[i])
+                cell.number_format = NUMBER_FORMAT
+                row[i] = cell
+        ws.append(row)
+
+    wb.save(path)
+
+def iter_csv(documents, rows_per_chunk=500, columns=EXPORT_COLUMNS):
+    """Yield the CSV export as UTF-8 chunks so the response can start immediately"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for n, doc in enumerate(documents, start=1):
+        writer.writerow(to_row(doc, columns))
+        if n % rows_per_chunk == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def iter_gzip(chunks, level=6):
+    """Gzip-compress a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
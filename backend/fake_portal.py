@@ -0,0 +1,205 @@
+"""Local stand-in for the APEPDCL bill details portal.
+
+Serves the same element IDs as viewBillDetailsMain (ltscno, Billquestion, Billans, Billsignin,
+historyDivbtn, consumptionData) so every engine can be exercised offline. Latency, server errors
+and CAPTCHA rejections can be injected:
+
+    python fake_portal.py --port 5055 --latency-ms 300 --jitter-ms 150 --error-rate 0.02 --captcha-failure-rate 0.05
+
+--assets N adds a stylesheet with a web font and N images to the pages (each paying the same
+latency), to compare the standard and lean browser profiles.
+
+Point the app at it with URL=http://127.0.0.1:5055/viewBillDetailsMain and
+HISTORY_URL=/viewBillDetailsMain/history (the HTTP engines fetch the table fragment from there).
+"""
+from flask import Flask, Response, request, session, abort
+from werkzeug.serving import make_server
+import argparse
+import calendar
+import hashlib
+import logging
+import random
+import threading
+import time
+import uuid
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>View Bill Details</title>{head}</head>
+<body>
+{assets}
+<form id="billForm" action="{action}" method="post">
+  <input type="hidden" name="token" value="{token}">
+  <input type="text" id="ltscno" name="ltscno">
+  <span id="Billquestion">{question}</span>
+  <input type="text" id="Billans" name="Billans">
+  <button type="submit" id="Billsignin" name="Billsignin" value="Signin">Sign In</button>
+</form>
+</body></html>"""
+
+SIGNED_IN = """<!DOCTYPE html>
+<html><head><title>Bill Details</title>{head}</head>
+<body>
+{assets}
+<p>Service number {cid}</p>
+<button type="button" id="historyDivbtn" onclick="loadHistory()">View History</button>
+<div id="historyDiv"></div>
+<script>
+function loadHistory() {{
+  fetch('{history}', {{credentials: 'same-origin'}})
+    .then(function (response) {{ return response.text(); }})
+    .then(function (html) {{ document.getElementById('historyDiv').innerHTML = html; }});
+}}
+</script>
+</body></html>"""
+
+CAPTCHA_REJECTED = """<!DOCTYPE html>
+<html><head><title>View Bill Details</title></head>
+<body><script>alert('Invalid Captcha');</script></body></html>"""
+
+# Page weight for --assets: a stylesheet pulling a web font, plus N images
+ASSET_HEAD = '<link rel="stylesheet" href="/static/site.css">'
+SITE_CSS = "@font-face { font-family: Portal; src: url('/static/portal.woff2') format('woff2'); } body { font-family: Portal, sans-serif; }"
+PIXEL_PNG = bytes.fromhex('89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082')
+FONT_BYTES = b'wOF2' + bytes(64 * 1024)
+
+
+def history_months(end_month, months):
+    """The last `months` (year, month) pairs up to and including end_month ('YYYY-MM'), newest first"""
+    year, month = (int(part) for part in end_month.split('-'))
+    result = []
+    for _ in range(months):
+        result.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return result
+
+def history_table(cid, end_month, months):
+    """Deterministic consumption history for a CID, laid out like the portal's consumptionData table"""
+    rows = ['<tr><th>S.No</th><th>Bill Month</th><th>Units</th><th>Bill Amount</th></tr>']
+    for n, (year, month) in enumerate(history_months(end_month, months), start=1):
+        digest = hashlib.md5(f'{cid}-{year}-{month}'.encode()).digest()
+        units = 50 + digest[0] * 2
+        amount = units * 7.5 + digest[1]
+        label = f"{calendar.month_abbr[month].upper()}-{year % 100:02d}"
+        rows.append(f'<tr><td>{n}</td><td>{label}</td><td>{units}</td>'
+                    f'<td><input type="text" value="{amount:,.2f}" readonly></td></tr>')
+    return f'<table id="consumptionData">{"".join(rows)}</table>'
+
+def create_app(latency_ms=0, jitter_ms=0, error_rate=0.0, captcha_failure_rate=0.0,
+               end_month='2025-06', months=12, seed=None, assets=0):
+    """Build the fake portal; every request pays the injected latency and may fail with a 503"""
+    app = Flask(__name__, static_folder=None)
+    app.secret_key = uuid.uuid4().hex
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    stats = {'requests': 0, 'errors': 0, 'captcha_failures': 0, 'signins': 0, 'asset_requests': 0}
+    app.config['PORTAL_STATS'] = stats
+    page_head = ASSET_HEAD if assets else ''
+    page_assets = ''.join(f'<img src="/static/banner{n}.png" alt="">' for n in range(assets))
+
+    def roll():
+        with rng_lock:
+            return rng.random()
+
+    @app.before_request
+    def inject_faults():
+        stats['requests'] += 1
+        delay = latency_ms + (roll() * 2 - 1) * jitter_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if error_rate and roll() < error_rate:
+            stats['errors'] += 1
+            abort(503)
+
+    @app.route('/viewBillDetailsMain', methods=['GET'])
+    def bill_details():
+        with rng_lock:
+            question = ''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ23456789') for _ in range(5))
+        session['question'] = question
+        return PAGE.format(action=request.path, token=uuid.uuid4().hex, question=question,
+                           head=page_head, assets=page_assets)
+
+    @app.route('/viewBillDetailsMain', methods=['POST'])
+    def sign_in():
+        cid = request.form.get('ltscno', '').strip()
+        answer = request.form.get('Billans', '').strip()
+        if not cid or answer != session.get('question') or (captcha_failure_rate and roll() < captcha_failure_rate):
+            stats['captcha_failures'] += 1
+            return CAPTCHA_REJECTED
+        stats['signins'] += 1
+        session['cid'] = cid
+        return SIGNED_IN.format(cid=cid, history=f'{request.path}/history', head=page_head, assets=page_assets)
+
+    @app.route('/viewBillDetailsMain/history', methods=['GET'])
+    def history():
+        cid = session.get('cid')
+        if not cid:
+            abort(403)
+        return history_table(cid, end_month, months)
+
+    @app.route('/static/<name>', methods=['GET'])
+    def static_asset(name):
+        stats['asset_requests'] += 1
+        if name == 'site.css':
+            return Response(SITE_CSS, mimetype='text/css')
+        if name == 'portal.woff2':
+            return Response(FONT_BYTES, mimetype='font/woff2')
+        if name.endswith('.png'):
+            return Response(PIXEL_PNG, mimetype='image/png')
+        abort(404)
+
+    @app.route('/', methods=['GET'])
+    def health():
+        return 'ok'
+
+    return app
+
+class PortalServer:
+    """Run the fake portal on a background thread (used by benchmark.py)"""
+
+    def __init__(self, host='127.0.0.1', port=0, quiet=True, **options):
+        self.app = create_app(**options)
+        if quiet:
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server(host, port, self.app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f'http://{self.server.host}:{self.server.port}'
+
+    @property
+    def stats(self):
+        return dict(self.app.config['PORTAL_STATS'])
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Local stand-in for the bill details portal')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added to every request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform +/- jitter around the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--captcha-failure-rate', type=float, default=0.0, help='Fraction of sign-ins rejected as a bad CAPTCHA')
+    parser.add_argument('--end-month', default='2025-06', help='Newest bill month in the history (YYYY-MM)')
+    parser.add_argument('--months', type=int, default=12, help='Rows in the history table')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--assets', type=int, default=0, help='Images per page, plus a stylesheet and web font')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    portal = PortalServer(args.host, args.port, quiet=False, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          error_rate=args.error_rate, captcha_failure_rate=args.captcha_failure_rate,
+                          end_month=args.end_month, months=args.months, seed=args.seed, assets=args.assets)
+    print(f"🧪 Fake portal on {portal.base_url}/viewBillDetailsMain (history at /viewBillDetailsMain/history)")
+    try:
+        portal.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Fake portal stopped")
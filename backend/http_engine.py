@@ -0,0 +1,93 @@
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+import requests
+
+from cid_parser import parse_consumption_table, build_monthly_amounts
+
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/126.0 Safari/537.36')
+
+
+def create_session(pool_size=10):
+    """Create a requests session with a pooled keep-alive adapter"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+def parse_bill_form(html, page_url):
+    """Read the CID form from the bill details page: submit URL, method, form fields and the CAPTCHA question"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    cid_input = soup.find(id='ltscno')
+    if cid_input is None:
+        raise Exception("CID input 'ltscno' not found on page")
+
+    question = soup.find(id='Billquestion')
+    if question is None:
+        raise Exception("CAPTCHA question 'Billquestion' not found on page")
+
+    form = cid_input.find_parent('form')
+    action = form.get('action') if form is not None else None
+    method = (form.get('method') or 'post').lower() if form is not None else 'post'
+
+    # Carry over hidden fields (session tokens etc.) exactly as the browser would
+    fields = {}
+    if form is not None:
+        for hidden in form.find_all('input', type='hidden'):
+            if hidden.get('name'):
+                fields[hidden['name']] = hidden.get('value', '')
+
+    answer_input = soup.find(id='Billans')
+    signin = soup.find(id='Billsignin')
+
+    return {
+        'action': urljoin(page_url, action) if action else page_url,
+        'method': method,
+        'fields': fields,
+        'cid_field': cid_input.get('name') or 'ltscno',
+        'answer_field': (answer_input.get('name') if answer_input is not None else None) or 'Billans',
+        'signin_field': signin.get('name') if signin is not None else None,
+        'signin_value': signin.get('value', '') if signin is not None else '',
+        'captcha': question.get_text().strip()
+    }
+
+def scrape_cid(session, cid, url, history_url=None, timeout=10):
+    """Replay the bill details form flow over HTTP and return the monthly amounts for a CID"""
+    # Each CID gets a fresh portal session; the pooled connections are kept
+    session.cookies.clear()
+
+    page = session.get(url, timeout=timeout)
+    page.raise_for_status()
+    form = parse_bill_form(page.text, page.url)
+
+    payload = dict(form['fields'])
+    payload[form['cid_field']] = cid
+    payload[form['answer_field']] = form['captcha']
+    if form['signin_field']:
+        payload[form['signin_field']] = form['signin_value']
+
+    if form['method'] == 'get':
+        response = session.get(form['action'], params=payload, timeout=timeout)
+    else:
+        response = session.post(form['action'], data=payload, headers={'Referer': page.url}, timeout=timeout)
+    response.raise_for_status()
+
+    # The history table is either embedded in the sign-in response or served as a separate fragment
+    rows = parse_consumption_table(response.text)
+    if rows is None:
+        if 'historyDivbtn' not in response.text:
+            raise Exception("CAPTCHA failed or no history button")
+        if not history_url:
+            raise Exception("History table not in sign-in response and no HISTORY_URL configured")
+
+        history = session.get(urljoin(response.url, history_url), headers={'Referer': response.url}, timeout=timeout)
+        history.raise_for_status()
+        rows = parse_consumption_table(history.text)
+        if rows is None:
+            raise Exception("consumptionData table not found in history response")
+
+    return build_monthly_amounts(rows)
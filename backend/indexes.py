@@ -0,0 +1,47 @@
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+import logging
+import threading
+
+from tracing import log_event
+
+_provisioned = set()
+_provision_lock = threading.Lock()
+
+# Indexes every CID collection needs: upload dedupe, work claiming (overall and per tag), /status counters and exports
+CID_INDEXES = [
+    ([('collection', ASCENDING), ('tag', ASCENDING), ('cid', ASCENDING)], {'name': 'collection_tag_cid', 'unique': True}),
+    ([('status', ASCENDING), ('_id', ASCENDING)], {'name': 'status_id'}),
+    ([('tag', ASCENDING), ('status', ASCENDING), ('_id', ASCENDING)], {'name': 'tag_status_id'}),
+    ([('processed_date', ASCENDING)], {'name': 'processed_date'}),
+]
+
+
+def ensure_indexes(collection):
+    """Create the CID collection indexes once per process per database/collection"""
+    key = (collection.database.name, collection.name)
+    if key in _provisioned:
+        return
+
+    with _provision_lock:
+        if key in _provisioned:
+            return
+        for keys, options in CID_INDEXES:
+            try:
+                collection.create_index(keys, background=True, **options)
+            except OperationFailure as e:
+                # Legacy collections may already hold duplicates; keep working without the unique guarantee
+                log_event(f"⚠ Couldn't create index {options['name']} on {collection.name}: {str(e)[:100]}", logging.WARNING)
+                if options.get('unique'):
+                    unique_free = {k: v for k, v in options.items() if k != 'unique'}
+                    unique_free['name'] = options['name'] + '_nonunique'
+                    try:
+                        collection.create_index(keys, background=True, **unique_free)
+                    except OperationFailure:
+                        pass
+        _provisioned.add(key)
+
+def forget_indexes(collection):
+    """Provision the indexes again next time (the collection was dropped and may be re-created)"""
+    with _provision_lock:
+        _provisioned.discard((collection.database.name, collection.name))
@@ -0,0 +1,69 @@
+import csv
+import io
+import re
+import openpyxl
+
+_FLOAT_STRING = re.compile(r'^(\d+)\.0+$')
+
+
+def normalise_cid(value):
+    """Canonical CID string: strips whitespace and undoes Excel's float conversion (1234.0 -> '1234')"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer():
+            return str(int(value))
+        return str(value)
+    if isinstance(value, int):
+        return str(value)
+
+    text = str(value).strip()
+    match = _FLOAT_STRING.match(text)
+    if match:
+        return match.group(1)
+    return text or None
+
+def is_csv(filename, mimetype=None):
+    return (filename or '').lower().endswith('.csv') or mimetype in ('text/csv', 'application/csv')
+
+def iter_first_column(file, filename, mimetype=None):
+    """Stream first-column values after the header row from a CSV or a read-only workbook"""
+    if is_csv(filename, mimetype):
+        reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+        next(reader, None)  # Header
+        for row in reader:
+            yield row[0] if row else None
+        return
+
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
+            yield row[0] if row else None
+    finally:
+        wb.close()
+
+def iter_cid_chunks(file, filename, chunk_size, mimetype=None):
+    """Yield (rows_read, cid_rows, unique CIDs) chunks, deduplicating within the file; memory is bounded by the seen-CID set"""
+    seen = set()
+    chunk = []
+    rows_read = 0
+    cid_rows = 0
+    for value in iter_first_column(file, filename, mimetype):
+        rows_read += 1
+        cid = normalise_cid(value)
+        if not cid:
+            continue
+        cid_rows += 1
+        if cid in seen:
+            continue
+        seen.add(cid)
+        chunk.append(cid)
+        if len(chunk) >= chunk_size:
+            yield rows_read, cid_rows, chunk
+            chunk = []
+    yield rows_read, cid_rows, chunk
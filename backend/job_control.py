@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import threading
+
+from tracing import log_event
+
+# Internal collections are prefixed with '_' so they never show up as CID collections
+CONTROL_COLLECTION = '_job_control'
+WORKERS_COLLECTION = '_job_workers'
+
+STATES = ('running', 'paused', 'stopped')
+
+
+def set_state(db, collection_name, state, **settings):
+    """Record the desired state of processing for a CID collection; every worker process obeys it"""
+    if state not in STATES:
+        raise ValueError(f"Unknown state '{state}'")
+    db[CONTROL_COLLECTION].update_one(
+        {'_id': collection_name},
+        {'$set': {'state': state, 'updated_at': datetime.now(), **settings}},
+        upsert=True
+    )
+
+def get_state(db, collection_name):
+    """Control document for a collection, or None if it was never started"""
+    return db[CONTROL_COLLECTION].find_one({'_id': collection_name})
+
+def latest_in_state(db, states):
+    """Most recently updated control document in one of `states`, or None"""
+    return db[CONTROL_COLLECTION].find_one({'state': {'$in': list(states)}}, sort=[('updated_at', -1)])
+
+def register_worker(db, worker_key, collection_name, **info):
+    """Upsert this worker process's heartbeat"""
+    db[WORKERS_COLLECTION].update_one(
+        {'_id': worker_key},
+        {'$set': {
+            'collection': collection_name,
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'last_seen': datetime.now(),
+            **info
+        }},
+        upsert=True
+    )
+
+def unregister_worker(db, worker_key):
+    db[WORKERS_COLLECTION].delete_one({'_id': worker_key})
+
+def live_workers(db, collection_name, max_age_seconds):
+    """Worker processes that reported a heartbeat for the collection recently"""
+    cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+    return list(db[WORKERS_COLLECTION].find(
+        {'collection': collection_name, 'last_seen': {'$gte': cutoff}},
+        {'_id': 1, 'host': 1, 'pid': 1, 'mode': 1, 'concurrency': 1, 'last_seen': 1}
+    ))
+
+
+class ControlWatcher(threading.Thread):
+    """Polls a collection's control document and reports state changes to a callback"""
+
+    def __init__(self, db, collection_name, on_change, interval=2, heartbeat=None):
+        super().__init__(daemon=True)
+        self.db = db
+        self.collection_name = collection_name
+        self.on_change = on_change
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.state = None
+        self._stopped = threading.Event()
+
+    def poll(self):
+        doc = get_state(self.db, self.collection_name)
+        state = doc['state'] if doc else 'running'  # No control document: run until told otherwise
+        if state != self.state:
+            self.state = state
+            self.on_change(state)
+        if self.heartbeat:
+            self.heartbeat()
+        return state
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                log_event(f"⚠ Control poll failed for {self.collection_name}: {str(e)[:100]}", logging.WARNING)
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,72 @@
+from pymongo import MongoClient, UpdateOne
+import pymongo
+import certifi
+import os
+import threading
+
+# One client (one connection pool, one TLS handshake per connection) per URI for the whole process
+POOL_OPTIONS = {
+    'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 50)),
+    'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 2)),
+    'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_MS', 60000)),
+    'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 10000)),
+    'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000)),
+    'retryWrites': True
+}
+
+_clients = {}
+_databases = {}
+_lock = threading.Lock()
+
+
+def _uses_tls(uri):
+    lowered = (uri or '').lower()
+    return lowered.startswith('mongodb+srv://') or 'tls=true' in lowered or 'ssl=true' in lowered
+
+def get_client(uri=None):
+    """The shared MongoClient for a URI (MONGO_URI by default), created on first use"""
+    uri = uri or os.getenv('MONGO_URI')
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            options = dict(POOL_OPTIONS)
+            if _uses_tls(uri):
+                options['tlsCAFile'] = certifi.where()
+            client = _clients[uri] = MongoClient(uri, **options)
+        return client
+
+def get_db(name, uri=None):
+    """Cached database handle for a tenant on the shared client"""
+    uri = uri or os.getenv('MONGO_URI')
+    key = (uri, name)
+    with _lock:
+        database = _databases.get(key)
+    if database is None:
+        database = get_client(uri)[name]
+        with _lock:
+            database = _databases.setdefault(key, database)
+    return database
+
+def mongomock_client():
+    """In-memory mongomock client for local runs (--mongomock), checked against the installed pymongo.
+
+    mongomock 4.3 rejects the `sort` argument pymongo 4.9+ passes for UpdateOne in bulk_write,
+    which would fail every buffered result write; requirements-dev.txt pins a working pair."""
+    import mongomock
+
+    client = mongomock.MongoClient()
+    try:
+        client['_compat']['_compat'].bulk_write([UpdateOne({'_id': 1}, {'$set': {'ok': True}}, upsert=True)])
+    except TypeError as e:
+        raise RuntimeError(f"mongomock {mongomock.__version__} can't run bulk writes with pymongo {pymongo.version} ({e}). "
+                           f"Install requirements-dev.txt (pymongo<4.9) or use a local mongod with --mongo-uri")
+    client.drop_database('_compat')
+    return client
+
+def close_all():
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _databases.clear()
+    for client in clients:
+        client.close()
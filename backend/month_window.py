@@ -0,0 +1,130 @@
+import calendar
+import re
+import numpy as np
+import pandas as pd
+
+from cid_parser import parse_bill_month
+
+# Window aggregates, in column order after the per-month columns
+AGGREGATE_COLUMNS = ['Highest', 'Average', 'Total']
+MONTH_KEY = re.compile(r'^\d{4}-\d{2}$')
+
+# Amount fields stored before the full history was kept; 'April25' is 2025-04
+LEGACY_FIELDS = ('April25', 'May25', 'June25')
+
+
+def parse_window(spec):
+    """Months in a window spec such as '2025-07:2025-09' (inclusive) or '2025-04,2025-06'"""
+    if not spec:
+        return None
+    months = []
+    for part in spec.split(','):
+        start, _, end = part.strip().partition(':')
+        if not MONTH_KEY.match(start) or (end and not MONTH_KEY.match(end)):
+            raise ValueError(f"Invalid month window '{spec}'. Use YYYY-MM:YYYY-MM or a comma-separated list of YYYY-MM")
+        months.extend(str(period) for period in pd.period_range(start, end or start, freq='M'))
+    if not months:
+        raise ValueError(f"Month window '{spec}' is empty")
+    return list(dict.fromkeys(months))
+
+def month_column(month):
+    """Column name for a 'YYYY-MM' month, in the same style as the original April25/May25/June25 fields"""
+    year, number = month.split('-')
+    return f"{calendar.month_name[int(number)]}{year[2:]}"
+
+def window_columns(months):
+    return [month_column(month) for month in months] + AGGREGATE_COLUMNS
+
+def history_month(key):
+    """'YYYY-MM' of a history key or legacy field ('APR-25', 'April25', '2025-04'); None when it names no year"""
+    if not isinstance(key, str):
+        return None
+    if MONTH_KEY.match(key):
+        return key
+    return parse_bill_month(key)
+
+def document_history(doc):
+    """A document's [month, amount] pairs: its stored history, or its legacy month fields if it has none"""
+    if doc.get('history'):
+        return doc['history']
+    return [[field, doc[field]] for field in LEGACY_FIELDS if field in doc]
+
+def _window_month(key, months):
+    """Which window month a history key belongs to, compared on the full year and month"""
+    month = history_month(key)
+    return month if month in months else None
+
+def window_frame(docs, months):
+    """Per-month amounts and window aggregates for a batch of documents, computed column-wise with pandas"""
+    columns = window_columns(months)
+    if not docs:
+        return pd.DataFrame(columns=columns)
+
+    month_set = set(months)
+    positions, keys, amounts = [], [], []
+    for position, doc in enumerate(docs):
+        for key, amount in document_history(doc):
+            window_month = _window_month(key, month_set)
+            if window_month is not None:
+                positions.append(position)
+                keys.append(window_month)
+                amounts.append(np.nan if amount is None else amount)
+
+    entries = pd.DataFrame({'position': positions, 'month': keys, 'amount': np.array(amounts, dtype=float)})
+    # Later rows for the same month win, like the original field mapping
+    amounts_by_month = (entries.drop_duplicates(['position', 'month'], keep='last')
+                        .pivot(index='position', columns='month', values='amount')
+                        .reindex(index=range(len(docs)), columns=months))
+
+    frame = pd.DataFrame(amounts_by_month.to_numpy(), columns=[month_column(month) for month in months])
+    month_values = frame.iloc[:, :len(months)]
+    frame['Highest'] = month_values.max(axis=1)
+    frame['Average'] = month_values.mean(axis=1)
+    frame['Total'] = month_values.sum(axis=1, min_count=1)
+    return frame[columns]
+
+def _batches(documents, batch_size):
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_with_window(documents, months, batch_size):
+    """Attach window columns to documents as they stream past, one vectorised batch at a time"""
+    for batch in _batches(documents, batch_size):
+        yield from _attach(batch, months)
+
+def _attach(batch, months):
+    frame = window_frame(batch, months)
+    for doc, values in zip(batch, frame.to_dict('records')):
+        doc = {key: value for key, value in doc.items() if key != 'history' and key not in LEGACY_FIELDS}
+        doc.update({column: None if value != value else round(float(value), 2) for column, value in values.items()})
+        yield doc
+
+def window_summary(collection, months, query=None, batch_size=2000):
+    """Collection-wide window aggregates over processed CIDs, from the same per-document columns as the export"""
+    documents = collection.find({**(query or {}), 'status': 'processed'},
+                                {'_id': 0, 'history': 1, **{field: 1 for field in LEGACY_FIELDS}}).batch_size(batch_size)
+    cids, highest, highest_sum, total = 0, None, 0.0, 0.0
+    for batch in _batches(documents, batch_size):
+        frame = window_frame(batch, months)
+        with_amounts = frame[frame['Highest'].notna()]
+        if with_amounts.empty:
+            continue
+        cids += len(with_amounts)
+        batch_highest = float(with_amounts['Highest'].max())
+        highest = batch_highest if highest is None else max(highest, batch_highest)
+        highest_sum += float(with_amounts['Highest'].sum())
+        total += float(with_amounts['Total'].sum())
+
+    return {
+        'months': [month_column(month) for month in months],
+        'cids': cids,
+        'highest': highest,
+        'average_highest': round(highest_sum / cids, 2) if cids else None,
+        'total': round(total, 2)
+    }
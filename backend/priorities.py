@@ -0,0 +1,52 @@
+from datetime import datetime
+from pymongo import ASCENDING
+import threading
+
+# Claim priority per (collection, tag); '_' keeps it out of the CID collection list
+PRIORITY_COLLECTION = '_tag_priorities'
+
+# Collection names and tags may both contain ':', so the pair is keyed as two fields
+PRIORITY_KEY = [('collection', ASCENDING), ('tag', ASCENDING)]
+_indexed = set()
+_index_lock = threading.Lock()
+
+LEVELS = {'low': 0, 'normal': 1, 'high': 2, 'urgent': 3}
+DEFAULT_PRIORITY = LEVELS['normal']
+MAX_PRIORITY = 9
+
+
+def parse_priority(value):
+    """A level name ('low', 'normal', 'high', 'urgent') or an integer 0-9; raises ValueError otherwise"""
+    if isinstance(value, str) and value.strip().lower() in LEVELS:
+        return LEVELS[value.strip().lower()]
+    try:
+        priority = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid priority '{value}'. Use {', '.join(LEVELS)} or an integer 0-{MAX_PRIORITY}")
+    if not 0 <= priority <= MAX_PRIORITY:
+        raise ValueError(f"Priority must be between 0 and {MAX_PRIORITY}, got {priority}")
+    return priority
+
+def _ensure_index(db):
+    """One priority per (collection, tag), enforced once per process per database"""
+    if db.name in _indexed:
+        return
+    with _index_lock:
+        if db.name not in _indexed:
+            db[PRIORITY_COLLECTION].create_index(PRIORITY_KEY, name='collection_tag', unique=True)
+            _indexed.add(db.name)
+
+def set_priority(db, collection_name, tag, priority):
+    _ensure_index(db)
+    db[PRIORITY_COLLECTION].update_one(
+        {'collection': collection_name, 'tag': tag},
+        {'$set': {'priority': priority, 'updated_at': datetime.now()}},
+        upsert=True
+    )
+
+def get_priorities(db, collection_name):
+    """{tag: priority} for the tags of a collection that have one set"""
+    return {doc['tag']: doc['priority'] for doc in db[PRIORITY_COLLECTION].find({'collection': collection_name})}
+
+def clear_priorities(db, collection_name):
+    db[PRIORITY_COLLECTION].delete_many({'collection': collection_name})
@@ -0,0 +1,71 @@
+from collections import Counter
+from datetime import datetime
+import cProfile
+import os
+import sys
+import threading
+
+from tracing import log_event
+
+MODES = ('cprofile', 'sampling')
+
+
+class WorkerProfiler:
+    """Profile one worker thread for the duration of a `with` block and dump the result to `directory`.
+
+    'cprofile' writes a pstats file (python -m pstats, snakeviz). 'sampling' snapshots the
+    thread's stack every `interval` seconds and writes collapsed stacks in the format
+    py-spy --format raw produces, ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, mode, directory, name, interval=0.01):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Available modes: {', '.join(MODES)}")
+        self.mode = mode
+        self.directory = directory
+        self.name = name
+        self.interval = interval
+        self.path = None
+        self._profile = None
+        self._samples = Counter()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        if self.mode == 'cprofile':
+            self.path = os.path.join(self.directory, f'{self.name}-{stamp}.prof')
+            # cProfile only instruments the thread that enables it: exactly this worker
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self.path = os.path.join(self.directory, f'{self.name}-{stamp}.folded')
+            target = threading.get_ident()
+            self._sampler = threading.Thread(target=self._sample, args=(target,), daemon=True)
+            self._sampler.start()
+        return self
+
+    def _sample(self, target):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self._samples[';'.join(reversed(stack))] += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.path)
+        else:
+            self._stopped.set()
+            self._sampler.join()
+            with open(self.path, 'w') as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f'{stack} {count}\n')
+        log_event(f"🔬 Profile written to {self.path}")
+        return False
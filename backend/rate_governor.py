@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+import aiohttp
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Responses with which the portal asks us to slow down
+BACKPRESSURE_STATUSES = (429, 503)
+
+# Chrome errors for a request the portal was too slow to answer
+BROWSER_TIMEOUT_MARKERS = ('ERR_TIMED_OUT', 'ERR_CONNECTION_TIMED_OUT')
+
+
+def is_backpressure_error(error):
+    """Failures that mean the portal is overloaded: 429/503 responses and timeouts.
+
+    A CAPTCHA rejection is our own misread of the question, not a load signal, so it is not one."""
+    if error is None:
+        return False
+    if isinstance(error, (requests.Timeout, asyncio.TimeoutError, TimeoutException)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in BACKPRESSURE_STATUSES
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in BACKPRESSURE_STATUSES
+    if isinstance(error, WebDriverException):
+        return any(marker in str(error) for marker in BROWSER_TIMEOUT_MARKERS)
+    return False
+
+
+class RateGovernor:
+    """Shared token bucket (CIDs/sec) plus an AIMD concurrency limit toward the billing portal.
+
+    Every engine calls acquire() before a portal attempt and release() after it. Healthy,
+    fast attempts raise the rate and the concurrency limit additively; errors or latency
+    above the target cut both multiplicatively (at most once per cooldown window).
+    """
+
+    def __init__(self, rate, min_rate, max_rate, concurrency, min_concurrency, max_concurrency,
+                 latency_target, rate_step=0.1, decrease_factor=0.5, cooldown=5):
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.rate_step = rate_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.burst = max(1.0, self.rate)
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.last_refill = time.monotonic()
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _try_acquire(self):
+        """Take a slot and a token if both are available; otherwise return how long to wait"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.in_flight >= int(self.limit):
+            return 0.05
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def acquire(self, should_stop=lambda: False):
+        """Block until the governor admits one more attempt; False if stop was requested meanwhile"""
+        with self._lock:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return True
+                if should_stop():
+                    return False
+                self._released.wait(min(wait, 1))
+
+    async def acquire_async(self, should_stop=lambda: False):
+        """Event-loop variant of acquire() sharing the same bucket and limit"""
+        while True:
+            with self._lock:
+                wait = self._try_acquire()
+            if wait == 0:
+                return True
+            if should_stop():
+                return False
+            await asyncio.sleep(min(wait, 1))
+
+    def release(self, latency, error=None):
+        """Report how an admitted attempt went and adapt rate and concurrency"""
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if is_backpressure_error(error) or latency > self.latency_target:
+                if now - self.last_decrease >= self.cooldown:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    self.burst = max(1.0, self.rate)
+                    self.last_decrease = now
+                    self.decreases += 1
+            elif error is None:
+                # Additive increase: about +1 concurrency per `limit` successes
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+                self.burst = max(1.0, self.rate)
+            self._released.notify_all()
+
+    def warm_start(self, rate, concurrency):
+        """Lift the rate and limit to a new job's starting point, unless the portal pushed back within the cooldown"""
+        with self._lock:
+            if self.decreases and time.monotonic() - self.last_decrease < self.cooldown:
+                return False
+            self.rate = min(self.max_rate, max(self.rate, float(rate)))
+            self.limit = min(self.max_concurrency, max(self.limit, float(concurrency)))
+            self.burst = max(1.0, self.rate)
+            self._released.notify_all()
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_per_sec': round(self.rate, 2),
+                'concurrency_limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'decreases': self.decreases
+            }
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+import logging
+import threading
+
+from result_writer import ResultWriter
+from tracing import log_event
+
+CACHE_COLLECTION = '_result_cache'
+
+
+class ResultCache:
+    """Scraped monthly amounts keyed by CID, shared across tags and collections.
+
+    An in-process LRU sits in front of a Mongo collection; entries older than the TTL
+    count as misses so the CID is scraped again.
+    """
+
+    def __init__(self, db, ttl_seconds, lru_size=100000):
+        self.collection = db[CACHE_COLLECTION]
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = ResultWriter(self.collection)
+        self.hits = 0
+        self.misses = 0
+        try:
+            # Let Mongo drop entries some time after they stop being useful
+            self.collection.create_index('fetched_at', expireAfterSeconds=int(ttl_seconds) * 2, name='fetched_at_ttl')
+        except OperationFailure as e:
+            log_event(f"⚠ Couldn't create result cache TTL index: {str(e)[:100]}", logging.WARNING)
+
+    def _fresh(self, fetched_at):
+        return fetched_at is not None and datetime.now() - fetched_at < self.ttl
+
+    def _remember(self, cid, fetched_at, monthly_amounts):
+        with self._lock:
+            self._lru[cid] = (fetched_at, monthly_amounts)
+            self._lru.move_to_end(cid)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get_many(self, cids):
+        """Fresh cached amounts for the given CIDs, as {cid: monthly_amounts}; one Mongo query for LRU misses"""
+        found = self._lookup(cids)
+        self.record(len(found), len(cids) - len(found))
+        return found
+
+    def _lookup(self, cids):
+        found = {}
+        missing = []
+        with self._lock:
+            for cid in cids:
+                entry = self._lru.get(cid)
+                if entry and self._fresh(entry[0]):
+                    self._lru.move_to_end(cid)
+                    found[cid] = entry[1]
+                else:
+                    missing.append(cid)
+
+        if missing:
+            cutoff = datetime.now() - self.ttl
+            for doc in self.collection.find({'_id': {'$in': missing}, 'fetched_at': {'$gt': cutoff}}):
+                found[doc['_id']] = doc['monthly_amounts']
+                self._remember(doc['_id'], doc['fetched_at'], doc['monthly_amounts'])
+        return found
+
+    def peek(self, cid):
+        """Fresh amounts for a CID from the in-process LRU only (no database round trip), or None"""
+        with self._lock:
+            entry = self._lru.get(cid)
+            if entry and self._fresh(entry[0]):
+                self._lru.move_to_end(cid)
+                return entry[1]
+        return None
+
+    def preload(self, cids):
+        """Pull the Mongo entries of CIDs about to be claimed into the LRU with one query (not counted as lookups)"""
+        self._lookup(cids)
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, cid):
+        """Fresh cached amounts for one CID, or None"""
+        return self.get_many([cid]).get(cid)
+
+    def put(self, cid, monthly_amounts):
+        """Store freshly scraped amounts; the Mongo write is buffered"""
+        fetched_at = datetime.now()
+        self._remember(cid, fetched_at, monthly_amounts)
+        self._writer.submit(UpdateOne(
+            {'_id': cid},
+            {'$set': {'monthly_amounts': monthly_amounts, 'fetched_at': fetched_at}},
+            upsert=True
+        ))
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'lru_entries': len(self._lru),
+                'pending_writes': self._writer.stats()['queue_depth']
+            }
+
+
+class PagedLookup:
+    """Cache lookups for CIDs that are claimed one at a time, done a page at a time.
+
+    The first CID of a page loads the cache entries of the next `page_size` queued CIDs into
+    the LRU with one query; the CIDs after it are then answered without a database round trip.
+    """
+
+    def __init__(self, cache, page_size=100, remember=10000):
+        self.cache = cache
+        self.page_size = page_size
+        self.remember = remember
+        self._checked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cid, next_cids):
+        """Fresh cached amounts for `cid`, or None. `next_cids(limit)` lists the queued CIDs after it"""
+        monthly_amounts = self.cache.peek(cid)
+        if monthly_amounts is None:
+            with self._lock:
+                checked = self._checked.pop(cid, False)
+            if not checked:
+                page = next_cids(self.page_size - 1)
+                self.cache.preload([cid] + page)
+                with self._lock:
+                    self._checked.update((queued, True) for queued in page)
+                    while len(self._checked) > self.remember:
+                        self._checked.popitem(last=False)
+                monthly_amounts = self.cache.peek(cid)
+        self.cache.record(monthly_amounts is not None, monthly_amounts is None)
+        return monthly_amounts
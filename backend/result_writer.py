@@ -0,0 +1,156 @@
+from pymongo.errors import BulkWriteError, ConnectionFailure
+import logging
+import queue
+import threading
+import time
+
+from tracing import log_event
+
+
+class ResultWriter:
+    """Queues per-CID update operations and flushes them as unordered bulk_write batches every N results or T ms.
+
+    Operations that can't be written are retried (forever while the server is unreachable, up to
+    `max_attempts` for any other error) and then handed to `on_error(results, error)` instead
+    of being dropped silently; `results` are the (operation, meta) pairs given to submit()."""
+
+    def __init__(self, collection, flush_size=100, flush_interval_ms=500, on_flush=None, on_write=None,
+                 on_error=None, max_attempts=3):
+        self.collection = collection
+        self.on_flush = on_flush
+        self.on_write = on_write  # Called with the seconds each bulk_write took
+        self.on_error = on_error
+        self.max_attempts = max_attempts
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._pending = 0
+        self._pending_changed = threading.Condition()
+        self._closed = threading.Event()
+        self.flushes = 0
+        self.written = 0
+        self.errors = 0
+        self.given_up = 0
+        self.last_error = None
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, operation, meta=None):
+        """Queue one pymongo write operation (UpdateOne etc.) with whatever `on_error` needs to know about it;
+        never blocks on the database"""
+        with self._pending_changed:
+            self._pending += 1
+        self._queue.put((operation, meta, 0))
+
+    def _drain(self, limit=None):
+        operations = []
+        while limit is None or len(operations) < limit:
+            try:
+                operations.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return operations
+
+    def _write(self, entries):
+        """Write (operation, meta, attempts) entries; failed ones go back on the queue or to on_error"""
+        if not entries:
+            return
+        retry, given_up, error = [], [], None
+        with self._write_lock:
+            started = time.monotonic()
+            try:
+                result = self.collection.bulk_write([operation for operation, _, _ in entries], ordered=False)
+                self.written += result.modified_count + result.upserted_count
+            except BulkWriteError as e:
+                # Unordered: everything except the reported operations was applied; those won't succeed on a retry
+                write_errors = e.details.get('writeErrors', [])
+                self.written += e.details.get('nModified', 0) + e.details.get('nUpserted', 0)
+                self.errors += len(write_errors)
+                error = str(e)[:200]
+                given_up = [entries[write_error['index']] for write_error in write_errors]
+                log_event(f"⚠ Bulk write had {len(write_errors)} errors: {str(e)[:100]}", logging.WARNING)
+            except ConnectionFailure as e:
+                # Keep the results and try again on the next flush
+                self.errors += 1
+                error = str(e)[:200]
+                retry = entries
+                log_event(f"⚠ Bulk write failed, re-queueing {len(entries)} results: {str(e)[:100]}", logging.WARNING)
+                time.sleep(self.flush_interval)
+            except Exception as e:
+                self.errors += 1
+                error = f'{type(e).__name__}: {str(e)[:200]}'
+                for operation, meta, attempts in entries:
+                    (retry if attempts + 1 < self.max_attempts else given_up).append((operation, meta, attempts + 1))
+                log_event(f"❌ Bulk write of {len(entries)} results failed ({len(retry)} re-queued): {str(e)[:100]}", logging.ERROR)
+            finally:
+                self.last_flush_ms = (time.monotonic() - started) * 1000
+                if self.on_write:
+                    self.on_write(self.last_flush_ms / 1000)
+                self.total_flush_ms += self.last_flush_ms
+                self.flushes += 1
+        for entry in retry:
+            self._queue.put(entry)
+        if error:
+            self.last_error = error
+        if given_up:
+            self.given_up += len(given_up)
+            if self.on_error:
+                try:
+                    self.on_error([(operation, meta) for operation, meta, _ in given_up], error)
+                except Exception as e:
+                    log_event(f"⚠ Write failure callback failed: {str(e)[:100]}", logging.WARNING)
+        done = len(entries) - len(retry)
+        with self._pending_changed:
+            self._pending -= done
+            self._pending_changed.notify_all()
+        if self.on_flush and done:
+            self.on_flush()
+
+    def _run(self):
+        while not self._closed.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            while len(batch) < self.flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self, timeout=30):
+        """Synchronously write everything queued so far, including a batch the background thread is holding"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            entries = self._drain(self.flush_size)
+            if entries:
+                self._write(entries)
+                continue
+            with self._pending_changed:
+                if self._pending == 0:
+                    return True
+                self._pending_changed.wait(timeout=0.05)
+        return False
+
+    def close(self):
+        """Stop the background thread after flushing what is left"""
+        self._closed.set()
+        self._thread.join(timeout=self.flush_interval * 2 + 5)
+        self.flush()
+
+    def stats(self):
+        return {
+            'queue_depth': self._pending,
+            'flushes': self.flushes,
+            'written': self.written,
+            'errors': self.errors,
+            'given_up': self.given_up,
+            'last_error': self.last_error,
+            'last_flush_ms': round(self.last_flush_ms, 1),
+            'avg_flush_ms': round(self.total_flush_ms / self.flushes, 1) if self.flushes else 0.0
+        }
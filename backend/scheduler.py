@@ -0,0 +1,374 @@
+from datetime import datetime
+import itertools
+import logging
+import threading
+import time
+import uuid
+
+from tracing import log_event
+
+ACTIVE_STATES = ('running', 'paused')
+FINISHED_JOBS_KEPT = 200
+
+
+class Job:
+    """One collection being processed for one tenant, with its own controls and counters"""
+
+    def __init__(self, db, collection_name, engine, mode='threads', workers=1, concurrency=1, weight=1, profile=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.db = db
+        self.tenant = db.name
+        self.collection_name = collection_name
+        self.engine = engine
+        self.mode = mode
+        self.workers = workers
+        self.concurrency = concurrency
+        self.weight = max(float(weight), 0.01)
+        self.profile = profile
+        self.state = 'running'
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.processed = 0
+        self.failed = 0
+        self.write_failures = 0
+        self.last_write_error = None
+        self.active_workers = 0
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self.wake_at = 0.0
+        self.tag_weights = {}
+        self.tag_virtual_time = {}
+        self.tag_priorities = {}
+        self.tags_refreshed_at = None
+        self._tag_wake = {}
+        self._tag_served = {}
+        self._pending_processed = 0
+        self._pending_failed = []
+        self._pending_unfailed = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def should_pause(self):
+        return self.state == 'paused'
+
+    @property
+    def should_stop(self):
+        return self.state not in ACTIVE_STATES
+
+    @property
+    def active(self):
+        return self.state in ACTIVE_STATES
+
+    def wait(self, timeout=None):
+        """Block until the job has ended and its last worker has let go of it"""
+        return self._done.wait(timeout)
+
+    def begin_cid(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end_cid(self, processed=False, failed_cid=None):
+        """Count a CID that left the worker: processed, finally failed, or neither (retry scheduled or released)"""
+        with self._lock:
+            self.in_flight -= 1
+            if processed:
+                self.processed += 1
+                self._pending_processed += 1
+            if failed_cid is not None:
+                self.failed += 1
+                self._pending_failed.append(failed_cid)
+
+    def record_write_failure(self, processed, failed, error):
+        """Take back results the writer gave up on: `processed` successes and `failed` final failures went unsaved"""
+        with self._lock:
+            self.processed -= processed
+            self._pending_processed -= processed
+            self.failed -= failed
+            self._pending_unfailed += failed
+            self.write_failures += processed + failed
+            self.last_write_error = error
+
+    def take_progress(self, batch_size=1):
+        """(processed, failed_cids, unfailed) not yet checkpointed, once at least `batch_size` CIDs have piled up.
+
+        `unfailed` takes back failures counted earlier whose result was never written"""
+        with self._lock:
+            if abs(self._pending_processed) + len(self._pending_failed) + self._pending_unfailed < batch_size:
+                return None
+            progress = (self._pending_processed, self._pending_failed, self._pending_unfailed)
+            self._pending_processed, self._pending_failed, self._pending_unfailed = 0, [], 0
+            return progress
+
+    def set_tags(self, tags, priorities=None):
+        """Replace the tags that currently have claimable work (and their priorities); known tags keep their virtual time"""
+        now = time.monotonic()
+        with self._lock:
+            floor = min(self.tag_virtual_time.values(), default=0.0)
+            self.tag_virtual_time = {tag: self.tag_virtual_time.get(tag, floor) for tag in tags}
+            self.tag_priorities = {tag: (priorities or {}).get(tag, 0) for tag in tags}
+            self._tag_served = {tag: self._tag_served.get(tag, now) for tag in tags}
+            self.tags_refreshed_at = now
+
+    def pick_tag(self, aging_seconds=None):
+        """Tag to claim the next CID from, or None to claim from any tag.
+
+        The highest priority wins; a tag gains one level for every `aging_seconds` it goes
+        unserved, so low priorities still make progress. Equal levels share by virtual time."""
+        now = time.monotonic()
+        with self._lock:
+            ready = [tag for tag in self.tag_virtual_time if self._tag_wake.get(tag, 0) <= now]
+            if not ready:
+                return None
+
+            def rank(tag):
+                level = self.tag_priorities.get(tag, 0)
+                if aging_seconds:
+                    level += int((now - self._tag_served.get(tag, now)) // aging_seconds)
+                return (-level, self.tag_virtual_time[tag], str(tag))
+
+            tag = min(ready, key=rank)
+            self.tag_virtual_time[tag] += 1 / self.tag_weights.get(tag, 1)
+            self._tag_served[tag] = now
+            return tag
+
+    def snooze_tag(self, tag, seconds):
+        """Skip a tag whose claim came back empty until the tag list is next refreshed"""
+        with self._lock:
+            self._tag_wake[tag] = time.monotonic() + seconds
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'tenant': self.tenant,
+            'collection': self.collection_name,
+            'engine': self.engine,
+            'mode': self.mode,
+            'workers': self.workers,
+            'concurrency': self.concurrency if self.mode == 'async' else None,
+            'weight': self.weight,
+            'profile': self.profile,
+            'state': self.state,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            'processed': self.processed,
+            'failed': self.failed,
+            'write_failures': self.write_failures,
+            'last_write_error': self.last_write_error,
+            'active_workers': self.active_workers,
+            'in_flight': self.in_flight,
+            'tags': sorted(self.tag_virtual_time, key=str),
+            'tag_priorities': {str(tag): priority for tag, priority in self.tag_priorities.items()}
+        }
+
+
+class WorkerSlot:
+    """One unit of the worker budget; `resources` holds whatever the work callback keeps between CIDs"""
+
+    def __init__(self, slot_id):
+        self.id = slot_id
+        self.resources = {}
+        self.retired = False
+
+
+class Scheduler:
+    """Shares a budget of worker slots between concurrent jobs by weighted fair queuing.
+
+    A free slot is granted to the tenant with the lowest virtual time, then to that tenant's
+    job with the lowest virtual time; each grant advances both by 1/weight, so busy tenants
+    split the budget in proportion to their weights and one big upload can't starve the
+    others. Slots are threads started on demand and retired after `idle_timeout` without
+    work. Async jobs drive their own event loop and hold one slot of the budget while active.
+    """
+
+    def __init__(self, budget, work, close_slot=None, idle_timeout=5, tenant_weights=None):
+        self.budget = budget
+        self.work = work
+        self.close_slot = close_slot
+        self.idle_timeout = idle_timeout
+        self.tenant_weights = dict(tenant_weights or {})
+        self.jobs = {}
+        self.slots = 0
+        self.busy = 0
+        self.granted = 0
+        self._tenant_vt = {}
+        self._slot_ids = itertools.count(1)
+        self._cond = threading.Condition()
+
+    # --- Job lifecycle ---
+
+    def submit(self, job):
+        """Register a job and start worker slots for it if the budget allows"""
+        with self._cond:
+            active = [j for j in self.jobs.values() if j.active]
+            # Newcomers start level with the least-served active work instead of with a backlog of credit
+            job.virtual_time = min((j.virtual_time for j in active if j.tenant == job.tenant), default=0.0)
+            if not any(j.tenant == job.tenant for j in active):
+                floor = min((self._tenant_vt.get(j.tenant, 0.0) for j in active), default=0.0)
+                self._tenant_vt[job.tenant] = max(self._tenant_vt.get(job.tenant, 0.0), floor)
+            if job.mode == 'async':
+                job.active_workers = 1  # Held by the job's event loop thread until it calls release()
+            self.jobs[job.id] = job
+            self._prune()
+            self._spawn()
+            self._cond.notify_all()
+        return job
+
+    def pause(self, job):
+        return self._transition(job, 'paused', ('running',))
+
+    def resume(self, job):
+        return self._transition(job, 'running', ('paused',))
+
+    def stop(self, job):
+        return self.complete(job, 'stopped')
+
+    def complete(self, job, state='finished'):
+        """End an active job ('finished', 'stopped' or 'failed'); False if it had already ended"""
+        with self._cond:
+            if not job.active:
+                return False
+            job.state = state
+            job.finished_at = datetime.now()
+            if job.active_workers == 0:
+                job._done.set()
+            self._cond.notify_all()
+            return True
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _transition(self, job, state, allowed):
+        with self._cond:
+            if job.state not in allowed:
+                return False
+            job.state = state
+            self._spawn()
+            self._cond.notify_all()
+            return True
+
+    def _prune(self):
+        finished = sorted((j for j in self.jobs.values() if not j.active), key=lambda j: j.started_at)
+        for job in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self.jobs[job.id]
+
+    # --- Lookups ---
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self, tenant=None):
+        """Jobs, most recently started first"""
+        with self._cond:
+            jobs = [j for j in self.jobs.values() if tenant is None or j.tenant == tenant]
+        return sorted(jobs, key=lambda j: j.started_at, reverse=True)
+
+    def active_jobs(self, tenant=None):
+        return [j for j in self.list(tenant) if j.active]
+
+    def find(self, tenant, collection_name):
+        """The active job on a collection, else its most recent one"""
+        jobs = [j for j in self.list(tenant) if j.collection_name == collection_name]
+        return next((j for j in jobs if j.active), jobs[0] if jobs else None)
+
+    # --- Worker slots ---
+
+    def _slot_budget(self):
+        return max(0, self.budget - sum(1 for j in self.jobs.values() if j.mode == 'async' and j.active_workers))
+
+    def _spawn(self):
+        wanted = sum(j.workers for j in self.jobs.values() if j.mode == 'threads' and j.state == 'running')
+        while self.slots < min(wanted, self._slot_budget()):
+            self.slots += 1
+            slot = WorkerSlot(next(self._slot_ids))
+            threading.Thread(target=self._run_slot, args=(slot,), name=f'slot-{slot.id}', daemon=True).start()
+
+    def _runnable(self, job, now):
+        return job.mode == 'threads' and job.state == 'running' and job.active_workers < job.workers and job.wake_at <= now
+
+    def _pick(self, now):
+        runnable = [j for j in self.jobs.values() if self._runnable(j, now)]
+        if not runnable:
+            return None
+        tenant = min({j.tenant for j in runnable}, key=lambda t: (self._tenant_vt.get(t, 0.0), t))
+        job = min((j for j in runnable if j.tenant == tenant), key=lambda j: (j.virtual_time, j.started_at))
+        self._tenant_vt[tenant] = self._tenant_vt.get(tenant, 0.0) + 1 / self.tenant_weights.get(tenant, 1)
+        job.virtual_time += 1 / job.weight
+        return job
+
+    def _acquire(self, slot):
+        """Block until some job has work for this slot; None once the slot should retire"""
+        deadline = time.monotonic() + self.idle_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.slots > self._slot_budget():
+                    break
+                job = self._pick(now)
+                if job:
+                    job.active_workers += 1
+                    self.busy += 1
+                    self.granted += 1
+                    return job
+                wakes = [j.wake_at for j in self.jobs.values() if j.mode == 'threads' and j.state == 'running' and j.wake_at > now]
+                if now >= deadline:
+                    # The last slot stays for snoozed jobs: nothing else would start a slot when they wake
+                    if not wakes or self.slots > 1:
+                        break
+                    self._cond.wait(min(wakes) - now)
+                    continue
+                self._cond.wait(min([deadline] + wakes) - now)
+            slot.retired = True
+            self.slots -= 1
+            return None
+
+    def release(self, job, idle_for=None):
+        """Hand a slot's grant back; `idle_for` means the job had nothing claimable and is skipped for that long"""
+        with self._cond:
+            job.active_workers -= 1
+            if job.mode == 'threads':
+                self.busy -= 1
+            if idle_for is not None:
+                # Nothing was processed, so the grant doesn't count against the job or its tenant
+                job.virtual_time -= 1 / job.weight
+                self._tenant_vt[job.tenant] = self._tenant_vt.get(job.tenant, 0.0) - 1 / self.tenant_weights.get(job.tenant, 1)
+                job.wake_at = time.monotonic() + idle_for
+            if not job.active and job.active_workers == 0:
+                job._done.set()
+            self._spawn()  # An async job's share of the budget may be free again
+            self._cond.notify_all()
+
+    def _run_slot(self, slot):
+        try:
+            while True:
+                job = self._acquire(slot)
+                if job is None:
+                    return
+                idle_for = None
+                try:
+                    idle_for = self.work(job, slot)
+                except Exception as e:
+                    log_event(f"❌ Slot {slot.id} failed on job {job.id}: {str(e)[:200]}", logging.ERROR)
+                finally:
+                    self.release(job, idle_for)
+        finally:
+            if not slot.retired:
+                with self._cond:
+                    self.slots -= 1
+            if self.close_slot:
+                try:
+                    self.close_slot(slot)
+                except Exception as e:
+                    log_event(f"⚠ Error closing slot {slot.id}: {str(e)[:100]}", logging.WARNING)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'budget': self.budget,
+                'slots': self.slots,
+                'busy_slots': self.busy,
+                'grants': self.granted,
+                'active_jobs': sum(1 for j in self.jobs.values() if j.active),
+                'tenant_virtual_time': {tenant: round(vt, 2) for tenant, vt in self._tenant_vt.items()}
+            }
@@ -0,0 +1,80 @@
+import threading
+import time
+
+STATUSES = ('processed', 'failed', 'new', 'processing')
+
+
+def aggregate_counts(collection):
+    """All status counters, per-tag breakdown and the tag list from a single $group aggregation"""
+    pipeline = [{'$group': {'_id': {'tag': '$tag', 'status': '$status'}, 'count': {'$sum': 1}}}]
+
+    counts = {'total': 0, **{status: 0 for status in STATUSES}}
+    per_tag = {}
+    for group in collection.aggregate(pipeline):
+        tag = group['_id'].get('tag')
+        status = group['_id'].get('status')
+        count = group['count']
+
+        counts['total'] += count
+        if status in counts:
+            counts[status] += count
+
+        if tag is not None:
+            tag_counts = per_tag.setdefault(tag, {'total': 0, **{s: 0 for s in STATUSES}})
+            tag_counts['total'] += count
+            if status in tag_counts:
+                tag_counts[status] += count
+
+    counts['tags'] = sorted(per_tag, key=str)
+    counts['per_tag'] = per_tag
+    return counts
+
+
+class StatusCache:
+    """Short-TTL cache of aggregate_counts so many dashboards share one aggregation"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._changed = threading.Condition()
+
+    def get(self, collection):
+        key = (collection.database.name, collection.name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        counts = aggregate_counts(collection)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, counts)
+        return counts
+
+    def invalidate(self, collection=None):
+        """Drop cached counters (all, or one collection's) and wake up status streams"""
+        with self._lock:
+            if collection is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((collection.database.name, collection.name), None)
+        self.notify()
+
+    @property
+    def version(self):
+        with self._changed:
+            return self._version
+
+    def notify(self):
+        """Wake up status streams; they re-read counters through the TTL cache"""
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, seen_version, timeout):
+        """Block until counters change after `seen_version` or the timeout passes; returns the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != seen_version, timeout=timeout)
+            return self._version
@@ -0,0 +1,123 @@
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException
+
+import browser_pool
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise InvalidSessionIdException('session deleted because of page crash')
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class ChromeFactory:
+    """Stands in for webdriver.Chrome; launches fail while `failing` is set"""
+
+    def __init__(self):
+        self.failing = False
+        self.drivers = []
+        self.options = []
+
+    def __call__(self, service=None, options=None):
+        self.options.append(options)
+        if self.failing:
+            raise RuntimeError('chrome not reachable')
+        driver = FakeDriver()
+        self.drivers.append(driver)
+        return driver
+
+
+@pytest.fixture
+def chrome(monkeypatch):
+    factory = ChromeFactory()
+    monkeypatch.setattr(browser_pool.webdriver, 'Chrome', factory)
+    monkeypatch.setattr(browser_pool, 'resolve_driver_path', lambda: '/bin/true')
+    monkeypatch.setattr(browser_pool, 'apply_profile', lambda driver, profile: None)
+    return factory
+
+
+def test_crashed_browser_is_replaced_in_place(chrome):
+    pool = BrowserPool(max_rss_mb=0)
+    browser = pool.acquire()
+    crashed = browser.driver
+    crashed.alive = False
+
+    pool.mark_used(browser, 1.0, InvalidSessionIdException('invalid session id'))
+
+    assert browser.driver is not crashed and browser.is_healthy()
+    assert crashed.quit_called
+    assert pool.stats()['crashed'] == 1
+    assert pool.stats()['launched'] == 2
+
+
+def test_healthy_browser_is_kept_after_a_timeout(chrome):
+    pool = BrowserPool(max_rss_mb=0)
+    browser = pool.acquire()
+    driver = browser.driver
+
+    pool.mark_used(browser, 1.0, TimeoutException('history button never appeared'))
+
+    assert browser.driver is driver
+    assert pool.stats()['crashed'] == 0
+
+
+def test_failed_replacement_never_leaves_a_quit_driver(chrome):
+    pool = BrowserPool(max_uses=1, max_rss_mb=0)
+    browser = pool.acquire()
+    chrome.failing = True
+
+    pool.mark_used(browser)  # Recycle is due, but Chrome won't start: must not raise
+    assert browser.driver is None
+    with pytest.raises(RuntimeError):
+        pool.ensure_ready(browser)
+
+    chrome.failing = False
+    pool.ensure_ready(browser)
+    assert browser.is_healthy()
+
+
+def test_pooled_scrape_recovers_from_a_crash(chrome, monkeypatch):
+    import app
+
+    pool = BrowserPool(max_rss_mb=0)
+    monkeypatch.setattr(app, 'browser_pool', pool)
+    browser = pool.acquire()
+
+    def crash(driver, cid):
+        driver.alive = False
+        raise InvalidSessionIdException('invalid session id')
+    monkeypatch.setattr(app, 'scrape_cid_selenium', crash)
+    with pytest.raises(InvalidSessionIdException):
+        app.scrape_cid_pooled(browser, '1')
+
+    monkeypatch.setattr(app, 'scrape_cid_selenium', lambda driver, cid: {'Highest': driver.execute_script('')})
+    assert app.scrape_cid_pooled(browser, '2') == {'Highest': 1}
+
+
+def test_lean_browsers_only_resolve_the_portal_hosts(chrome, monkeypatch):
+    monkeypatch.setenv('BROWSER_ALLOWED_HOSTS', ' cdn.portal.example ,')
+    hosts = browser_pool.portal_hosts(['https://WWW.Portal.example/view', 'https://www.portal.example/', None])
+    assert hosts == ['cdn.portal.example', 'www.portal.example']
+
+    pool = BrowserPool(max_rss_mb=0, allowed_hosts=hosts)
+    pool.acquire('lean')
+    pool.acquire()
+
+    lean, standard = (options.arguments for options in chrome.options)
+    assert '--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE cdn.portal.example, EXCLUDE *.cdn.portal.example, ' \
+           'EXCLUDE www.portal.example, EXCLUDE *.www.portal.example' in lean
+    assert not any(argument.startswith('--host-resolver-rules') for argument in standard)
+
+
+def test_blocked_urls_add_the_environment_patterns(monkeypatch):
+    monkeypatch.setenv('BROWSER_BLOCKED_URLS', '*.svg, *widgets.portal.example*')
+    assert browser_pool.blocked_urls() == browser_pool.LEAN_BLOCKED_URLS + ['*.svg', '*widgets.portal.example*']
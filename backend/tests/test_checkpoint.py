@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import checkpoint
+import job_control
+
+
+def test_start_after_stop_continues_the_counters(core, monkeypatch):
+    monkeypatch.setitem(core.CONFIG, 'PROCESSING_BACKEND', 'external')
+    checkpoint.begin(core.db, 'bills', engine='http')
+    checkpoint.record(core.db, 'bills', 5, 2, ['11', '12'])
+    checkpoint.set_state(core.db, 'bills', 'stopped')
+    client = core.app.test_client()
+
+    assert client.post('/start', json={'collection': 'bills', 'engine': 'http'}).status_code == 200
+    status = client.get('/status?collection=bills').get_json()
+    assert (status['total_processed'], status['total_failed'], status['resumes']) == (5, 2, 1)
+    assert client.get('/failed-cids?collection=bills').get_json()['cids'] == ['11', '12']
+
+    client.post('/stop', json={'collection': 'bills'})
+    assert client.post('/start', json={'collection': 'bills', 'engine': 'http', 'resume': False}).status_code == 200
+    status = client.get('/status?collection=bills').get_json()
+    assert (status['total_processed'], status['total_failed'], status['resumes']) == (0, 0, 0)
+    assert client.get('/failed-cids?collection=bills').get_json()['count'] == 0
+
+
+def test_boot_resubmits_running_and_paused_jobs(core):
+    checkpoint.begin(core.db, 'bills', engine='http', mode='threads', workers=1)
+    checkpoint.record(core.db, 'bills', 7, 0)
+    # A retry that isn't due yet keeps the resubmitted job running for the rest of the test
+    core.db['bills'].insert_one({'cid': '1', 'status': 'new', 'next_attempt_at': datetime.now() + timedelta(hours=1)})
+    checkpoint.begin(core.db, 'archive', state='paused', engine='http', mode='threads', workers=1)
+    checkpoint.begin(core.db, 'done', engine='http')
+    checkpoint.set_state(core.db, 'done', 'finished')
+
+    resumed = core.resume_unfinished(core.db)
+
+    assert sorted((job.collection_name, job.state) for job in resumed) == [('archive', 'paused'), ('bills', 'running')]
+    assert core.scheduler.find(core.db.name, 'done') is None
+    saved = checkpoint.get(core.db, 'bills')
+    assert (saved['state'], saved['total_processed'], saved['resumes']) == ('running', 7, 1)
+    assert core.scheduler.find(core.db.name, 'archive').state == 'paused'
+    assert checkpoint.get(core.db, 'archive')['state'] == 'paused'
+    assert job_control.get_state(core.db, 'archive')['state'] == 'paused'
+
+    # Jobs that are already running are left alone
+    assert core.resume_unfinished(core.db) == []
+
+
+def test_status_reads_the_checkpoint_once_per_ttl(core, monkeypatch):
+    reads = []
+    real_get = checkpoint.get
+    monkeypatch.setattr(checkpoint, 'get', lambda db, job: reads.append(job) or real_get(db, job))
+    client = core.app.test_client()
+
+    client.get('/status?collection=bills')
+    client.get('/status?collection=bills')
+    assert reads == ['bills']
+
+
+def test_boot_resumes_every_tenant(core):
+    server = type(core.db.client)()  # A server of our own, so other tests' databases stay out of it
+    acme, globex, unused = server['acme'], server['globex'], server['unused']
+    for database in (acme, globex):
+        checkpoint.begin(database, 'bills', state='paused', engine='http', mode='threads', workers=1)
+    unused['bills'].insert_one({'cid': '1', 'status': 'new'})
+
+    resumed = core.resume_all_tenants(server)
+
+    assert sorted(job.tenant for job in resumed) == ['acme', 'globex']
+    for job in resumed:
+        core.scheduler.stop(job)
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import cid_parser
+import fake_portal
+
+
+def test_clean_amount():
+    assert cid_parser.clean_amount('1,234.50') == 1234.5
+    assert cid_parser.clean_amount(' 980 ') == 980.0
+    assert cid_parser.clean_amount('') is None
+    assert cid_parser.clean_amount('N/A') is None
+
+
+@pytest.mark.parametrize('label, expected', [
+    ('APR-25', '2025-04'),
+    ('April 2025', '2025-04'),
+    ("Jun'24", '2024-06'),
+    ('04/2025', '2025-04'),
+    ('2025-11', '2025-11'),
+    ('Total', None),
+])
+def test_parse_bill_month(label, expected):
+    assert cid_parser.parse_bill_month(label) == expected
+
+
+def test_parse_consumption_table_reads_the_portal_table():
+    rows = cid_parser.parse_consumption_table(fake_portal.history_table('1234567890', '2025-06', 3))
+    assert [month for month, _ in rows] == ['JUN-25', 'MAY-25', 'APR-25']
+    assert all(cid_parser.clean_amount(amount) for _, amount in rows)
+
+
+def test_parse_consumption_table_without_table_or_rows():
+    assert cid_parser.parse_consumption_table('<p>Invalid Captcha</p>') is None
+    with pytest.raises(Exception, match='No data rows'):
+        cid_parser.parse_consumption_table('<table id="consumptionData"><tr><th>Bill Month</th></tr></table>')
+
+
+def test_build_monthly_amounts():
+    rows = [('JUN-25', '1,200.00'), ('MAY-25', '900.50'), ('APR-25', '1,500'), ('MAR-25', '2,000')]
+    amounts = cid_parser.build_monthly_amounts(rows)
+    assert amounts['June25'] == 1200.0
+    assert amounts['May25'] == 900.5
+    assert amounts['April25'] == 1500.0
+    assert amounts['Highest'] == 2000.0
+    assert amounts['history'][0] == ['2025-06', 1200.0]
+
+
+def test_parse_consumption_json_matches_the_html_path():
+    rows = [['JUN-25', '1,200.00'], ['MAY-25', '900.50']]
+    assert cid_parser.parse_consumption_json(json.dumps(rows)) == [('JUN-25', '1,200.00'), ('MAY-25', '900.50')]
@@ -0,0 +1,22 @@
+import job_control
+
+
+def test_external_backend_pause_resume_and_stop_reach_worker_processes(core, monkeypatch):
+    monkeypatch.setitem(core.CONFIG, 'PROCESSING_BACKEND', 'external')
+    core.db['bills'].insert_many([{'cid': str(i), 'status': 'new'} for i in range(3)])
+    client = core.app.test_client()
+
+    response = client.post('/start', json={'collection': 'bills', 'engine': 'http'})
+    assert response.status_code == 200
+    assert core.scheduler.find(core.db.name, 'bills') is None
+
+    assert client.post('/pause', json={'collection': 'bills'}).status_code == 200
+    assert job_control.get_state(core.db, 'bills')['state'] == 'paused'
+    assert client.post('/pause', json={'collection': 'bills'}).status_code == 400
+
+    assert client.post('/resume').status_code == 200
+    assert job_control.get_state(core.db, 'bills')['state'] == 'running'
+
+    assert client.post('/stop').status_code == 200
+    assert job_control.get_state(core.db, 'bills')['state'] == 'stopped'
+    assert client.post('/stop').status_code == 400
@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+
+import openpyxl
+
+import export
+
+
+def seed(collection):
+    collection.insert_many([
+        {'cid': str(n), 'status': 'processed', 'tag': 'a' if n % 3 else 'b', 'collection': 'bills',
+         'April25': 100.0 + n, 'May25': None, 'June25': float('nan'), 'Highest': 100.0 + n,
+         'history': [['2025-04', 100.0 + n], ['2024-04', 1.0]],
+         'date_added': datetime(2025, 7, 1, 9, 30), 'failed_attempts': 0, 'fail_reason': None}
+        for n in range(30)
+    ])
+    collection.insert_one({'cid': 'p', 'status': 'processing', 'tag': 'a', 'fail_reason': 'timeout'})
+
+
+def test_csv_chunks_and_gzip_stream():
+    documents = ({'cid': str(n), 'status': 'new'} for n in range(1201))
+    chunks = list(export.iter_csv(documents, rows_per_chunk=500))
+    assert len(chunks) == 3
+
+    text = gzip.decompress(b''.join(export.iter_gzip(iter(chunks)))).decode('utf-8')
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == export.EXPORT_COLUMNS and len(rows) == 1202
+
+
+def test_peek_keeps_every_document():
+    sample, documents = export.peek(iter(range(10)), 3)
+    assert sample == [0, 1, 2] and list(documents) == list(range(10))
+
+
+def test_csv_download_streams_only_the_tag(core):
+    seed(core.db['bills'])
+    response = core.app.test_client().get('/download?collection=bills&tag=b&format=csv')
+    assert response.status_code == 200
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert sorted(int(row['cid']) for row in rows) == list(range(0, 30, 3))
+    assert {row['tag'] for row in rows} == {'b'}
+    assert rows[0]['date_added'] == '2025-07-01 09:30:00'
+    assert rows[0]['June25'] == ''  # NaN amounts export as empty cells
+
+
+def test_gzip_and_xlsx_downloads_match(core):
+    seed(core.db['bills'])
+    client = core.app.test_client()
+
+    compressed = client.get('/download?collection=bills&tag=a&format=csv.gz')
+    csv_rows = list(csv.DictReader(io.StringIO(gzip.decompress(compressed.get_data()).decode('utf-8'))))
+
+    workbook = openpyxl.load_workbook(io.BytesIO(client.get('/download?collection=bills&tag=a').get_data()), read_only=True)
+    sheet_rows = list(workbook.active.iter_rows(values_only=True))
+
+    assert len(csv_rows) == len(sheet_rows) - 1 == 21
+    processing = next(row for row in csv_rows if row['cid'] == 'p')
+    assert processing['fail_reason'] == 'fail'
+    assert sheet_rows[0] == tuple(export.EXPORT_COLUMNS)
+
+
+def test_window_download_uses_the_history(core):
+    seed(core.db['bills'])
+    response = core.app.test_client().get('/download?collection=bills&tag=b&format=csv&window=2025-04:2025-05')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+    assert list(rows[0])[:7] == ['cid', 'status', 'April25', 'May25', 'Highest', 'Average', 'Total']
+    first = next(row for row in rows if row['cid'] == '3')
+    assert (first['April25'], first['May25'], first['Total']) == ('103.0', '', '103.0')
+
+
+def test_unknown_tag_or_format_is_rejected(core):
+    seed(core.db['bills'])
+    client = core.app.test_client()
+    assert client.get('/download?collection=bills&tag=missing&format=csv').status_code == 404
+    assert client.get('/download?collection=bills&format=pdf').status_code == 400
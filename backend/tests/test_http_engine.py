@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+import cid_parser
+import fake_portal
+import http_engine
+
+
+@pytest.fixture(scope='module')
+def portal():
+    server = fake_portal.PortalServer(seed=1).start()
+    yield server
+    server.stop()
+
+
+def start_portal(**options):
+    return fake_portal.PortalServer(seed=1, **options).start()
+
+
+def test_parse_bill_form_reads_the_portal_form(portal):
+    session = http_engine.create_session()
+    page = session.get(f'{portal.base_url}/viewBillDetailsMain')
+    form = http_engine.parse_bill_form(page.text, page.url)
+    assert form['action'] == f'{portal.base_url}/viewBillDetailsMain'
+    assert form['method'] == 'post'
+    assert form['cid_field'] == 'ltscno'
+    assert form['answer_field'] == 'Billans'
+    assert form['signin_field'] == 'Billsignin'
+    assert len(form['captcha']) == 5
+    assert 'token' in form['fields']
+
+
+def test_parse_bill_form_without_cid_input():
+    with pytest.raises(Exception, match='ltscno'):
+        http_engine.parse_bill_form('<form></form>', 'http://portal/')
+
+
+def test_scrape_cid_returns_the_portal_history(portal):
+    session = http_engine.create_session()
+    amounts = http_engine.scrape_cid(session, '1234567890', f'{portal.base_url}/viewBillDetailsMain',
+                                     history_url='/viewBillDetailsMain/history')
+
+    expected = cid_parser.build_monthly_amounts(
+        cid_parser.parse_consumption_table(fake_portal.history_table('1234567890', '2025-06', 12)))
+    assert amounts == expected
+    assert amounts['history'][0][0] == '2025-06'
+    assert len(amounts['history']) == 12
+    assert amounts['Highest'] == max(amount for _, amount in amounts['history'])
+
+
+def test_scrape_cid_uses_a_fresh_portal_session_per_cid(portal):
+    session = http_engine.create_session()
+    url = f'{portal.base_url}/viewBillDetailsMain'
+    first = http_engine.scrape_cid(session, '111', url, history_url='/viewBillDetailsMain/history')
+    second = http_engine.scrape_cid(session, '222', url, history_url='/viewBillDetailsMain/history')
+    assert first['history'] != second['history']
+
+
+def test_scrape_cid_without_history_url(portal):
+    with pytest.raises(Exception, match='HISTORY_URL'):
+        http_engine.scrape_cid(http_engine.create_session(), '1', f'{portal.base_url}/viewBillDetailsMain')
+
+
+def test_scrape_cid_on_rejected_captcha():
+    server = start_portal(captcha_failure_rate=1.0)
+    try:
+        with pytest.raises(Exception, match='CAPTCHA failed'):
+            http_engine.scrape_cid(http_engine.create_session(), '1', f'{server.base_url}/viewBillDetailsMain',
+                                   history_url='/viewBillDetailsMain/history')
+    finally:
+        server.stop()
+
+
+def test_scrape_cid_on_server_error():
+    server = start_portal(error_rate=1.0)
+    try:
+        with pytest.raises(requests.HTTPError):
+            http_engine.scrape_cid(http_engine.create_session(), '1', f'{server.base_url}/viewBillDetailsMain',
+                                   history_url='/viewBillDetailsMain/history')
+    finally:
+        server.stop()
@@ -0,0 +1,21 @@
+def test_indexes_are_recreated_after_a_collection_is_deleted(core):
+    client = core.app.test_client()
+    core.provision_collection('bills').insert_one({'cid': '1', 'tag': 'a', 'collection': 'bills', 'status': 'new'})
+    assert 'collection_tag_cid' in core.db['bills'].index_information()
+
+    assert client.delete('/collections/bills').status_code == 200
+    assert 'bills' not in core.db.list_collection_names()
+
+    core.provision_collection('bills')
+    assert {'collection_tag_cid', 'status_id', 'tag_status_id'} <= set(core.db['bills'].index_information())
+
+
+def test_viewing_a_collection_does_not_create_it(core):
+    client = core.app.test_client()
+    assert client.get('/status?collection=typo').status_code == 200
+    assert client.get('/status').status_code == 200
+    assert client.get('/priorities?collection=typo').status_code == 200
+
+    assert 'typo' not in core.db.list_collection_names()
+    assert 'default_collection' not in core.db.list_collection_names()
+    assert client.get('/collections').get_json()['collections'] == []
@@ -0,0 +1,68 @@
+import io
+
+import openpyxl
+
+import ingest
+
+
+def csv_file(lines):
+    return io.BytesIO(('\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def test_large_csv_streams_in_bounded_deduplicated_chunks():
+    cids = [str(1000000 + n % 20000) for n in range(50000)]  # Every CID appears two or three times
+    chunks = list(ingest.iter_cid_chunks(csv_file(['CID', *cids]), 'cids.csv', 1000))
+
+    rows_read, cid_rows, _ = chunks[-1]
+    unique = [cid for _, _, chunk in chunks for cid in chunk]
+    assert (rows_read, cid_rows) == (50000, 50000)
+    assert all(len(chunk) <= 1000 for _, _, chunk in chunks)
+    assert unique == [str(1000000 + n) for n in range(20000)]
+
+
+def test_values_are_normalised_and_blank_rows_skipped():
+    lines = ['﻿Consumer No., Name', '1234.0,a', ' 1234 ,b', '', ',c', '5678,d', '0042,e']
+    chunks = list(ingest.iter_cid_chunks(csv_file(lines), 'cids.csv', 100))
+    assert chunks == [(6, 4, ['1234', '5678', '0042'])]
+
+
+def test_header_only_and_empty_files_have_no_cids():
+    assert list(ingest.iter_cid_chunks(csv_file(['CID']), 'cids.csv', 100)) == [(0, 0, [])]
+    assert list(ingest.iter_cid_chunks(io.BytesIO(b''), 'cids.csv', 100)) == [(0, 0, [])]
+
+
+def test_workbooks_stream_the_first_column():
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['CID', 'Name'])
+    for value in (1234.0, 1234, '5678', None, 9012):
+        sheet.append([value, 'x'])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    assert list(ingest.iter_cid_chunks(buffer, 'cids.xlsx', 2)) == [(3, 3, ['1234', '5678']), (5, 4, ['9012'])]
+
+
+def test_upload_counts_duplicates_as_skipped(core, monkeypatch):
+    monkeypatch.setitem(core.CONFIG, 'UPLOAD_CHUNK_SIZE', 50)
+    client = core.app.test_client()
+    lines = ['CID', *[str(n % 200) for n in range(600)]]
+
+    response = client.post('/upload', data={'file': (csv_file(lines), 'cids.csv'), 'collection': 'bills', 'tag': 'a'},
+                           content_type='multipart/form-data')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['inserted'], body['skipped'], body['rows']) == (200, 400, 600)
+    assert core.db['bills'].count_documents({'tag': 'a', 'status': 'new'}) == 200
+
+    # Uploading the same file again adds nothing
+    response = client.post('/upload', data={'file': (csv_file(lines), 'cids.csv'), 'collection': 'bills', 'tag': 'a'},
+                           content_type='multipart/form-data')
+    assert core.db['bills'].count_documents({}) == 200
+    progress = client.get('/upload/progress?collection=bills').get_json()
+    assert progress['done'] and progress['rows'] == 600 and progress['inserted'] == 0
+
+    header_only = client.post('/upload', data={'file': (csv_file(['CID']), 'cids.csv'), 'collection': 'bills'},
+                              content_type='multipart/form-data')
+    assert header_only.status_code == 204
@@ -0,0 +1,62 @@
+import pytest
+
+import month_window
+
+
+def test_parse_window_ranges_and_lists():
+    assert month_window.parse_window(None) is None
+    assert month_window.parse_window('2024-11:2025-02') == ['2024-11', '2024-12', '2025-01', '2025-02']
+    assert month_window.parse_window('2025-04, 2025-06,2025-04') == ['2025-04', '2025-06']
+    assert month_window.window_columns(['2025-04']) == ['April25', 'Highest', 'Average', 'Total']
+
+
+@pytest.mark.parametrize('spec', ['April', '2025-4', '2025-04:June', '2025-06:2025-04'])
+def test_parse_window_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        month_window.parse_window(spec)
+
+
+def test_window_months_compare_year_and_month():
+    months = {'2025-04', '2025-05'}
+    assert month_window._window_month('2025-04', months) == '2025-04'
+    assert month_window._window_month('April25', months) == '2025-04'
+    assert month_window._window_month('MAY-2025', months) == '2025-05'
+    assert month_window._window_month('APR-24', months) is None
+    assert month_window._window_month('2024-04', months) is None
+    assert month_window._window_month('APRIL', months) is None  # No year: can't place it
+    assert month_window._window_month(None, months) is None
+
+
+def test_window_frame_uses_history_or_legacy_fields():
+    docs = [
+        {'history': [['2025-04', 100.0], ['APR-24', 999.0], ['2025-05', 300.0]]},
+        {'April25': 50.0, 'May25': None, 'June25': 70.0},
+        {'history': [['2023-01', 10.0]]},
+    ]
+    frame = month_window.window_frame(docs, ['2025-04', '2025-05'])
+    rows = [{column: None if value != value else value for column, value in row.items()} for row in frame.to_dict('records')]
+
+    assert rows[0] == {'April25': 100.0, 'May25': 300.0, 'Highest': 300.0, 'Average': 200.0, 'Total': 400.0}
+    assert rows[1] == {'April25': 50.0, 'May25': None, 'Highest': 50.0, 'Average': 50.0, 'Total': 50.0}
+    assert rows[2] == {'April25': None, 'May25': None, 'Highest': None, 'Average': None, 'Total': None}
+
+
+def test_status_summary_agrees_with_the_export(core):
+    collection = core.db['bills']
+    collection.insert_many([
+        {'cid': '1', 'status': 'processed', 'history': [['2025-04', 100.0], ['APRIL', 5000.0], ['2025-05', 300.0]]},
+        {'cid': '2', 'status': 'processed', 'April25': 50.0},
+        {'cid': '3', 'status': 'processed', 'history': [['APR-24', 999.0]]},
+        {'cid': '4', 'status': 'new'},
+    ])
+    months = ['2025-04', '2025-05']
+
+    exported = list(month_window.iter_with_window(collection.find({'status': 'processed'}, {'_id': 0}), months, 2))
+    summary = month_window.window_summary(collection, months, batch_size=2)
+
+    with_amounts = [row for row in exported if row['Highest'] is not None]
+    assert summary['cids'] == len(with_amounts) == 2
+    assert summary['highest'] == max(row['Highest'] for row in with_amounts) == 300.0
+    assert summary['average_highest'] == 175.0
+    assert summary['total'] == sum(row['Total'] for row in with_amounts) == 450.0
+    assert 'history' not in exported[0]
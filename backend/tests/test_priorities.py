@@ -0,0 +1,43 @@
+import pytest
+
+import priorities
+
+
+def test_parse_priority_accepts_levels_and_numbers():
+    assert priorities.parse_priority('urgent') == 3
+    assert priorities.parse_priority(' Low ') == 0
+    assert priorities.parse_priority('7') == 7
+    assert priorities.parse_priority(9) == 9
+
+
+@pytest.mark.parametrize('value', ['soon', None, -1, 10, '2.5'])
+def test_parse_priority_rejects_everything_else(value):
+    with pytest.raises(ValueError):
+        priorities.parse_priority(value)
+
+
+def test_collection_and_tag_containing_colons_do_not_collide(core):
+    priorities.set_priority(core.db, 'a:b', 'c', 3)
+    priorities.set_priority(core.db, 'a', 'b:c', 0)
+    priorities.set_priority(core.db, 'a', 'b:c', 2)
+
+    assert priorities.get_priorities(core.db, 'a:b') == {'c': 3}
+    assert priorities.get_priorities(core.db, 'a') == {'b:c': 2}
+    assert core.db[priorities.PRIORITY_COLLECTION].count_documents({}) == 2
+    assert 'collection_tag' in core.db[priorities.PRIORITY_COLLECTION].index_information()
+
+    priorities.clear_priorities(core.db, 'a')
+    assert priorities.get_priorities(core.db, 'a') == {}
+    assert priorities.get_priorities(core.db, 'a:b') == {'c': 3}
+
+
+def test_priorities_endpoint_lists_every_tag(core):
+    core.db['bills'].insert_many([{'cid': '1', 'tag': 'x', 'status': 'new'}, {'cid': '2', 'tag': 'y', 'status': 'new'}])
+    client = core.app.test_client()
+
+    assert client.post('/priorities', json={'collection': 'bills', 'tag': 'x', 'priority': 'urgent'}).status_code == 200
+    assert client.post('/priorities', json={'collection': 'bills', 'tag': 'x', 'priority': 'never'}).status_code == 400
+    assert client.post('/priorities', json={'collection': 'bills'}).status_code == 400
+
+    body = client.get('/priorities?collection=bills').get_json()
+    assert body['priorities'] == {'x': 3, 'y': priorities.DEFAULT_PRIORITY}
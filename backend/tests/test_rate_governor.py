@@ -0,0 +1,83 @@
+import asyncio
+
+import aiohttp
+import requests
+
+from rate_governor import RateGovernor, is_backpressure_error
+
+
+def make_governor(**overrides):
+    settings = dict(rate=2, min_rate=0.2, max_rate=50, concurrency=4, min_concurrency=1, max_concurrency=1000,
+                    latency_target=15, cooldown=0)
+    settings.update(overrides)
+    return RateGovernor(**settings)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+def attempt(governor, latency, error=None):
+    # Admission itself is covered by the token bucket; these tests only look at how outcomes adapt the limits
+    governor.in_flight += 1
+    governor.release(latency, error)
+
+
+def test_only_overload_signals_count_as_backpressure():
+    assert is_backpressure_error(http_error(429))
+    assert is_backpressure_error(http_error(503))
+    assert is_backpressure_error(requests.ConnectTimeout('connect timed out'))
+    assert is_backpressure_error(asyncio.TimeoutError())
+    assert is_backpressure_error(aiohttp.ClientResponseError(None, (), status=429))
+
+    assert not is_backpressure_error(None)
+    assert not is_backpressure_error(http_error(404))
+    assert not is_backpressure_error(Exception('CAPTCHA validation failed: wrong answer'))
+    assert not is_backpressure_error(Exception('CAPTCHA failed or no history button'))
+
+
+def test_captcha_rejections_do_not_slow_the_portal_down():
+    governor = make_governor()
+    for _ in range(20):
+        attempt(governor, 1, Exception('CAPTCHA validation failed: wrong answer'))
+
+    assert governor.stats() == {'rate_per_sec': 2, 'concurrency_limit': 4, 'in_flight': 0, 'decreases': 0}
+
+
+def test_backpressure_halves_and_success_climbs_back():
+    governor = make_governor()
+    attempt(governor, 1, http_error(503))
+    assert (governor.rate, governor.limit, governor.decreases) == (1, 2, 1)
+
+    for _ in range(10):
+        attempt(governor, 1)
+    assert round(governor.rate, 2) == 2
+    assert governor.limit > 2
+
+    # Slow answers count as pushback too, and never below the floor
+    for _ in range(10):
+        attempt(governor, 30)
+    assert (governor.rate, governor.limit) == (0.2, 1)
+
+
+def test_decreases_are_limited_to_one_per_cooldown():
+    governor = make_governor(cooldown=60)
+    for _ in range(3):
+        attempt(governor, 1, requests.ReadTimeout())
+    assert governor.decreases == 1
+
+
+def test_warm_start_lifts_to_a_job_start_unless_recently_throttled():
+    governor = make_governor(cooldown=60)
+    assert governor.warm_start(20, 100)
+    assert governor.stats()['rate_per_sec'] == 20 and governor.stats()['concurrency_limit'] == 100
+
+    # A browser job joining later never lowers what the running async job reached
+    governor.warm_start(2, 4)
+    assert governor.stats()['concurrency_limit'] == 100
+
+    attempt(governor, 1, http_error(429))
+    assert not governor.warm_start(20, 100)
+    assert governor.stats()['concurrency_limit'] == 50
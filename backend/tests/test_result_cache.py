@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from result_cache import ResultCache, PagedLookup
+
+
+@pytest.fixture
+def cache():
+    mongomock = pytest.importorskip('mongomock')
+    cache = ResultCache(mongomock.MongoClient().db, ttl_seconds=3600)
+    yield cache
+    cache.close()
+
+
+def count_finds(cache):
+    calls = []
+    find = cache.collection.find
+
+    def counting_find(*args, **kwargs):
+        calls.append(args)
+        return find(*args, **kwargs)
+    cache.collection.find = counting_find
+    return calls
+
+
+def test_paged_lookup_queries_the_cache_once_per_page(cache):
+    queued = [str(n) for n in range(1, 21)]
+    now = datetime.now()
+    cache.collection.insert_many([{'_id': cid, 'monthly_amounts': {'Highest': int(cid)}, 'fetched_at': now}
+                                  for cid in queued if int(cid) % 2 == 0])
+    finds = count_finds(cache)
+    lookup = PagedLookup(cache, page_size=10)
+
+    def next_cids(cid):
+        return lambda limit: queued[queued.index(cid) + 1:queued.index(cid) + 1 + limit]
+
+    results = {cid: lookup.get(cid, next_cids(cid)) for cid in queued}
+
+    assert len(finds) == 2
+    assert results['4'] == {'Highest': 4}
+    assert results['5'] is None
+    assert cache.stats()['hits'] == 10 and cache.stats()['misses'] == 10
+
+
+def test_paged_lookup_sees_results_cached_after_the_page_was_loaded(cache):
+    lookup = PagedLookup(cache, page_size=10)
+    assert lookup.get('1', lambda limit: ['2', '3']) is None
+
+    cache.put('2', {'Highest': 2})  # Scraped by another slot meanwhile
+    assert lookup.get('2', lambda limit: []) == {'Highest': 2}
+    assert lookup.get('3', lambda limit: pytest.fail('page 3 was already checked')) is None
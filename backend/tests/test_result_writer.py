@@ -0,0 +1,100 @@
+from pymongo import UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from result_writer import ResultWriter
+
+
+class FlakyCollection:
+    """Stands in for a pymongo collection whose bulk_write fails a given number of times"""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.written = []
+
+    def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.written.extend(operations)
+
+        class Result:
+            modified_count = len(operations)
+            upserted_count = 0
+        return Result()
+
+
+class SubmittedResults(list):
+    """Stands in for a ResultWriter and keeps the (operation, meta) pairs it is given"""
+
+    def submit(self, operation, meta=None):
+        self.append((operation, meta))
+
+
+def make_writer(collection, **kwargs):
+    return ResultWriter(collection, flush_size=10, flush_interval_ms=20, **kwargs)
+
+
+def test_transient_errors_are_retried_not_dropped():
+    collection = FlakyCollection(2, TypeError('driver mismatch'))
+    writer = make_writer(collection, max_attempts=5)
+    for i in range(3):
+        writer.submit(UpdateOne({'_id': i}, {'$set': {'status': 'processed'}}))
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert len(collection.written) == 3
+    assert writer.stats()['given_up'] == 0
+
+
+def test_connection_failures_keep_results_queued():
+    collection = FlakyCollection(3, AutoReconnect('primary stepped down'))
+    writer = make_writer(collection, max_attempts=1)
+    writer.submit(UpdateOne({'_id': 1}, {'$set': {'status': 'processed'}}))
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert len(collection.written) == 1
+
+
+def test_results_that_keep_failing_are_reported():
+    reported = []
+    collection = FlakyCollection(100, ValueError('bad update'))
+    writer = make_writer(collection, max_attempts=2, on_error=lambda operations, error: reported.append((operations, error)))
+    writer.submit(UpdateOne({'_id': 1}, {'$set': {'status': 'processed'}}), {'cid': '1'})
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert collection.written == []
+    assert [meta for results, _ in reported for _, meta in results] == [{'cid': '1'}]
+    assert 'bad update' in reported[0][1]
+    assert writer.stats()['given_up'] == 1
+
+
+def test_partly_applied_batches_count_what_was_written():
+    reported = []
+    error = BulkWriteError({'writeErrors': [{'index': 1, 'code': 121, 'errmsg': 'validation'}],
+                            'nModified': 2, 'nUpserted': 0})
+    writer = make_writer(FlakyCollection(1, error), on_error=lambda results, error: reported.extend(results))
+    for i in range(3):
+        writer.submit(UpdateOne({'_id': i}, {'$set': {'status': 'processed'}}), {'cid': str(i)})
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert writer.stats()['written'] == 2
+    assert [meta['cid'] for _, meta in reported] == ['1']
+
+
+def test_given_up_results_are_requeued_and_uncounted(core):
+    import work_queue
+
+    collection = core.get_collection('bills')
+    collection.insert_one({'cid': '1', 'status': 'new'})
+    doc = work_queue.claim_next(collection, 'owner-1', 60)
+    job = core.scheduler.submit(core.Job(core.db, 'bills', 'http', workers=0))
+    job.begin_cid()
+    job.end_cid(processed=True)
+
+    results = SubmittedResults()
+    core.submit_result(results, doc, 'owner-1', {'status': 'processed'})
+    core.report_write_failure(core.db, 'bills', results, 'boom')
+
+    assert collection.find_one({'cid': '1'})['status'] == 'new'
+    assert job.processed == 0 and job.write_failures == 1
+    assert job.take_progress() is None  # The success and its retraction cancel out before any checkpoint write
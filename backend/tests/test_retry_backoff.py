@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import work_queue
+
+
+def test_backoff_doubles_per_attempt_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(work_queue.random, 'uniform', lambda low, high: 1.0)
+
+    assert [work_queue.backoff_delay(attempt, 10, 300) for attempt in range(1, 8)] == [10, 20, 40, 80, 160, 300, 300]
+
+
+def test_backoff_jitter_stays_within_half_and_one_and_a_half():
+    delays = [work_queue.backoff_delay(3, 10, 300) for _ in range(200)]
+    assert all(20 <= delay <= 60 for delay in delays)
+    assert len(set(delays)) > 1
+    assert all(delay <= 450 for delay in (work_queue.backoff_delay(20, 10, 300) for _ in range(200)))
+
+
+def test_failed_attempts_are_delayed_then_marked_failed(core, monkeypatch):
+    monkeypatch.setitem(core.CONFIG, 'MAX_RETRIES', 3)
+    monkeypatch.setitem(core.CONFIG, 'RETRY_DELAY', 10)
+    monkeypatch.setattr(work_queue.random, 'uniform', lambda low, high: 1.0)
+
+    update, final = core.build_failure_update({'failed_attempts': 1}, 'CAPTCHA validation failed')
+    assert not final
+    assert (update['status'], update['failed_attempts']) == ('new', 2)
+    assert timedelta(seconds=19) < update['next_attempt_at'] - datetime.now() <= timedelta(seconds=20)
+
+    update, final = core.build_failure_update({'failed_attempts': 2}, None)
+    assert final
+    assert (update['status'], update['failed_attempts'], update['fail_reason']) == ('failed', 3, 'Unknown error')
+    assert update['next_attempt_at'] is None
+
+
+def test_next_retry_is_the_earliest_delayed_cid(core):
+    collection = core.db['queue']
+    assert work_queue.next_retry_at(collection) is None
+
+    soon, later = datetime.now() + timedelta(seconds=5), datetime.now() + timedelta(minutes=5)
+    collection.insert_many([
+        {'cid': '1', 'status': 'new', 'next_attempt_at': later},
+        {'cid': '2', 'status': 'new', 'next_attempt_at': soon},
+        {'cid': '3', 'status': 'new', 'next_attempt_at': None},
+    ])
+    assert abs(work_queue.next_retry_at(collection) - soon) < timedelta(milliseconds=1)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from scheduler import Job, Scheduler
+
+
+class FakeDB:
+    name = 'tenant'
+
+
+def test_snoozed_job_is_served_after_its_slots_retire():
+    """Slots idle out while a job is snoozed; the job must still be picked up when it wakes"""
+    calls = []
+
+    def work(job, slot):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            return 0.4  # Nothing claimable yet: snooze past the idle timeout
+        scheduler.complete(job)
+
+    scheduler = Scheduler(budget=4, work=work, idle_timeout=0.1)
+    job = scheduler.submit(Job(FakeDB(), 'cids', 'http', workers=4))
+
+    assert job.wait(timeout=5), 'job was never served again after its slots retired'
+    assert job.state == 'finished'
+    assert len(calls) >= 3
+
+
+def test_idle_slots_retire_once_no_job_needs_them():
+    scheduler = Scheduler(budget=2, work=lambda job, slot: scheduler.complete(job), idle_timeout=0.1)
+    job = scheduler.submit(Job(FakeDB(), 'cids', 'http', workers=2))
+    assert job.wait(timeout=5)
+
+    deadline = time.monotonic() + 2
+    while scheduler.stats()['slots'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert scheduler.stats()['slots'] == 0
+
+
+def test_budget_is_shared_between_tenants_by_weight():
+    served = {'a': 0, 'b': 0}
+    lock = threading.Lock()
+
+    def work(job, slot):
+        with lock:
+            served[job.tenant] += 1
+            if sum(served.values()) >= 300:
+                for j in scheduler.active_jobs():
+                    scheduler.complete(j)
+        time.sleep(0.001)
+
+    class DB:
+        def __init__(self, name):
+            self.name = name
+
+    scheduler = Scheduler(budget=2, work=work, idle_timeout=0.5, tenant_weights={'a': 2, 'b': 1})
+    jobs = [scheduler.submit(Job(DB(name), 'cids', 'http', workers=2)) for name in ('a', 'b')]
+    for job in jobs:
+        assert job.wait(timeout=10)
+    assert 1.5 < served['a'] / served['b'] < 2.6
@@ -0,0 +1,42 @@
+import json
+
+
+def read_event(response):
+    """Next data event of an open SSE response, skipping keep-alives"""
+    for chunk in response.response:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if text.startswith('data: '):
+            return json.loads(text[len('data: '):])
+
+
+def test_stream_without_collection_follows_the_current_job(core):
+    client = core.app.test_client()
+    response = client.get('/status/stream', buffered=False)
+    try:
+        assert read_event(response)['current_collection'] == 'default_collection'
+
+        job = core.scheduler.submit(core.Job(core.db, 'bills', 'http', workers=0))
+        core.status_cache.notify()
+        assert read_event(response)['current_collection'] == 'bills'
+        core.scheduler.stop(job)
+    finally:
+        response.close()
+
+
+def test_open_streams_are_capped(core):
+    client = core.app.test_client()
+    limit = core.CONFIG['MAX_STATUS_STREAMS']
+    streams = [client.get('/status/stream?collection=bills', buffered=False) for _ in range(limit)]
+    try:
+        assert all(stream.status_code == 200 for stream in streams)
+        refused = client.get('/status/stream?collection=bills', buffered=False)
+        assert refused.status_code == 503
+
+        streams.pop().close()
+        reopened = client.get('/status/stream?collection=bills', buffered=False)
+        assert reopened.status_code == 200
+        streams.append(reopened)
+    finally:
+        # Each open stream holds a pushed request context; close them in reverse
+        for stream in reversed(streams):
+            stream.close()
@@ -0,0 +1,62 @@
+import io
+
+import checkpoint
+
+
+def upload(client, collection, cids):
+    body = io.BytesIO(('CID\n' + '\n'.join(cids) + '\n').encode())
+    return client.post('/upload', data={'file': (body, 'cids.csv'), 'collection': collection},
+                       content_type='multipart/form-data')
+
+
+def test_upload_progress_is_kept_per_tenant(core, monkeypatch):
+    client = core.app.test_client()
+    acme, globex = core.db, core.db.client[f'{core.db.name}_globex']
+
+    assert upload(client, 'bills', ['1', '2', '3']).status_code == 200
+    monkeypatch.setattr(core, 'db', globex)
+    assert client.get('/upload/progress?collection=bills').status_code == 404
+    assert upload(client, 'bills', ['4']).status_code == 200
+    assert client.get('/upload/progress?collection=bills').get_json()['inserted'] == 1
+
+    monkeypatch.setattr(core, 'db', acme)
+    assert client.get('/upload/progress?collection=bills').get_json()['inserted'] == 3
+
+
+def test_collection_metrics_carry_the_tenant(core):
+    globex = core.db.client[f'{core.db.name}_globex']
+    for database in (core.db, globex):
+        core.report_write_failure(database, 'bills', [], 'write concern timeout')
+
+    rendered = core.metrics_registry.render()
+    for database in (core.db, globex):
+        assert f'result_write_failures_total{{tenant="{database.name}",collection="bills"}}' in rendered
+
+
+def test_control_summary_is_cached_per_tenant(core, monkeypatch):
+    client = core.app.test_client()
+    acme, globex = core.db, core.db.client[f'{core.db.name}_globex']
+    checkpoint.begin(acme, 'bills')
+    core.job_control.set_state(acme, 'bills', 'paused')
+
+    assert client.get('/status?collection=bills').get_json()['control']['state'] == 'paused'
+    monkeypatch.setattr(core, 'db', globex)
+    assert client.get('/status?collection=bills').get_json()['control']['state'] is None
+
+
+def test_jobs_of_another_tenant_cannot_be_read_or_controlled(core, monkeypatch):
+    client = core.app.test_client()
+    acme, globex = core.db, core.db.client[f'{core.db.name}_globex']
+    job = core.start_job(core.Job(acme, 'bills', 'http', workers=1))
+    core.scheduler.pause(job)
+
+    monkeypatch.setattr(core, 'db', globex)
+    assert client.get(f'/jobs/{job.id}').status_code == 404
+    assert client.post('/resume', json={'job_id': job.id}).status_code == 400
+    assert client.post('/stop', json={'job_id': job.id}).status_code == 400
+    assert job.state == 'paused'
+
+    monkeypatch.setattr(core, 'db', acme)
+    assert client.get(f'/jobs/{job.id}').get_json()['job_id'] == job.id
+    assert client.post('/stop', json={'job_id': job.id}).status_code == 200
+    assert job.state == 'stopped'
@@ -0,0 +1,86 @@
+import time
+from datetime import datetime, timedelta
+
+import work_queue
+
+
+def fill(collection, count):
+    collection.insert_many([{'cid': str(i), 'status': 'new', 'failed_attempts': 0} for i in range(count)])
+
+
+def test_claims_take_each_cid_once_in_order(core):
+    collection = core.db['queue']
+    fill(collection, 5)
+
+    first = work_queue.claim_next(collection, 'a', 60)
+    batch = work_queue.claim_batch(collection, 'b', 3, 60)
+    last = work_queue.claim_next(collection, 'a', 60)
+
+    assert first['cid'] == '0' and first['status'] == 'processing' and first['worker_id'] == 'a'
+    assert [doc['cid'] for doc in batch] == ['1', '2', '3']
+    assert last['cid'] == '4'
+    assert work_queue.claim_next(collection, 'c', 60) is None
+    assert work_queue.claim_batch(collection, 'c', 3, 60) == []
+
+
+def test_retries_wait_for_their_next_attempt(core):
+    collection = core.db['queue']
+    collection.insert_many([
+        {'cid': 'later', 'status': 'new', 'next_attempt_at': datetime.now() + timedelta(minutes=5)},
+        {'cid': 'due', 'status': 'new', 'next_attempt_at': datetime.now() - timedelta(seconds=1)},
+    ])
+
+    assert work_queue.claim_next(collection, 'a', 60)['cid'] == 'due'
+    assert work_queue.claim_next(collection, 'a', 60) is None
+    assert work_queue.has_pending(collection)
+
+
+def test_expired_leases_are_claimable_and_reclaimed(core):
+    collection = core.db['queue']
+    fill(collection, 2)
+    alive = work_queue.claim_next(collection, 'alive', 60)
+    crashed = work_queue.claim_next(collection, 'crashed', -1)  # Lease already expired
+
+    taken_over = work_queue.claim_next(collection, 'b', 60)
+    assert taken_over['_id'] == crashed['_id'] and taken_over['worker_id'] == 'b'
+
+    collection.update_one({'_id': alive['_id']}, {'$set': {'lease_expires_at': datetime.now() - timedelta(seconds=1)}})
+    assert work_queue.reclaim_expired(collection) == 1
+    reclaimed = collection.find_one({'_id': alive['_id']})
+    assert reclaimed['status'] == 'new' and 'worker_id' not in reclaimed
+    assert collection.find_one({'_id': crashed['_id']})['worker_id'] == 'b'
+
+
+def test_heartbeat_extends_the_owners_leases(core):
+    collection = core.db['queue']
+    fill(collection, 2)
+    mine = work_queue.claim_next(collection, 'a', 1)
+    theirs = work_queue.claim_next(collection, 'b', 1)
+
+    heartbeat = work_queue.LeaseHeartbeat(collection, 'a', 60, interval=0.05)
+    heartbeat.start()
+    time.sleep(0.3)
+    heartbeat.stop()
+    heartbeat.join(1)
+
+    assert collection.find_one({'_id': mine['_id']})['lease_expires_at'] > datetime.now() + timedelta(seconds=30)
+    assert collection.find_one({'_id': theirs['_id']})['lease_expires_at'] < datetime.now() + timedelta(seconds=2)
+
+
+def test_results_for_a_lost_lease_are_skipped(core):
+    collection = core.db['queue']
+    fill(collection, 1)
+    lost = work_queue.claim_next(collection, 'slow', -1)
+    work_queue.claim_next(collection, 'fast', 60)
+
+    result = collection.bulk_write([
+        work_queue.complete_op(lost['_id'], 'slow', {'status': 'processed', 'April25': 1}),
+        work_queue.complete_op(lost['_id'], 'fast', {'status': 'processed', 'April25': 2}),
+    ], ordered=False)
+
+    assert result.modified_count == 1
+    doc = collection.find_one({'_id': lost['_id']})
+    assert (doc['status'], doc['April25']) == ('processed', 2)
+    assert 'worker_id' not in doc and 'lease_expires_at' not in doc
+    assert work_queue.release(collection, lost['_id'], 'slow') == 0
+    assert not work_queue.has_pending(collection)
@@ -0,0 +1,47 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_worker(*extra):
+    env = dict(os.environ, DB_NAME='worker_tests', PYTHONUNBUFFERED='1', LOG_LEVEL='INFO')
+    return subprocess.Popen(
+        [sys.executable, 'worker.py', '--collection', 'bills', '--mongomock', '--engine', 'http', '--poll', '0.2', *extra],
+        cwd=BACKEND, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+
+
+def wait_for_line(process, text, timeout=30):
+    deadline = time.monotonic() + timeout
+    lines = []
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        if not line:
+            break
+        lines.append(line)
+        if text in line:
+            return lines
+    raise AssertionError(f'{text!r} not seen in worker output:\n{"".join(lines)}')
+
+
+@pytest.mark.parametrize('signum', [signal.SIGINT, signal.SIGTERM])
+def test_idle_worker_exits_on_signal(signum, mongomock_client):
+    process = start_worker()
+    try:
+        wait_for_line(process, 'consuming bills')
+        time.sleep(1)  # Several empty polls
+        process.send_signal(signum)
+        output, _ = process.communicate(timeout=15)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    assert process.returncode == 0
+    assert 'exited' in output
+    # An empty queue is polled without starting (and finishing) a job every time
+    assert 'job_finished' not in output
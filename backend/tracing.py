@@ -0,0 +1,121 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+
+LOGGER_NAME = 'cid'
+_current_trace = ContextVar('cid_trace', default=None)
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, thread, message and any structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(level='INFO', path=None):
+    """Route the 'cid' logger through a QueueHandler so workers only ever enqueue a record.
+
+    A single QueueListener thread formats and writes them (to stdout, or to `path`)."""
+    global _listener
+    with _setup_lock:
+        logger = logging.getLogger(LOGGER_NAME)
+        if _listener is not None:
+            return logger
+
+        handler = logging.FileHandler(path) if path else logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        records = queue.SimpleQueue()  # Unbounded: put() never blocks a worker
+        _listener = QueueListener(records, handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        logger.addHandler(QueueHandler(records))
+        logger.setLevel(level)
+        logger.propagate = False
+        return logger
+
+def get_logger():
+    return logging.getLogger(LOGGER_NAME)
+
+def log_event(message, level=logging.INFO, **fields):
+    """Log a structured event, tagged with the current CID trace's context if there is one"""
+    logger = get_logger()
+    if not logger.isEnabledFor(level):
+        return
+    trace = _current_trace.get()
+    if trace is not None:
+        fields = {**trace.context, **fields}
+    logger.log(level, message, extra={'fields': fields})
+
+
+class Trace:
+    """Timing spans for one CID attempt, emitted as a single log record when it finishes"""
+
+    def __init__(self, **context):
+        self.context = context
+        self.spans = []
+        self.started = time.monotonic()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        return False
+
+    def add_span(self, name, seconds, **fields):
+        self.spans.append({'name': name, 'ms': round(seconds * 1000, 1), **fields})
+
+    @contextmanager
+    def span(self, name, **fields):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.monotonic() - started, **fields)
+
+    def finish(self, outcome, message, level=logging.INFO, **fields):
+        total_ms = round((time.monotonic() - self.started) * 1000, 1)
+        log_event(message, level, event='cid_trace', outcome=outcome, total_ms=total_ms, spans=self.spans, **fields)
+
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def span(name, **fields):
+    """Time a stage under the current CID trace; a no-op when nothing is being traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name, **fields):
+        yield
+
+def record_span(name, seconds, **fields):
+    """Attach an already measured stage to the current CID trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, seconds, **fields)
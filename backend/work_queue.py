@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument, UpdateOne
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+
+from tracing import log_event
+
+LEASE_FIELDS = {'worker_id': '', 'lease_expires_at': '', 'claimed_at': ''}
+
+
+def make_owner_id(worker_id):
+    """Globally unique lease owner: host, process and worker"""
+    return f"{socket.gethostname()}-{os.getpid()}-{worker_id}-{uuid.uuid4().hex[:6]}"
+
+def claimable_filter(now):
+    """New CIDs and retries that are due, plus CIDs whose lease expired because their worker crashed"""
+    return {'$or': [
+        {'status': 'new', 'next_attempt_at': None},
+        {'status': 'new', 'next_attempt_at': {'$lte': now}},
+        {'status': 'processing', 'lease_expires_at': {'$lt': now}}
+    ]}
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with jitter for the n-th failed attempt (1-based)"""
+    delay = min(cap, base * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.5)
+
+def next_retry_at(collection):
+    """When the earliest delayed retry becomes claimable (possibly already), or None if nothing is waiting"""
+    doc = collection.find_one(
+        {'status': 'new', 'next_attempt_at': {'$ne': None}},
+        {'next_attempt_at': 1},
+        sort=[('next_attempt_at', 1)]
+    )
+    return doc['next_attempt_at'] if doc else None
+
+def has_pending(collection):
+    """Whether any CID is new (claimable now or waiting for a retry) or stranded under an expired lease"""
+    return collection.find_one(
+        {'$or': [{'status': 'new'}, {'status': 'processing', 'lease_expires_at': {'$lt': datetime.now()}}]},
+        {'_id': 1}
+    ) is not None
+
+def claim_next(collection, owner, lease_seconds, query=None):
+    """Atomically move one claimable CID (optionally also matching `query`) to processing under this owner's lease"""
+    now = datetime.now()
+    return collection.find_one_and_update(
+        {**(query or {}), **claimable_filter(now)},
+        {'$set': {
+            'status': 'processing',
+            'worker_id': owner,
+            'claimed_at': now,
+            'lease_expires_at': now + timedelta(seconds=lease_seconds)
+        }},
+        sort=[('_id', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def claim_batch(collection, owner, limit, lease_seconds, query=None):
+    """Claim up to `limit` CIDs in two round trips; the update re-checks claimability so racing owners never share a CID"""
+    now = datetime.now()
+    candidates = [doc['_id'] for doc in collection.find({**(query or {}), **claimable_filter(now)}, {'_id': 1}).sort('_id', 1).limit(limit)]
+    if not candidates:
+        return []
+
+    collection.update_many(
+        {'_id': {'$in': candidates}, **claimable_filter(now)},
+        {'$set': {
+            'status': 'processing',
+            'worker_id': owner,
+            'claimed_at': now,
+            'lease_expires_at': now + timedelta(seconds=lease_seconds)
+        }}
+    )
+    return list(collection.find({'_id': {'$in': candidates}, 'worker_id': owner, 'status': 'processing'}, {'cid': 1, 'failed_attempts': 1}))
+
+def queued_after(collection, doc, limit):
+    """CIDs of the same tag waiting behind a claimed document, in claim order"""
+    return [queued['cid'] for queued in collection.find(
+        {'status': 'new', 'tag': doc.get('tag'), '_id': {'$gt': doc['_id']}}, {'cid': 1}
+    ).sort('_id', 1).limit(limit)]
+
+def renew_leases(collection, owner, lease_seconds):
+    """Extend every lease held by this owner"""
+    return collection.update_many(
+        {'status': 'processing', 'worker_id': owner},
+        {'$set': {'lease_expires_at': datetime.now() + timedelta(seconds=lease_seconds)}}
+    ).modified_count
+
+def complete(collection, doc_id, owner, update_data):
+    """Write a CID's result and drop its lease, unless another owner has since reclaimed it"""
+    return collection.update_one(
+        {'_id': doc_id, 'worker_id': owner},
+        {'$set': update_data, '$unset': LEASE_FIELDS}
+    ).modified_count
+
+def complete_op(doc_id, owner, update_data):
+    """Same as complete(), as an operation for a buffered bulk_write"""
+    return UpdateOne({'_id': doc_id, 'worker_id': owner}, {'$set': update_data, '$unset': LEASE_FIELDS})
+
+def release(collection, doc_id, owner):
+    """Hand an unfinished CID back to the queue (e.g. when stopping mid-CID)"""
+    return collection.update_one(
+        {'_id': doc_id, 'worker_id': owner, 'status': 'processing'},
+        {'$set': {'status': 'new'}, '$unset': LEASE_FIELDS}
+    ).modified_count
+
+def reclaim_expired(collection):
+    """Reset CIDs stuck in processing by crashed workers back to new"""
+    return collection.update_many(
+        {'status': 'processing', 'lease_expires_at': {'$lt': datetime.now()}},
+        {'$set': {'status': 'new'}, '$unset': LEASE_FIELDS}
+    ).modified_count
+
+
+class LeaseHeartbeat(threading.Thread):
+    """Background thread renewing an owner's leases until stopped"""
+
+    def __init__(self, collection, owner, lease_seconds, interval):
+        super().__init__(daemon=True)
+        self.collection = collection
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                renew_leases(self.collection, self.owner, self.lease_seconds)
+            except Exception as e:
+                log_event(f"⚠ Lease heartbeat failed for {self.owner}: {str(e)[:100]}", logging.WARNING)
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,143 @@
+"""Standalone CID worker process.
+
+Runs outside the Flask app and consumes CIDs from a Mongo collection through the same
+lease-based queue the in-process workers use. Start as many as you like, on as many
+machines as you like:
+
+    python worker.py --collection my_collection --concurrency 4
+    python worker.py --collection my_collection --mode async --concurrency 200 --engine http
+
+/start, /pause, /resume and /stop in the Flask app write a control document that these
+processes obey. Use --mongo-uri mongodb://localhost:27017 for a local mongod, or
+--mongomock for a throwaway in-memory database.
+"""
+import argparse
+import os
+import signal
+import threading
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Consume CIDs from a MongoDB collection')
+    parser.add_argument('--collection', required=True, help='CID collection to process')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Worker threads (threads mode) or in-flight CIDs (async mode)')
+    parser.add_argument('--mode', choices=['threads', 'async'], default='threads')
+    parser.add_argument('--engine', default=None, help='Scraping engine for threads mode (selenium, selenium-lean or http)')
+    parser.add_argument('--db', default=None, help='Database name (defaults to DB_NAME)')
+    parser.add_argument('--mongo-uri', default=None, help='MongoDB URI (defaults to MONGO_URI)')
+    parser.add_argument('--mongomock', action='store_true', help='Use an in-memory mongomock database')
+    parser.add_argument('--poll', type=float, default=2, help='Seconds between control document polls')
+    parser.add_argument('--profile', choices=['cprofile', 'sampling'], default=None,
+                        help='Profile each worker thread (or the async loop) and write the result to PROFILE_DIR')
+    parser.add_argument('--once', action='store_true', help='Exit when the queue is drained instead of waiting for more work')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Must be in place before app.py builds its client at import time
+    os.environ['RESUME_ON_BOOT'] = '0'  # Jobs are resubmitted by the web app, not by every process that imports it
+    if args.mongo_uri:
+        os.environ['MONGO_URI'] = args.mongo_uri
+    elif args.mongomock:
+        os.environ['MONGO_URI'] = 'mongodb://localhost:27017'
+
+    import app as core
+    import job_control
+    import work_queue
+    from tracing import log_event
+
+    if args.mongomock:
+        try:
+            core.client = core.mongo_pool.mongomock_client()
+        except RuntimeError as e:
+            raise SystemExit(f"❌ {e}")
+        core.db = core.client[args.db or core.DB_NAME or 'test']
+    elif args.db:
+        core.db = core.client[args.db]
+
+    db = core.db
+    engine = args.engine or core.CONFIG['DEFAULT_ENGINE']
+    if engine not in core.ENGINES:
+        raise SystemExit(f"Unknown engine '{engine}'. Available engines: {', '.join(core.ENGINES)}")
+
+    worker_key = f"{os.uname().nodename}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    state_changed = threading.Event()
+    stopping = threading.Event()
+    current = {'job': None}
+
+    def handle_signal(signum, frame):
+        # Replaces the handler app.py installs on import, which only exits while a job is active
+        log_event(f"🛑 Worker process received {signal.Signals(signum).name}, stopping...")
+        stopping.set()
+        state_changed.set()
+        if current['job'] is not None:
+            core.scheduler.stop(current['job'])
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    # Every worker slot of this process goes to its one collection
+    core.scheduler.budget = args.concurrency
+
+    def apply_state(state):
+        # Mirror the control document onto the job this process is running
+        job = current['job']
+        if job is not None:
+            if state == 'paused':
+                core.scheduler.pause(job)
+            elif state == 'running':
+                core.scheduler.resume(job)
+            elif state == 'stopped':
+                core.scheduler.stop(job)
+        log_event(f"🎛 Control state for {args.collection}: {state}")
+        state_changed.set()
+
+    def heartbeat():
+        job_control.register_worker(db, worker_key, args.collection, mode=args.mode,
+                                    engine=engine, concurrency=args.concurrency)
+
+    watcher = job_control.ControlWatcher(db, args.collection, apply_state, interval=args.poll, heartbeat=heartbeat)
+    watcher.poll()
+    watcher.start()
+
+    log_event(f"🚀 Worker process {worker_key} consuming {args.collection} ({args.mode}, concurrency {args.concurrency})")
+    collection = core.get_collection(args.collection, db)
+    try:
+        while not stopping.is_set():
+            if watcher.state != 'running':
+                # Idle until /start (or /resume) flips the control document back to running
+                state_changed.clear()
+                state_changed.wait(args.poll)
+                continue
+
+            if not work_queue.has_pending(collection):
+                # Nothing to claim: poll again rather than start (and immediately finish) a job
+                if args.once:
+                    break
+                stopping.wait(args.poll)
+                continue
+
+            job = current['job'] = core.Job(db, args.collection, engine, mode=args.mode, workers=args.concurrency,
+                                            concurrency=args.concurrency, profile=args.profile)
+            core.start_job(job)
+            job.wait()
+            current['job'] = None
+
+            if args.once and watcher.state == 'running':
+                break
+            stopping.wait(args.poll)
+    finally:
+        if current['job'] is not None:
+            core.scheduler.stop(current['job'])
+        watcher.stop()
+        job_control.unregister_worker(db, worker_key)
+        core.close_result_writers()
+        core.close_result_caches()
+        core.browser_pool.shutdown()
+        log_event(f"🏁 Worker process {worker_key} exited")
+
+if __name__ == '__main__':
+    main()
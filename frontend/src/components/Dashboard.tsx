@@ -133,11 +133,17 @@ const Dashboard = () => {
     }
   };
 
-  // Control functions
+  // Control functions; pause/resume/stop act on the selected collection's job
+  const controlRequest = () => ({
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(processingCollection ? { collection: processingCollection } : {})
+  });
+
   const pauseProcessing = async () => {
     clearResponse();
     try {
-      const res = await fetch(`${API_BASE_URL}/pause`, { method: 'POST' });
+      const res = await fetch(`${API_BASE_URL}/pause`, controlRequest());
       const data = await res.json();
       displayResponse(data.message);
       checkStatus();
@@ -149,7 +155,7 @@ const Dashboard = () => {
   const resumeProcessing = async () => {
     clearResponse();
     try {
-      const res = await fetch(`${API_BASE_URL}/resume`, { method: 'POST' });
+      const res = await fetch(`${API_BASE_URL}/resume`, controlRequest());
       const data = await res.json();
       displayResponse(data.message);
       checkStatus();
@@ -161,7 +167,7 @@ const Dashboard = () => {
   const stopProcessing = async () => {
     clearResponse();
     try {
-      const res = await fetch(`${API_BASE_URL}/stop`, { method: 'POST' });
+      const res = await fetch(`${API_BASE_URL}/stop`, controlRequest());
       const data = await res.json();
       displayResponse(data.message);
       checkStatus();
@@ -212,11 +218,12 @@ const Dashboard = () => {
   };
 
   // Check system status
-  const checkStatus = async () => {
+  const checkStatus = async (collectionName = processingCollection) => {
     setIsLoading(prev => ({ ...prev, status: true }));
-    
+
     try {
-      const res = await fetch(`${API_BASE_URL}/status`);
+      const query = collectionName ? `?collection=${encodeURIComponent(collectionName)}` : '';
+      const res = await fetch(`${API_BASE_URL}/status${query}`);
       const data = await res.json();
       
       if (data.error) {
@@ -284,6 +291,28 @@ const Dashboard = () => {
     fetchCollections();
   }, []);
 
+  // Live status updates for the selected collection pushed by the server instead of repeated polling;
+  // reopened when the selection changes
+  useEffect(() => {
+    const query = processingCollection ? `?collection=${encodeURIComponent(processingCollection)}` : '';
+    const source = new EventSource(`${API_BASE_URL}/status/stream${query}`);
+    let poll = null;
+    source.onmessage = (event) => {
+      const delta = JSON.parse(event.data);
+      setStatus(prev => ({ ...prev, ...delta }));
+    };
+    source.onerror = () => {
+      // The server refuses streams beyond its limit; fall back to polling
+      if (source.readyState === EventSource.CLOSED && !poll) {
+        poll = setInterval(() => checkStatus(processingCollection), 5000);
+      }
+    };
+    return () => {
+      source.close();
+      if (poll) clearInterval(poll);
+    };
+  }, [processingCollection]);
+
   // Effect to update tag select when download collection changes
   useEffect(() => {
     if (downloadCollection) {
@@ -306,7 +335,7 @@ const Dashboard = () => {
             </div>
           </div>
           <button
-            onClick={checkStatus}
+            onClick={() => checkStatus()}
             disabled={isLoading.status}
             className="bg-white/10 hover:bg-white/20 border border-white/20 rounded-xl px-4 py-2 text-white transition-all duration-200 flex items-center space-x-2 disabled:opacity-50"
           >